@@ -1,3 +1,3 @@
-from peppyproject.configuration import PyProjectConfiguration
+from peppyproject.configuration import PyProjectConfiguration, aconvert_many
 
-__all__ = ["PyProjectConfiguration"]
+__all__ = ["PyProjectConfiguration", "aconvert_many"]
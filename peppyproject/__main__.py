@@ -1,30 +1,443 @@
+from __future__ import annotations
+
+import json
+import textwrap
+from collections.abc import Collection, Iterator, Mapping
+from contextlib import ExitStack, contextmanager
+from functools import partial
 from pathlib import Path
+from typing import Any
 
 import typer
+from typer.core import TyperGroup
 
-from peppyproject import PyProjectConfiguration
+from peppyproject.batch import convert_journaled, convert_many, discover, merge_results, read_project
+from peppyproject.budget import DEFAULT_BUDGET, Budget
+from peppyproject.check import check
+from peppyproject.files import write_file
+from peppyproject.hooks import handling
+from peppyproject.index import SQLiteIndex
+from peppyproject.journal import Journal
+from peppyproject.metrics import Metrics, metrics
+from peppyproject.profiling import profile, trace
+from peppyproject.sandbox import SandboxPool, evaluating
+from peppyproject.sweep import sweep
+from peppyproject.watch import watch
 
-app = typer.Typer(add_completion=False)
 
+class DefaultCommandGroup(TyperGroup):
+    """command group that falls back to the ``convert`` command, i.e. ``peppyproject . -o pyproject.toml``."""
 
-@app.command()
-def main(
-    directory: Path = typer.Argument(None, help="directory from which to read configuration"),
+    default_command = "convert"
+
+    def parse_args(self, ctx: typer.Context, args: list[str]) -> list[str]:
+        if len(args) == 0 or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(cls=DefaultCommandGroup, add_completion=False)
+
+
+@app.command("convert")
+def main(  # noqa: PLR0917
+    directory: Path = typer.Argument(
+        None, help="directory (or `.tar.gz` / `.zip` source distribution) from which to read configuration"
+    ),
     output_filename: Path = typer.Option(None, "-o", "--output", help="path to which to write TOML"),
+    revision: str = typer.Option(
+        None, "--rev", help="read the directory as of this commit, tag, or branch of its git repository"
+    ),
+    evaluate_setup_py: bool = typer.Option(
+        False,
+        "--evaluate-setup-py",
+        help="run `setup.py` scripts in sandboxed worker processes to capture computed arguments, instead of only "
+        "parsing them (falling back to parsing if that fails)",
+    ),
+    check_existing: bool = typer.Option(
+        False,
+        "--check",
+        help="instead of writing TOML, compare the configuration with the existing `pyproject.toml` (or the output "
+        "path) and exit with status 1 at the first difference",
+    ),
+    watch_files: bool = typer.Option(
+        False,
+        "--watch",
+        help="keep running, and output the configuration again whenever a file in the directory changes (parsing "
+        "only the build files that changed)",
+    ),
+    stage_profile: bool = typer.Option(False, "--profile", help="print the time spent in each stage to stderr"),
+    trace_filename: Path = typer.Option(None, "--trace", help="path to which to write a Chrome trace of the stages"),
 ):
     """Read a Python project configuration and output a PEP621-compliant `pyproject.toml`."""
     if directory is None:
         directory = Path.cwd()
 
-    configuration = PyProjectConfiguration.from_directory(directory=directory)
-    toml_string = configuration.configuration
+    if watch_files:
+        if revision is not None or check_existing or not directory.is_dir():
+            message = "watching requires a project directory, and cannot be combined with `--rev` or `--check`"
+            raise typer.BadParameter(message, param_hint="--watch")
+        with instrumented(stage_profile, trace_filename), setup_py_evaluation(evaluate_setup_py, workers=1):
+            try:
+                for configuration in watch(directory):
+                    if isinstance(configuration, Exception):
+                        typer.echo(f"{configuration.__class__.__name__}: {configuration}", err=True)
+                    else:
+                        write_output(output_filename, configuration.configuration)
+            except KeyboardInterrupt:
+                pass
+        return
+
+    with instrumented(stage_profile, trace_filename), setup_py_evaluation(evaluate_setup_py, workers=1):
+        configuration = read_project(directory, revision=revision)
+        if check_existing:
+            check_filename = output_filename if output_filename is not None else directory / "pyproject.toml"
+            if not check_filename.is_file():
+                typer.echo(f"{check_filename} does not exist", err=True)
+                raise typer.Exit(code=1)
+            difference = check(configuration, check_filename)
+            if difference is None:
+                typer.echo(f"{check_filename} is up to date", err=True)
+                return
+            typer.echo(f"{check_filename} differs from the converted configuration at `{difference['key']}`:")
+            for side, prefix in (("old", "-"), ("new", "+")):
+                if side in difference:
+                    value = json.dumps(difference[side], default=str)
+                    typer.echo(f"{prefix} {textwrap.shorten(value, width=200, placeholder=' ...')}")
+            raise typer.Exit(code=1)
+        toml_string = configuration.configuration
+    write_output(output_filename, toml_string)
+
+
+@app.command()
+def get(  # noqa: PLR0917
+    key: str = typer.Argument(..., help="dotted key of the value to retrieve, i.e. `project.dependencies`"),
+    directories: list[Path] = typer.Argument(
+        None, help="directories (or source distributions) from which to read configuration"
+    ),
+    revision: str = typer.Option(
+        None, "--rev", help="read the directories as of this commit, tag, or branch of their git repositories"
+    ),
+    evaluate_setup_py: bool = typer.Option(
+        False,
+        "--evaluate-setup-py",
+        help="run `setup.py` scripts in sandboxed worker processes to capture computed arguments, instead of only "
+        "parsing them (falling back to parsing if that fails)",
+    ),
+    stage_profile: bool = typer.Option(False, "--profile", help="print the time spent in each stage to stderr"),
+    trace_filename: Path = typer.Option(None, "--trace", help="path to which to write a Chrome trace of the stages"),
+):
+    """Print a single value of the PEP621-compliant configuration as JSON, reading only the files that can contribute to it.
+
+    Given multiple directories, print one JSON object per line with the directory and its value.
+    """
+    if directories is None or len(directories) == 0:
+        directories = [Path.cwd()]
+
+    with instrumented(stage_profile, trace_filename), setup_py_evaluation(evaluate_setup_py, workers=1):
+        for directory in directories:
+            value = to_json(read_project(directory, revision=revision, lazy=True, key=key).get(key))
+            if len(directories) == 1:
+                print(json.dumps(value))
+            else:
+                print(json.dumps({"directory": str(directory), "value": value}))
+
+
+@app.command()
+def batch(  # noqa: PLR0917
+    roots: list[Path] = typer.Argument(None, help="directories under which to find projects (or source distributions)"),
+    archives: bool = typer.Option(
+        False, "--archives", help="also convert the `.tar.gz` / `.zip` source distributions found under the directories"
+    ),
+    output_filename: Path = typer.Option(None, "-o", "--output", help="path to which to write JSON lines"),
+    workers: int = typer.Option(None, "-j", "--workers", help="number of worker threads"),
+    revision: str = typer.Option(
+        None,
+        "--rev",
+        help="convert the projects as of this commit, tag, or branch of their git repositories; projects are found in "
+        "the working tree",
+    ),
+    evaluate_setup_py: bool = typer.Option(
+        False,
+        "--evaluate-setup-py",
+        help="run `setup.py` scripts in sandboxed worker processes to capture computed arguments, instead of only "
+        "parsing them (falling back to parsing if that fails)",
+    ),
+    shard: str = typer.Option(
+        None,
+        "--shard",
+        help="only convert this shard of the projects, i.e. `2/8` for the second of eight (split by a stable hash of the "
+        "path of each project relative to its root)",
+    ),
+    stage_profile: bool = typer.Option(False, "--profile", help="print the time spent in each stage to stderr"),
+    trace_filename: Path = typer.Option(None, "--trace", help="path to which to write a Chrome trace of the stages"),
+    metrics_filename: str = typer.Option(
+        None,
+        "--metrics",
+        help="path to which to write metrics in the OpenMetrics text format (`-` for stdout, along with `-o`)",
+    ),
+    metrics_interval: float = typer.Option(None, "--metrics-interval", help="also write metrics every this many seconds"),
+    journal_filename: Path = typer.Option(
+        None,
+        "--journal",
+        help="path to which to append an entry for each project (its directory, a hash of its inputs, and its output)",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="skip projects that the journal lists as converted from unchanged inputs, and append to the output",
+    ),
+    max_bytes: int = typer.Option(
+        DEFAULT_BUDGET.bytes, "--max-bytes", help="skip build files larger than this many bytes (0 for no limit)"
+    ),
+    max_statements: int = typer.Option(
+        DEFAULT_BUDGET.statements,
+        "--max-statements",
+        help="only read the literal arguments of `setup.py` scripts with more than this many statements (0 for no limit)",
+    ),
+    max_seconds: float = typer.Option(
+        DEFAULT_BUDGET.seconds,
+        "--max-seconds",
+        help="only read the literal arguments of `setup.py` scripts that take longer than this to parse (0 for no limit)",
+    ),
+    index_filename: Path = typer.Option(
+        None,
+        "--index",
+        help="path to a SQLite database to which to add the configuration of each converted project, for queries "
+        "across projects (created if it does not exist)",
+    ),
+):
+    """Convert every project found under the given directories, in a pool of worker threads.
+
+    Output one JSON object per line with the project directory and its `pyproject.toml`, or the error that prevented
+    its conversion; exit with status 1 if any project could not be converted. Build files over budget are skipped or
+    read by a cheaper parser, with a warning.
+    """
+    if roots is None or len(roots) == 0:
+        roots = [Path.cwd()]
+    if shard is not None:
+        shard = parse_shard(shard)
+    if resume and journal_filename is None:
+        message = "resuming requires a journal of the interrupted batch"
+        raise typer.BadParameter(message, param_hint="--resume")
+    check_metrics_output(metrics_filename, output_filename)
+    budget = Budget(bytes=max_bytes or None, statements=max_statements or None, seconds=max_seconds or None)
+
+    failures = 0
+    with instrumented(stage_profile, trace_filename, metrics_filename, metrics_interval), ExitStack() as stack:
+        output_file = (
+            stack.enter_context(open(output_filename, "a" if resume else "w")) if output_filename is not None else None
+        )
+        pool = stack.enter_context(setup_py_evaluation(evaluate_setup_py, workers=workers, thread_local=False))
+        index = stack.enter_context(SQLiteIndex(index_filename)) if index_filename is not None else None
+        directories = list(discover(roots, shard=shard, archives=archives))
+
+        if journal_filename is None:
+            journal = None
+            results = (
+                (directory, None, result)
+                for directory, result in convert_many(
+                    directories, workers=workers, revision=revision, pool=pool, budget=budget, index=index
+                )
+            )
+        else:
+            # a new batch truncates its output, so it starts a new journal
+            journal = stack.enter_context(Journal(journal_filename, sync_before=[output_file], append=resume))
+            results = convert_journaled(
+                directories,
+                journal,
+                resume=resume,
+                workers=workers,
+                revision=revision,
+                pool=pool,
+                budget=budget,
+                index=index,
+            )
+
+        skipped = 0
+        for directory, digest, result in results:
+            if result is None:
+                skipped += 1
+                continue
+            if isinstance(result, Exception):
+                failures += 1
+                record = {"directory": str(directory), "error": f"{result.__class__.__name__}: {result}"}
+            else:
+                record = {"directory": str(directory), "pyproject": result}
+            typer.echo(json.dumps(record), file=output_file)
+            if journal is not None and digest is not None:
+                journal.record(
+                    directory,
+                    digest,
+                    output=output_filename if output_filename is not None else "-",
+                    status="failed" if isinstance(result, Exception) else "converted",
+                )
+        if resume:
+            typer.echo(f"skipped {skipped} unchanged project(s)", err=True)
+
+    if failures > 0:
+        typer.echo(f"{failures} project(s) could not be converted", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def merge(
+    filenames: list[Path] = typer.Argument(
+        ...,
+        help="results (JSON lines or JSON) and metrics (OpenMetrics text) of several batches, i.e. of each shard",
+    ),
+    output_filename: Path = typer.Option(None, "-o", "--output", help="path to which to write combined JSON lines"),
+    metrics_filename: str = typer.Option(
+        None,
+        "--metrics",
+        help="path to which to write combined metrics in the OpenMetrics text format (`-` for stdout, along with `-o`)",
+    ),
+):
+    """Combine the results and metrics of several batches, i.e. the shards of one batch, into one report.
+
+    Output one JSON object per line, in order of project directory; exit with status 1 if any project could not be
+    converted.
+    """
+    check_metrics_output(metrics_filename, output_filename)
+    results_filenames = []
+    combined_metrics = Metrics()
+    for filename in filenames:
+        with open(filename) as input_file:
+            first_line = next((line for line in input_file if len(line.strip()) > 0), "")
+        if first_line.startswith("#"):
+            combined_metrics.update(Metrics.from_file(filename))
+        else:
+            results_filenames.append(filename)
+
+    results = merge_results(results_filenames)
+    with ExitStack() as stack:
+        output_file = stack.enter_context(open(output_filename, "w")) if output_filename is not None else None
+        for record in results:
+            typer.echo(json.dumps(record), file=output_file)
+    if metrics_filename is not None:
+        combined_metrics.to_file(metrics_filename)
+
+    failures = sum(1 for record in results if "error" in record)
+    typer.echo(f"{len(results)} project(s) from {len(results_filenames)} result file(s)", err=True)
+    if failures > 0:
+        typer.echo(f"{failures} project(s) could not be converted", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command("sweep")
+def sweep_history(
+    directory: Path = typer.Argument(None, help="project directory, within the working tree of a git repository"),
+    revision_range: str = typer.Option(
+        "HEAD", "--range", help="commits to walk, oldest first, following only first parents, i.e. `v1.0..main`"
+    ),
+    output_filename: Path = typer.Option(None, "-o", "--output", help="path to which to write JSON lines"),
+    stage_profile: bool = typer.Option(False, "--profile", help="print the time spent in each stage to stderr"),
+    trace_filename: Path = typer.Option(None, "--trace", help="path to which to write a Chrome trace of the stages"),
+):
+    """Output the changes to the PEP621-compliant configuration of a project at each commit in its git history.
+
+    Output one JSON object per line, for each commit that changed the configuration, with the commit ID and the changed
+    (dotted) keys with their old and new values. Commits are only converted when their build files differ from every
+    commit converted before them.
+    """
+    if directory is None:
+        directory = Path.cwd()
+
+    lookups = {"cache_hit": 0, "cache_miss": 0}
+
+    def count(event: str, cache: str) -> None:
+        if cache == "sweep":
+            lookups[event] += 1
+
+    with instrumented(stage_profile, trace_filename), ExitStack() as stack:
+        stack.enter_context(handling({event: partial(count, event) for event in lookups}))
+        output_file = stack.enter_context(open(output_filename, "w")) if output_filename is not None else None
+        try:
+            for record in sweep(directory, revision_range=revision_range):
+                typer.echo(json.dumps(record, default=str), file=output_file)
+        except ValueError as error:
+            raise typer.BadParameter(str(error)) from error
+
+    commits = lookups["cache_hit"] + lookups["cache_miss"]
+    typer.echo(f"converted {lookups['cache_miss']} of {commits} commit(s)", err=True)
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """Parse a shard such as `2/8` (the second of eight) into its index and count."""
+    index, _, count = shard.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index, count = 0, 0
+    if not 1 <= index <= count:
+        message = f'invalid shard "{shard}"; expected `index/count`, such as `2/8`, with 1 <= index <= count'
+        raise typer.BadParameter(message, param_hint="--shard")
+    return index, count
+
+
+def check_metrics_output(metrics_filename: str | None, output_filename: Path | None) -> None:
+    """Refuse to write metrics to stdout along with the results, which they would interleave with."""
+    if metrics_filename == "-" and output_filename is None:
+        message = "metrics can only be written to stdout if the results are written to a file (with `-o`)"
+        raise typer.BadParameter(message, param_hint="--metrics")
+
+
+def write_output(output_filename: Path | None, toml_string: str) -> None:
+    """Print TOML, or write it to the given file if it changed."""
     if output_filename is None:
         print(toml_string)
+    elif write_file(output_filename, toml_string):
+        typer.echo(f"wrote {output_filename}", err=True)
     else:
-        if not output_filename.parent.exists():
-            output_filename.mkdir(parents=True, exist_ok=True)
-        with open(output_filename, "w") as toml_file:
-            toml_file.write(toml_string)
+        typer.echo(f"{output_filename} is unchanged", err=True)
+
+
+@contextmanager
+def instrumented(
+    stage_profile: bool = False,
+    trace_filename: Path | None = None,
+    metrics_filename: str | None = None,
+    metrics_interval: float | None = None,
+) -> Iterator[None]:
+    """Print the time spent in each stage to stderr, write a Chrome trace of the stages, and / or write metrics."""
+    with ExitStack() as stack:
+        stages = stack.enter_context(profile()) if stage_profile else None
+        if trace_filename is not None:
+            stack.enter_context(trace(trace_filename))
+        if metrics_filename is not None:
+            stack.enter_context(metrics(metrics_filename, interval=metrics_interval))
+        yield
+    if stages is not None:
+        typer.echo(stages.report(), err=True)
+
+
+@contextmanager
+def setup_py_evaluation(
+    enabled: bool,
+    workers: int | None = None,
+    thread_local: bool = True,
+) -> Iterator[SandboxPool | None]:
+    """Evaluate `setup.py` scripts in a pool of sandboxed workers, if enabled.
+
+    :param enabled: whether to start a pool
+    :param workers: number of worker processes
+    :param thread_local: also evaluate scripts in the pool within the context in the current thread
+    """
+    if not enabled:
+        yield None
+        return
+    with SandboxPool(workers=workers) as pool, evaluating(pool if thread_local else None):
+        yield pool
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: to_json(entry) for key, entry in value.items() if entry is not None}
+    if isinstance(value, Collection) and not isinstance(value, str):
+        return [to_json(entry) for entry in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""reading of the build files of a project straight from its source distribution, without extracting it to disk.
+
+::
+
+    directory, files = read_archive("dist/example-1.0.tar.gz")
+    with in_memory({directory: files}):
+        table = ProjectMetadata.from_directory(directory)
+"""
+
+from __future__ import annotations
+
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+
+from peppyproject.files import KNOWN_FILENAMES
+from peppyproject.profiling import span
+
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar", ".zip")
+
+
+def is_archive(filename: str) -> bool:
+    """Whether the given path names a source distribution archive (by its suffix)."""
+    return str(filename).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_build_file(name: str) -> bool:
+    """Whether a file of the given name can contribute to configuration, and so is read from an archive."""
+    name = name.lower()
+    return name in KNOWN_FILENAMES or name.endswith((".cfg", ".ini"))
+
+
+def read_archive(filename: str) -> tuple[Path, dict[str, bytes | None]]:
+    """Read the top-level files of the project in the given `.tar.gz` / `.tar.*` / `.zip` source distribution.
+
+    Members are streamed; only the contents of top-level build files (`pyproject.toml`, `setup.cfg`, `setup.py`, and
+    other `*.cfg` / `*.ini` files) are read, and the names of the other top-level files (i.e. the README and license)
+    are listed. As in an sdist, the top level is the single directory containing all members, if there is one.
+
+    :param filename: path to the archive
+    :return: project directory, given as a path within the archive (i.e. `dist/example-1.0.tar.gz/example-1.0`), and
+        the names of its files, mapped to their contents (`None` for files that were not read); suitable for
+        `files.in_memory`
+    :raises ValueError: if the archive format is not supported
+    """
+    filename = Path(filename)
+    if not is_archive(filename):
+        message = f'unsupported archive "{filename}"; expected one of {ARCHIVE_SUFFIXES}'
+        raise ValueError(message)
+
+    # files at the root of the archive and within each directory at its root, by that directory ("" for the root)
+    files = {}
+    roots = set()
+    with span("read_archive", archive=filename):
+        if filename.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(filename) as archive:
+                for member in archive.infolist():
+                    path = PurePosixPath(member.filename)
+                    roots.add(path.parts[0])
+                    if not member.is_dir() and len(path.parts) <= 2:
+                        content = archive.read(member) if is_build_file(path.name) else None
+                        files.setdefault(path.parent.as_posix(), {})[path.name] = content
+        else:
+            # `r|*` reads the archive as a stream, decompressing each member once and never seeking back
+            with tarfile.open(filename, "r|*") as archive:
+                for member in archive:
+                    path = PurePosixPath(member.name)
+                    if len(path.parts) == 0:
+                        continue
+                    roots.add(path.parts[0])
+                    if member.isfile() and len(path.parts) <= 2:
+                        content = archive.extractfile(member).read() if is_build_file(path.name) else None
+                        files.setdefault(path.parent.as_posix(), {})[path.name] = content
+
+    if len(roots) == 1 and "." not in files:
+        (root,) = roots
+        return filename / root, files.get(root, {})
+    return filename, files.get(".", {})
@@ -1,19 +1,95 @@
 from __future__ import annotations
 
+import hashlib
+import threading
+import warnings
 from abc import ABC
-from collections.abc import Collection, Iterator, Mapping, MutableMapping
+from collections.abc import Callable, Collection, Iterator, Mapping, MutableMapping
 from configparser import ConfigParser
 from datetime import datetime
+from functools import partial
+from io import StringIO
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Any
+from typing import Any, NamedTuple
 
 import tomli
 import tomli_w
 import typepigeon
 from ini2toml.api import Translator
 
-from peppyproject.files import SETUP_CFG, inify, inify_mapping, read_setup_py
+from peppyproject.budget import BudgetExceeded, current_budget, reading
+from peppyproject.cache import current_cache
+from peppyproject.files import (
+    KNOWN_FILENAMES,
+    SETUP_CFG,
+    file_signature,
+    file_size,
+    inify,
+    inify_mapping,
+    list_files,
+    open_file,
+    read_setup_py,
+    read_setup_py_literals,
+    select_ini_sections,
+    write_file,
+)
+from peppyproject.hooks import calling, dispatch, transform
+from peppyproject.profiling import span
+from peppyproject.sandbox import current_pool
+
+
+class Field(NamedTuple):
+    """entry in the dotted-key index of a table schema."""
+
+    type: Any
+    # `None` for (sub)tables, which are converted entry-by-entry
+    converter: Callable[[Any], Any] | None
+
+
+def to_type(value: Any, desired_type: Any) -> Any:
+    """Convert the value to the given type, or to the first member of a `Union` that it can be converted to."""
+    if hasattr(desired_type, "__origin__") and (
+        (hasattr(desired_type.__origin__, "__name__") and desired_type.__origin__.__name__ == "Union")
+        or (hasattr(desired_type.__origin__, "_name") and desired_type.__origin__._name == "Union")
+    ):
+        errors = []
+        for optional_type in desired_type.__args__:
+            try:
+                return typepigeon.to_type(value, optional_type)
+            except Exception as error:
+                errors.append(str(error))
+        raise RuntimeError(";".join(errors))
+    return typepigeon.to_type(value, desired_type)
+
+
+# `Translator` is expensive to construct but not safe to share between threads, so each thread keeps its own
+_translators = threading.local()
+
+
+def translator() -> Translator:
+    """``ini2toml`` translator belonging to the current thread."""
+    if not hasattr(_translators, "translator"):
+        dispatch("cache_miss", cache="translator")
+        _translators.translator = Translator()
+    else:
+        dispatch("cache_hit", cache="translator")
+    return _translators.translator
+
+
+def index_fields(fields: Mapping[str, Any], prefix: str = "") -> dict[str, Field]:
+    """Flatten a (nested) table schema into a mapping of dotted keys to their types and converters."""
+    index = {}
+    for key, desired_type in fields.items():
+        path = f"{prefix}{key}"
+        if isinstance(desired_type, Mapping):
+            index[path] = Field(desired_type, None)
+            index.update(index_fields(desired_type, prefix=f"{path}."))
+        elif isinstance(desired_type, type) and issubclass(desired_type, ConfigurationTable):
+            index[path] = Field(desired_type, None)
+            index.update({f"{path}.{subkey}": field for subkey, field in desired_type.index.items()})
+        else:
+            index[path] = Field(desired_type, partial(to_type, desired_type=desired_type))
+    return index
 
 
 class ConfigurationTable(MutableMapping, ABC):
@@ -22,39 +98,101 @@ class ConfigurationTable(MutableMapping, ABC):
     name: str
     fields: dict[str, Any]
     start_with_placeholders: bool = True
+    # INI sections (and their subsections) that can contribute to this table; `None` translates every section
+    sections: Collection[str] | None = None
+    # whether keys outside of `fields` are expected; otherwise, they are stored with a warning
+    allow_unknown_keys: bool = False
+    # flattened schema, mapping every dotted key (i.e. `isort.known-first-party`) to its type and converter
+    index: dict[str, Field] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if "fields" in cls.__dict__:
+            cls.index = index_fields(cls.fields)
 
-    def __init__(self, **kwargs) -> None:
+    def __init__(self, directory: Path | None = None, **kwargs) -> None:
+        # project directory, against which file references (i.e. to a README or license) are resolved
+        self.__directory = Path(directory) if directory is not None else None
         if self.start_with_placeholders:
             self.__configuration = {key: None for key in self.fields}
         else:
             self.__configuration = {}
+        # snapshot of the entries (see `freeze`), until they are next set
+        self.__frozen = None
         if len(kwargs) > 0:
             self.update(kwargs)
 
     @classmethod
-    def from_file(cls, filename: str) -> ConfigurationTable:
+    def from_file(
+        cls,
+        filename: str,
+        sections: Collection[str] | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> ConfigurationTable:
+        """Read the table from the given build file.
+
+        :param filename: path to `pyproject.toml`, `setup.py`, or an INI file such as `setup.cfg`
+        :param sections: only translate these INI sections (and their subsections)
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this call only
+        """
+        if hooks is not None:
+            with calling(hooks):
+                return cls.from_file(filename, sections=sections)
+
         if not isinstance(filename, Path):
             filename = Path(filename)
 
-        configuration = cls()
-        configuration.__from_directory = filename.parent
+        if cls.sections is not None:
+            sections = cls.sections if sections is None else [section for section in sections if section in cls.sections]
+
+        configuration = cls(directory=filename.parent)
+        if sections is not None and len(sections) == 0 and filename.name.lower() != "pyproject.toml":
+            dispatch("file_skipped", filename=filename)
+            return configuration
+        budget = current_budget()
+        if budget is not None and budget.bytes is not None:
+            size = file_size(filename)
+            if size > budget.bytes:
+                warnings.warn(f"{filename} is {size} bytes, more than the limit of {budget.bytes}; skipping it")
+                dispatch("budget_exceeded", filename=filename, limit="bytes")
+                dispatch("file_skipped", filename=filename)
+                return configuration
+        dispatch("file_read", filename=filename)
         if filename.name.lower() == "pyproject.toml":
-            with open(filename, "rb") as configuration_file:
-                file_configuration = tomli.load(configuration_file)
+            with span("read"), open_file(filename, binary=True) as configuration_file:
+                toml_string = configuration_file.read().decode()
+            with span("tomli.loads"):
+                file_configuration = tomli.loads(toml_string)
+            file_configuration = transform("file_parsed", file_configuration, filename=filename)
             base_table = cls.name.split(".", 1)[0]
             if base_table in file_configuration:
                 configuration.update(file_configuration[base_table])
         elif filename.suffix.lower() in [".cfg", ".ini"] or filename.name.lower() == "setup.py":
             if filename.suffix.lower() in [".cfg", ".ini"]:
-                with open(filename) as configuration_file:
+                with span("read"), open_file(filename) as configuration_file:
                     ini_string = configuration_file.read()
+                if sections is not None:
+                    ini_string = select_ini_sections(ini_string, sections=sections)
                 profile_name = filename.name.lower()
                 setup_py = None
             else:
-                setup_py = read_setup_py(filename)
+                pool = current_pool()
+                with span("read_setup_py"):
+                    try:
+                        with reading(filename):
+                            setup_py = read_setup_py(filename) if pool is None else pool.read_setup_py(filename)
+                    except BudgetExceeded as error:
+                        warnings.warn(f"{error}; reading only its literal arguments instead")
+                        dispatch("budget_exceeded", filename=filename, limit=error.limit)
+                        try:
+                            setup_py = read_setup_py_literals(filename)
+                        except SyntaxError as syntax_error:
+                            warnings.warn(f"{filename} is not valid Python ({syntax_error.msg}); skipping it")
+                            dispatch("file_skipped", filename=filename)
+                            return configuration
                 setup_cfg = ConfigParser()
                 for section_name, section in SETUP_CFG.items():
-                    if section != "DEFAULT":
+                    if section != "DEFAULT" and (sections is None or section_name in sections):
                         for key, value in setup_py.items():
                             if key.strip() in section:
                                 if not isinstance(value, Mapping):
@@ -84,17 +222,18 @@ class ConfigurationTable(MutableMapping, ABC):
                                                 entry_name,
                                                 entry,
                                             )
-                with NamedTemporaryFile() as temporary_file:
-                    with open(temporary_file.name, "w") as setup_cfg_file:
-                        setup_cfg.write(setup_cfg_file)
-                    with open(temporary_file.name) as setup_cfg_file:
-                        ini_string = setup_cfg_file.read()
+                with StringIO() as setup_cfg_file:
+                    setup_cfg.write(setup_cfg_file)
+                    ini_string = setup_cfg_file.getvalue()
                 profile_name = "setup.cfg"
-            toml_string = Translator().translate(
-                ini_string,
-                profile_name=profile_name,
-            )
-            file_configuration = tomli.loads(toml_string)
+            with span("translate"):
+                toml_string = translator().translate(
+                    ini_string,
+                    profile_name=profile_name,
+                )
+            toml_string = transform("section_translated", toml_string, filename=filename, sections=sections)
+            with span("tomli.loads"):
+                file_configuration = tomli.loads(toml_string)
             if "project" in file_configuration:
                 project_table = file_configuration["project"]
                 if "homepage" in project_table:
@@ -124,6 +263,7 @@ class ConfigurationTable(MutableMapping, ABC):
                             setuptools_table["package-data"] = setup_py["package_data"]
                     tool_table["setuptools"] = setuptools_table
                 file_configuration["tool"] = tool_table
+            file_configuration = transform("file_parsed", file_configuration, filename=filename)
             base_table = cls.name.split(".", 1)[0]
             if base_table in file_configuration:
                 configuration.update(file_configuration[base_table])
@@ -131,75 +271,159 @@ class ConfigurationTable(MutableMapping, ABC):
         return configuration
 
     @classmethod
-    def from_directory(cls, directory: str) -> ConfigurationTable:
+    def from_directory(
+        cls,
+        directory: str,
+        sources: Mapping[str, Collection[str] | None] | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> ConfigurationTable:
+        """Read the table from the build files in the given directory.
+
+        :param directory: project directory
+        :param sources: only read these build files, each optionally limited to the given INI sections
+            (see `files.key_sources`)
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this call only
+        """
+        if hooks is not None:
+            with calling(hooks):
+                return cls.from_directory(directory, sources=sources)
+
         if not isinstance(directory, Path):
             directory = Path(directory)
 
-        known_filenames = ["pyproject.toml", "setup.cfg", "setup.py"]
-        known_suffixes = [".cfg", ".ini"]
+        known_filenames = list(KNOWN_FILENAMES)
+        if sources is None:
+            sources = dict.fromkeys(known_filenames)
+
+        # only files that take part in the merge below are read; other `*.cfg` / `*.ini` files would be discarded anyway
+        with span("discover"):
+            names = list_files(directory)
+            filenames = []
+            for name in names:
+                filename = directory / name
+                if filename.name.lower() in sources:
+                    dispatch("file_discovered", filename=filename)
+                    filenames.append(filename)
+                elif filename.name.lower() in known_filenames or filename.suffix.lower() in [".cfg", ".ini"]:
+                    dispatch("file_skipped", filename=filename)
 
+        cache = current_cache()
         file_configurations = {}
-        for filename in directory.iterdir():
-            if filename.is_file() and (filename.name.lower() in known_filenames or filename.suffix.lower() in known_suffixes):
-                file_configuration = cls.from_file(filename)
-                if len(file_configuration) > 0:
-                    file_configurations[filename.name] = file_configuration
-
-        configuration = cls()
-        configuration.__from_directory = directory
-        file_configurations = [
-            file_configurations[filename] for filename in reversed(known_filenames) if filename in file_configurations
-        ]
-        for file_configuration in file_configurations:
-            if file_configuration is not None and len(file_configuration) > 0:
-                configuration.update(file_configuration)
+        for filename in filenames:
+            sections = sources[filename.name.lower()]
+            file_configuration = None
+            if cache is not None:
+                key = cache.key(cls, filename, sections)
+                # tables also depend on the names of the other files, against which i.e. the README is resolved
+                signature = (file_signature(filename), tuple(sorted(names)))
+                file_configuration = cache.get(key, signature)
+            if file_configuration is None:
+                with span("from_file"):
+                    file_configuration = cls.from_file(filename, sections=sections)
+                if cache is not None:
+                    cache.put(key, signature, file_configuration)
+            if len(file_configuration) > 0:
+                file_configurations[filename.name] = file_configuration
+
+        configuration = cls(directory=directory)
+        with span("merge"):
+            for filename in reversed(known_filenames):
+                if filename in file_configurations:
+                    configuration.update(file_configurations[filename])
+                    dispatch("table_merged", table=configuration, filename=directory / filename)
 
         return configuration
 
+    @property
+    def directory(self) -> Path:
+        """Project directory against which file references are resolved (by default, the working directory)."""
+        return self.__directory if self.__directory is not None else Path()
+
     def __getitem__(self, key: str) -> Any:
         return self.__configuration[key]
 
     def __setitem__(self, key: str, value: Any) -> None:
+        self.__frozen = None
         if key in self.fields:
             desired_type = self.fields[key]
             subtable_class = (
                 desired_type if desired_type is not None and not isinstance(desired_type, Mapping) else ConfigurationSubTable
             )
-            if hasattr(desired_type, "__origin__") and (
-                (hasattr(desired_type.__origin__, "__name__") and desired_type.__origin__.__name__ == "Union")
-                or (hasattr(desired_type.__origin__, "_name") and desired_type.__origin__._name == "Union")
-            ):
-                values = []
-                errors = []
-                for optional_type in desired_type.__args__:
-                    try:
-                        values.append(typepigeon.to_type(value, optional_type))
-                    except Exception as error:
-                        errors.append(error)
-                if len(values) == 0:
-                    raise RuntimeError(";".join(errors))
-                self.__configuration[key] = values[0]
-            elif isinstance(desired_type, Mapping) and isinstance(value, Mapping):
+            if isinstance(desired_type, Mapping) and isinstance(value, Mapping):
                 if len(value) > 0:
                     for sub_key, sub_value in value.items():
                         if sub_key in desired_type:
                             if key not in self.__configuration or self.__configuration[key] is None:
                                 self.__configuration[key] = subtable_class()
-                            self[key][sub_key] = typepigeon.to_type(
-                                sub_value,
-                                desired_type[sub_key],
+                            self[key][sub_key] = transform(
+                                "value_coerced",
+                                to_type(sub_value, desired_type[sub_key]),
+                                table=self,
+                                key=f"{key}.{sub_key}",
                             )
+                        else:
+                            warnings.warn(f'ignoring unknown key "{key}.{sub_key}" in table "{self.name}"')
                 else:
                     self.__configuration[key] = subtable_class()
             else:
-                self.__configuration[key] = typepigeon.to_type(value, desired_type)
+                self.__configuration[key] = transform("value_coerced", to_type(value, desired_type), table=self, key=key)
         else:
+            if not self.allow_unknown_keys:
+                warnings.warn(f'unknown key "{key}" in table "{self.name}"')
             self.__configuration[key] = value
 
+    def get(self, key: str, default: Any = None) -> Any:
+        """Retrieve an entry or, given a dotted key such as `isort.known-first-party`, an entry of a subtable."""
+        if key in self.__configuration:
+            return self.__configuration[key]
+        name, _, subkey = key.partition(".")
+        if len(subkey) == 0 or (not self.allow_unknown_keys and key not in self.index):
+            return default
+        value = self.__configuration.get(name)
+        if isinstance(value, ConfigurationTable):
+            return value.get(subkey, default)
+        for entry in subkey.split("."):
+            if not isinstance(value, Mapping) or entry not in value:
+                return default
+            value = value[entry]
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an entry given a dotted key such as `isort.known-first-party`, creating subtables as needed.
+
+        :raises KeyError: if the key is not in the schema of a table that does not allow unknown keys
+        """
+        self.__frozen = None
+        name, _, subkey = key.partition(".")
+        if len(subkey) == 0:
+            self[key] = value
+            return
+
+        field = self.index.get(key)
+        if field is None and not self.allow_unknown_keys:
+            message = f'"{key}" is not a field of the "{self.name}" table'
+            raise KeyError(message)
+        if field is not None and field.converter is not None and value is not None:
+            value = field.converter(value)
+
+        table = self.__configuration.get(name)
+        if not isinstance(table, MutableMapping):
+            subtable_class = self.fields.get(name)
+            if not (isinstance(subtable_class, type) and issubclass(subtable_class, ConfigurationTable)):
+                subtable_class = ConfigurationSubTable
+            table = subtable_class()
+            self.__configuration[name] = table
+        if isinstance(table, ConfigurationTable):
+            table.set(subkey, value)
+        else:
+            table[subkey] = value
+
     def update(self, items: Mapping):
-        for key, value in items.items():
-            if value is not None and (not hasattr(value, "__len__") or len(value) > 0):
-                self[key] = value
+        self.__frozen = None
+        with span("coerce"):
+            for key, value in items.items():
+                if value is not None and (not hasattr(value, "__len__") or len(value) > 0):
+                    self[key] = value
 
     def __delitem__(self, key: str) -> None:
         message = "cannot delete configuration entry; set as `None` instead"
@@ -233,13 +457,48 @@ class ConfigurationTable(MutableMapping, ABC):
             if value is not None
         }
 
+    def as_dict(self) -> dict[str, Any]:
+        """Entries of this table (under its name), as the dictionary that `configuration` renders as TOML."""
+        return to_dict({self.name: self.__toml})
+
     @property
     def configuration(self) -> str:
-        return tomli_w.dumps(to_dict({self.name: self.__toml}))
+        with span("render"):
+            table = self.as_dict()
+        with span("tomli_w.dumps"):
+            toml_string = tomli_w.dumps(table)
+        return transform("rendered", toml_string, table=self)
+
+    def to_file(self, filename: str) -> bool:
+        """Render the table to the given file, unless it is unchanged (see `files.write_file`).
+
+        :return: whether the file was written
+        """
+        return write_file(filename, self.configuration)
 
-    def to_file(self, filename: str):
-        with open(filename, "w") as configuration_file:
-            configuration_file.write(self.configuration)
+    def freeze(self) -> FrozenConfigurationTable:
+        """Immutable, hashable snapshot of the current (non-``None``) entries of this table.
+
+        The snapshot is kept, and returned again (without computing its digest again) until an entry of this table or
+        of one of its subtables is set, so snapshots of a configuration share every table that did not change. Values
+        changed in place (i.e. a list that is appended to) must be set again to be seen by the next snapshot.
+        """
+        subtables = {
+            key: value.freeze() for key, value in self.__configuration.items() if isinstance(value, ConfigurationTable)
+        }
+        frozen = self.__frozen
+        if frozen is None or any(frozen.get(key) is not subtable for key, subtable in subtables.items()):
+            entries = {key: value for key, value in self.__configuration.items() if value is not None}
+            entries.update(subtables)
+            frozen = FrozenConfigurationTable(entries, name=self.name)
+            self.__frozen = frozen
+        return frozen
+
+    def __getstate__(self) -> dict[str, Any]:
+        # copies (i.e. by `cache.FileCache`) and pickles leave out the snapshot, which is taken again when needed
+        state = self.__dict__.copy()
+        state["_ConfigurationTable__frozen"] = None
+        return state
 
     def __repr__(self) -> str:
         configuration_string = {
@@ -254,6 +513,80 @@ class ConfigurationSubTable(ConfigurationTable):
     name = None
     fields = {}
     start_with_placeholders = False
+    allow_unknown_keys = True
+
+
+class FrozenConfigurationTable(Mapping):
+    """immutable snapshot of a configuration table, hashable by its content.
+
+    Nested tables are frozen recursively and already-frozen tables are reused as-is, so the content digest of every
+    table is computed exactly once, at construction; `ConfigurationTable.freeze` keeps the snapshot of each table, so
+    that snapshots taken one after another share every table that did not change in between.
+    """
+
+    __slots__ = ("__digest", "__entries", "__hash", "name")
+
+    def __init__(self, entries: Mapping[str, Any], name: str | None = None) -> None:
+        self.name = name
+        self.__entries = {key: freeze(value) for key, value in entries.items()}
+        self.__digest = hashlib.sha256(
+            "".join(f"{key!r}:{_digest_entry(entry)};" for key, entry in sorted(self.__entries.items())).encode(),
+        ).hexdigest()
+        self.__hash = hash(self.__digest)
+
+    @property
+    def digest(self) -> str:
+        """Hexadecimal SHA-256 of the table content; stable across processes and independent of key order."""
+        return self.__digest
+
+    def __getitem__(self, key: str) -> Any:
+        return self.__entries[key]
+
+    def __iter__(self) -> Iterator:
+        yield from self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __hash__(self) -> int:
+        return self.__hash
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FrozenConfigurationTable):
+            return self.__hash == other.__hash and self.__digest == other.__digest
+        return super().__eq__(other)
+
+    def __reduce__(self) -> tuple:
+        # the hash of the digest is specific to a process, so it is computed again when unpickled
+        return self.__class__, (self.__entries, self.name)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__entries!r})"
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert mappings to ``FrozenConfigurationTable``, lists to tuples, and sets to frozensets."""
+    if isinstance(value, FrozenConfigurationTable):
+        return value
+    if isinstance(value, ConfigurationTable):
+        return value.freeze()
+    if isinstance(value, Mapping):
+        return FrozenConfigurationTable({key: entry for key, entry in value.items() if entry is not None})
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(entry) for entry in value)
+    if isinstance(value, Collection) and not isinstance(value, (str, bytes)):
+        return tuple(freeze(entry) for entry in value)
+    return value
+
+
+def _digest_entry(value: Any) -> str:
+    if isinstance(value, FrozenConfigurationTable):
+        return f"{{{value.digest}}}"
+    if isinstance(value, frozenset):
+        return f"<{','.join(sorted(_digest_entry(entry) for entry in value))}>"
+    if isinstance(value, tuple):
+        return f"[{','.join(_digest_entry(entry) for entry in value)}]"
+    return f"{type(value).__name__}:{value!r}"
 
 
 def to_dict(value: Mapping) -> dict:
@@ -0,0 +1,222 @@
+"""conversion of many projects at once, across a pool of worker threads."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Any
+
+from peppyproject.archive import is_archive
+from peppyproject.budget import budgeted
+from peppyproject.configuration import PyProjectConfiguration
+from peppyproject.files import KNOWN_FILENAMES
+from peppyproject.hooks import dispatch
+from peppyproject.journal import input_digest
+from peppyproject.profiling import span
+from peppyproject.sandbox import evaluating
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from peppyproject.budget import Budget
+    from peppyproject.index import SQLiteIndex
+    from peppyproject.journal import Journal
+    from peppyproject.sandbox import SandboxPool
+
+# directories that never contain projects of their own
+IGNORED_DIRECTORIES = ("__pycache__", "node_modules")
+
+
+def discover(roots: Iterable[str], shard: tuple[int, int] | None = None, archives: bool = False) -> Iterator[Path]:
+    """Directories under the given roots (including the roots themselves) that contain a build file.
+
+    Hidden directories, such as `.git` or `.venv`, are not searched. A root that is itself a source distribution
+    archive is found as a project.
+
+    :param roots: directories under which to find projects
+    :param shard: only find the projects of this shard, given as `(index, count)` with `index` counting from 1 (see
+        `shard_of`)
+    :param archives: also find source distribution archives (`.tar.gz`, `.zip`, ...) under the roots
+    """
+    if shard is not None:
+        index, count = shard
+        if not 1 <= index <= count:
+            message = f"shard {index}/{count} does not exist; expected 1 <= index <= {count}"
+            raise ValueError(message)
+
+    for root in roots:
+        root = Path(root)
+        if root.is_file() and is_archive(root):
+            if shard is None or shard_of(PurePath(root.name), count) == index:
+                yield root
+            continue
+        with span("discover", root=root):
+            directories = []
+            for directory, directory_names, filenames in os.walk(root):
+                directory_names[:] = sorted(
+                    name for name in directory_names if not name.startswith(".") and name not in IGNORED_DIRECTORIES
+                )
+                directory = Path(directory)
+                projects = []
+                if any(filename.lower() in KNOWN_FILENAMES for filename in filenames):
+                    projects.append(directory)
+                if archives:
+                    projects.extend(directory / filename for filename in sorted(filenames) if is_archive(filename))
+                directories.extend(
+                    project for project in projects if shard is None or shard_of(project.relative_to(root), count) == index
+                )
+        yield from directories
+
+
+def shard_of(path: PurePath, count: int) -> int:
+    """Shard (counting from 1) of the given project path, relative to the root under which it was found.
+
+    Unlike `hash()`, the hash of the path is the same on every machine and in every process, so that a batch can be
+    split across machines that each discover projects independently.
+    """
+    digest = hashlib.sha1(path.as_posix().encode(), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def read_project(path: Path, revision: str | None = None, **kwargs: Any) -> PyProjectConfiguration:
+    """Read configuration from the given project directory or source distribution archive.
+
+    :param path: project directory, or `.tar.gz` / `.zip` source distribution
+    :param revision: read the project directory as of this revision of its git repository (see
+        `PyProjectConfiguration.from_revision`)
+    :param kwargs: arguments of `PyProjectConfiguration.from_directory` / `PyProjectConfiguration.from_archive`
+    """
+    path = Path(path)
+    if revision is not None:
+        return PyProjectConfiguration.from_revision(path, revision, **kwargs)
+    if path.is_file() and is_archive(path):
+        return PyProjectConfiguration.from_archive(path, **kwargs)
+    return PyProjectConfiguration.from_directory(path, **kwargs)
+
+
+def convert(directory: Path, revision: str | None = None, index: SQLiteIndex | None = None) -> str:
+    """Read the configuration of the given project (see `read_project`) and render it as `pyproject.toml`.
+
+    :param index: also add the configuration to this index (see `index.SQLiteIndex`)
+    """
+    with span("project", directory=directory):
+        try:
+            project_configuration = read_project(directory, revision=revision)
+            configuration = project_configuration.configuration
+            if index is not None:
+                index.add(directory, project_configuration)
+        except Exception as error:
+            dispatch("project_failed", directory=directory, error=error)
+            raise
+    dispatch("project_converted", directory=directory)
+    return configuration
+
+
+def convert_many(  # noqa: PLR0917
+    directories: Iterable[str],
+    workers: int | None = None,
+    revision: str | None = None,
+    pool: SandboxPool | None = None,
+    budget: Budget | None = None,
+    index: SQLiteIndex | None = None,
+) -> Iterator[tuple[Path, str | Exception]]:
+    """Convert the given projects in a pool of worker threads.
+
+    :param directories: project directories
+    :param workers: number of worker threads (by default, that of `ThreadPoolExecutor`)
+    :param revision: convert each project as of this revision of its git repository
+    :param pool: evaluate ``setup.py`` scripts in this pool of sandboxed processes (see `sandbox.SandboxPool`)
+    :param budget: limits on reading each build file (see `budget.Budget`)
+    :param index: also add the configuration of each converted project to this index (see `index.SQLiteIndex`)
+    :return: pairs of project directory and its rendered `pyproject.toml` (or the error raised while converting it),
+        in the order given
+    """
+    directories = [Path(directory) for directory in directories]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="peppyproject") as executor:
+        yield from zip(
+            directories,
+            executor.map(
+                partial(_convert_or_error, revision=revision, pool=pool, budget=budget, index=index),
+                directories,
+            ),
+        )
+
+
+def convert_journaled(  # noqa: PLR0917
+    directories: Iterable[str],
+    journal: Journal,
+    resume: bool = False,
+    workers: int | None = None,
+    revision: str | None = None,
+    pool: SandboxPool | None = None,
+    budget: Budget | None = None,
+    index: SQLiteIndex | None = None,
+) -> Iterator[tuple[Path, str | None, str | Exception | None]]:
+    """Convert the given projects in a pool of worker threads (see `convert_many`), digesting the inputs of each
+    project in the worker that converts it (see `journal.input_digest`).
+
+    :param journal: journal of the batch, which the caller adds each result to once it is written
+    :param resume: skip projects that the journal lists as converted from unchanged inputs
+    :return: project directory, digest of its inputs (`None` if they could not be read), and its rendered
+        `pyproject.toml` (or the error raised while converting it, or `None` if it was skipped), in the order given
+    """
+    directories = [Path(directory) for directory in directories]
+    convert_project = partial(
+        _digest_and_convert, journal=journal, resume=resume, revision=revision, pool=pool, budget=budget, index=index
+    )
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="peppyproject") as executor:
+        for directory, (digest, result) in zip(directories, executor.map(convert_project, directories)):
+            yield directory, digest, result
+
+
+def _digest_and_convert(
+    directory: Path,
+    journal: Journal,
+    resume: bool = False,
+    revision: str | None = None,
+    **kwargs: Any,
+) -> tuple[str | None, str | Exception | None]:
+    try:
+        digest = input_digest(directory, revision=revision)
+    except Exception as error:  # noqa: BLE001 - reported alongside the other results, instead of ending the batch
+        return None, error
+    if resume and journal.is_current(directory, digest):
+        return digest, None
+    return digest, _convert_or_error(directory, revision=revision, **kwargs)
+
+
+def _convert_or_error(
+    directory: Path,
+    revision: str | None = None,
+    pool: SandboxPool | None = None,
+    budget: Budget | None = None,
+    index: SQLiteIndex | None = None,
+) -> str | Exception:
+    try:
+        with evaluating(pool), budgeted(budget):
+            return convert(directory, revision=revision, index=index)
+    except Exception as error:  # noqa: BLE001 - reported alongside the other results, instead of ending the batch
+        return error
+
+
+def merge_results(filenames: Iterable[str]) -> list[dict[str, Any]]:
+    """Combine the results of several (sharded) batches, written as JSON lines or as a JSON list of objects.
+
+    :param filenames: result files, each with one object per project, giving its `directory`
+    :return: results in order of project directory; where a project appears more than once, the last result is kept
+    """
+    results = {}
+    for filename in filenames:
+        with open(filename) as results_file:
+            results_string = results_file.read()
+        if results_string.lstrip().startswith("["):
+            records = json.loads(results_string)
+        else:
+            records = [json.loads(line) for line in results_string.splitlines() if len(line.strip()) > 0]
+        for record in records:
+            results[record["directory"]] = record
+    return [results[directory] for directory in sorted(results)]
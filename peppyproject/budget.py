@@ -0,0 +1,120 @@
+"""limits on the resources spent reading a single build file, so that a pathological input cannot stall a batch.
+
+A file larger than the byte limit is skipped. A ``setup.py`` with more statements than the statement limit, or whose
+static parsing runs past the time limit, is read again by a cheaper parser that only follows literal arguments (see
+`files.read_setup_py_literals`). Either way, a warning is issued and a ``budget_exceeded`` event is dispatched (see
+`peppyproject.hooks`)::
+
+    with budgeted(Budget(bytes=1 << 20, statements=10_000, seconds=10.0)):
+        configuration = PyProjectConfiguration.from_directory(directory)
+
+The time limit is checked between the steps of parsing, so a single step (i.e. one regular expression) can overrun it;
+to bound those steps, a ``setup.py`` with a statement longer than `MAXIMUM_STATEMENT_LENGTH` is also read by the cheaper
+parser.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterator
+    from pathlib import Path
+
+
+class Budget(NamedTuple):
+    """limits on reading a single build file; `None` for no limit."""
+
+    # size of the file
+    bytes: int | None = None
+    # statements of a `setup.py`
+    statements: int | None = None
+    # wall time spent parsing the file
+    seconds: float | None = None
+
+
+# limits that `peppyproject batch` applies by default
+DEFAULT_BUDGET = Budget(bytes=1 << 20, statements=10_000, seconds=10.0)
+# longest statement of a `setup.py` that is parsed under a budget; the regular expressions of the static parser take
+# time quadratic in the length of a statement, which `check_time` cannot interrupt
+MAXIMUM_STATEMENT_LENGTH = 8192
+
+_budget: ContextVar[Budget | None] = ContextVar("peppyproject_budget", default=None)
+# file being read under a budget, with the monotonic time by which it must be read
+_reading: ContextVar[tuple[Path, Budget, float | None] | None] = ContextVar("peppyproject_budget_reading", default=None)
+
+
+class BudgetExceeded(RuntimeError):
+    """build file that exceeded a limit of its budget."""
+
+    def __init__(self, filename: Path, limit: str, message: str):
+        """:param filename: build file
+        :param limit: field of `Budget` that was exceeded
+        :param message: description of the excess
+        """
+        super().__init__(message)
+        self.filename = filename
+        self.limit = limit
+
+
+@contextmanager
+def budgeted(budget: Budget | None) -> Iterator[None]:
+    """Limit the reading of each build file to the given budget, for reads within the context in the current thread."""
+    if budget is None:
+        yield
+        return
+
+    token = _budget.set(budget)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def current_budget() -> Budget | None:
+    """Budget of each build file read in the current context, if any (see `budgeted`)."""
+    return _budget.get()
+
+
+@contextmanager
+def reading(filename: Path) -> Iterator[None]:
+    """Start the clock on the given build file, against which `check_time` and `check_statements` are checked."""
+    budget = current_budget()
+    if budget is None:
+        yield
+        return
+
+    token = _reading.set((filename, budget, time.monotonic() + budget.seconds if budget.seconds is not None else None))
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def check_time() -> None:
+    """:raises BudgetExceeded: if the build file being read has run past its time limit"""
+    current = _reading.get()
+    if current is not None:
+        filename, budget, deadline = current
+        if deadline is not None and time.monotonic() > deadline:
+            message = f"reading {filename} took longer than {budget.seconds} seconds"
+            raise BudgetExceeded(filename, "seconds", message)
+
+
+def check_statements(statements: Collection[str]) -> None:
+    """:raises BudgetExceeded: if the given statements are more than the limit of the build file being read, or if
+    one is longer than `MAXIMUM_STATEMENT_LENGTH`
+    """
+    current = _reading.get()
+    if current is not None:
+        filename, budget, _ = current
+        if budget.statements is not None and len(statements) > budget.statements:
+            message = f"{filename} has {len(statements)} statements, more than the limit of {budget.statements}"
+            raise BudgetExceeded(filename, "statements", message)
+        length = max((len(statement) for statement in statements), default=0)
+        if length > MAXIMUM_STATEMENT_LENGTH:
+            message = f"{filename} has a statement of {length} characters, more than {MAXIMUM_STATEMENT_LENGTH}"
+            raise BudgetExceeded(filename, "statements", message)
@@ -0,0 +1,89 @@
+"""cache of the tables read from each build file, so that reading a project again only parses the files that changed.
+
+Entries are validated against the signature of their file (see `files.file_signature`) and the names of the other
+files in its directory (which i.e. the README and license of a project are resolved against)::
+
+    cache = FileCache()
+    with caching(cache):
+        configuration = PyProjectConfiguration.from_directory(directory)
+        # after `setup.cfg` changes, only `setup.cfg` is parsed and translated again
+        configuration = PyProjectConfiguration.from_directory(directory)
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from peppyproject.hooks import dispatch
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Hashable, Iterable, Iterator
+
+_cache: ContextVar[FileCache | None] = ContextVar("peppyproject_file_cache", default=None)
+
+
+class FileCache:
+    """tables read from build files, by table class, file, and INI sections; shared by every thread that uses it.
+
+    Tables are copied into and out of the cache, so that merging them into the table of a project (which may reuse
+    their entries) cannot change the cached tables. Lookups are reported as ``cache_hit`` / ``cache_miss`` events (see
+    `peppyproject.hooks`), with ``cache="file"``.
+    """
+
+    def __init__(self):
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(table_class: type, filename: Path, sections: Collection[str] | None) -> Hashable:
+        return table_class, Path(filename).absolute(), tuple(sections) if sections is not None else None
+
+    def get(self, key: Hashable, signature: Hashable) -> Any | None:
+        """Copy of the table cached under the given key, if it was read from a file of the given signature."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+        if entry is None or entry[0] != signature:
+            dispatch("cache_miss", cache="file")
+            return None
+        dispatch("cache_hit", cache="file")
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: Hashable, signature: Hashable, table: Any) -> None:
+        """Cache a copy of the given table, read from a file of the given signature."""
+        table = copy.deepcopy(table)
+        with self.__lock:
+            self.__entries[key] = (signature, table)
+
+    def invalidate(self, filenames: Iterable[str]) -> None:
+        """Drop the tables read from the given files."""
+        filenames = {Path(filename).absolute() for filename in filenames}
+        with self.__lock:
+            for key in [key for key in self.__entries if key[1] in filenames]:
+                del self.__entries[key]
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+@contextmanager
+def caching(cache: FileCache | None) -> Iterator[None]:
+    """Reuse tables from the given cache, for reads within the context in the current thread (or task)."""
+    if cache is None:
+        yield
+        return
+
+    token = _cache.set(cache)
+    try:
+        yield
+    finally:
+        _cache.reset(token)
+
+
+def current_cache() -> FileCache | None:
+    """Cache of the tables read from build files in the current context, if any (see `caching`)."""
+    return _cache.get()
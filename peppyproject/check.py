@@ -0,0 +1,79 @@
+"""structural comparison of converted configuration with an existing ``pyproject.toml``, without rendering either.
+
+Tables are compared regardless of the order of their keys, and entries set to `None` are ignored (as they are when
+rendering); arrays are compared in order, since TOML arrays are ordered::
+
+    difference = check(PyProjectConfiguration.from_directory(directory), directory / "pyproject.toml")
+    if difference is not None:
+        print(f"differs at {difference['key']}")
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Mapping
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import tomli
+
+from peppyproject.profiling import span
+
+if TYPE_CHECKING:
+    from peppyproject.configuration import PyProjectConfiguration
+
+
+def normalize(value: Any) -> Any:
+    """Copy of the given value as TOML reads it back, i.e. without `None` entries and with other types as strings."""
+    if isinstance(value, Mapping):
+        return {str(key): normalize(entry) for key, entry in value.items() if entry is not None}
+    if isinstance(value, (set, frozenset)):
+        return sorted((normalize(entry) for entry in value), key=repr)
+    if isinstance(value, Collection) and not isinstance(value, (str, bytes)):
+        return [normalize(entry) for entry in value]
+    if value is None or isinstance(value, (str, bool, int, float, date, datetime, time)):
+        return value
+    return str(value)
+
+
+def first_difference(old: Any, new: Any, key: str = "") -> dict[str, Any] | None:
+    """First difference between two normalized values, walking tables in order of key and stopping there.
+
+    :param old: existing value
+    :param new: converted value
+    :param key: dotted key of the values, prefixed to the keys of their entries
+    :return: the `key` of the differing entry, with its `old` value (unless added) and its `new` value (unless
+        removed), as by `sweep.diff`; `None` if the values are equal
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        for entry in sorted({*old, *new}):
+            entry_key = f"{key}.{entry}" if len(key) > 0 else entry
+            if entry not in new and not _is_nonempty_table(old[entry]):
+                return {"key": entry_key, "old": old[entry]}
+            if entry not in old and not _is_nonempty_table(new[entry]):
+                return {"key": entry_key, "new": new[entry]}
+            # a table that was added or removed as a whole differs at its first entry
+            difference = first_difference(old.get(entry, {}), new.get(entry, {}), key=entry_key)
+            if difference is not None:
+                return difference
+        return None
+    # `True == 1` in Python, but not in TOML
+    if old != new or isinstance(old, bool) is not isinstance(new, bool):
+        return {"key": key, "old": old, "new": new}
+    return None
+
+
+def _is_nonempty_table(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) > 0
+
+
+def check(configuration: PyProjectConfiguration, filename: str) -> dict[str, Any] | None:
+    """First difference between the given configuration and an existing ``pyproject.toml`` (see `first_difference`).
+
+    :raises FileNotFoundError: if the file does not exist
+    :raises tomli.TOMLDecodeError: if the file is not valid TOML
+    """
+    with span("read"), open(Path(filename), "rb") as toml_file:
+        existing = tomli.load(toml_file)
+    with span("check"):
+        return first_difference(normalize(existing), normalize(configuration.as_dict()))
@@ -1,13 +1,34 @@
-from collections.abc import Iterator, Mapping
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from peppyproject.base import ConfigurationTable
+from peppyproject.archive import read_archive
+from peppyproject.base import ConfigurationTable, FrozenConfigurationTable
+from peppyproject.cache import FileCache, caching, current_cache
+from peppyproject.files import in_memory, key_sources, write_file
+from peppyproject.git import repository
+from peppyproject.hooks import calling
+from peppyproject.profiling import span
 from peppyproject.tables import BuildConfiguration, ProjectMetadata, ToolsTable
 from peppyproject.tools.setuptools_scm import SetuptoolsSCMTable
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
 
 class PyProjectConfiguration(Mapping):
-    """abstraction of ``pyproject.toml`` configuration."""
+    """abstraction of ``pyproject.toml`` configuration.
+
+    Reading and rendering configuration keeps no state outside of the instances involved, so separate directories can
+    be converted concurrently from multiple threads (including on free-threaded builds of Python); tables of a lazy
+    instance are resolved under a lock, so one instance may also be shared between threads.
+    """
 
     def __init__(
         self,
@@ -15,50 +36,282 @@ class PyProjectConfiguration(Mapping):
         build_system: BuildConfiguration = None,
         tool: ToolsTable = None,
     ) -> None:
-        if project is None or len(project) == 0:
-            project = ProjectMetadata()
-        if tool is None or len(tool) == 0:
-            tool = ToolsTable()
-        if build_system is None or len(build_system) == 0:
-            build_system = BuildConfiguration.default_setuptools()
-        if project["dynamic"] is not None and "version" in project["dynamic"]:
-            if not any("setuptools_scm" in requirement for requirement in build_system["requires"]):
-                build_system["requires"].append("setuptools_scm[toml]>=3.4")
-                if "setuptools_scm" not in tool:
-                    tool["setuptools_scm"] = SetuptoolsSCMTable()
-        self.__tables = {
-            "project": project,
-            "build-system": build_system,
-            "tool": tool,
+        self.__tables = {}
+        tables = {"project": project, "build-system": build_system, "tool": tool}
+        self.__loaders = {table: partial(tables.get, table) for table in tables}
+        self.__requires_setuptools_scm = False
+        self.__hooks = None
+        self.__files = None
+        self.__cache = FileCache()
+        self.__lock = threading.RLock()
+        self.__frozen = None
+        self.resolve()
+
+    @classmethod
+    def from_directory(
+        cls,
+        directory: str,
+        lazy: bool = False,
+        key: str | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> PyProjectConfiguration:
+        """Read configuration from the build files in the given directory.
+
+        :param directory: project directory
+        :param lazy: defer reading each table until it is first accessed
+        :param key: only read the files and sections that can contribute to this dotted key (other entries may be
+            incomplete), i.e. `project.dependencies`
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this configuration only, including its lazy
+            reads and rendering
+        """
+        if not isinstance(directory, Path):
+            directory = Path(directory)
+
+        sources = key_sources(key) if key is not None else None
+
+        configuration = cls.__new__(cls)
+        configuration.__tables = {}
+        configuration.__loaders = {
+            "project": partial(ProjectMetadata.from_directory, directory=directory, sources=sources),
+            "build-system": partial(BuildConfiguration.from_directory, directory=directory, sources=sources),
+            "tool": partial(ToolsTable.from_directory, directory=directory, sources=sources),
         }
+        configuration.__requires_setuptools_scm = False
+        configuration.__hooks = hooks
+        configuration.__files = None
+        # tables read from each build file, which `refresh` reuses (shared with the cache of the context, if any)
+        cache = current_cache()
+        configuration.__cache = cache if cache is not None else FileCache()
+        configuration.__lock = threading.RLock()
+        configuration.__frozen = None
+        if not lazy:
+            configuration.resolve()
+        return configuration
 
     @classmethod
-    def from_directory(cls, directory: str) -> "PyProjectConfiguration":
+    def from_files(
+        cls,
+        directory: str,
+        files: Mapping[str, bytes | None],
+        lazy: bool = False,
+        key: str | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> PyProjectConfiguration:
+        """Read configuration from build files held in memory, as if they were the files of the given directory.
+
+        :param directory: project directory, against which the files are reported (i.e. to hooks)
+        :param files: names of the files in the directory, mapped to their contents (`None` for files that are only
+            listed, such as a README); see `files.in_memory`
+        :param lazy: defer reading each table until it is first accessed
+        :param key: only read the files and sections that can contribute to this dotted key
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this configuration only
+        """
         if not isinstance(directory, Path):
             directory = Path(directory)
 
-        return cls(
-            project=ProjectMetadata.from_directory(directory=directory),
-            build_system=BuildConfiguration.from_directory(directory=directory),
-            tool=ToolsTable.from_directory(directory=directory),
-        )
+        configuration = cls.from_directory(directory, lazy=True, key=key, hooks=hooks)
+        configuration.__files = {directory: files}
+        if not lazy:
+            configuration.resolve()
+        return configuration
+
+    @classmethod
+    def from_archive(
+        cls,
+        filename: str,
+        lazy: bool = False,
+        key: str | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> PyProjectConfiguration:
+        """Read configuration from the build files of a source distribution (`.tar.gz` or `.zip`), without extracting it.
+
+        Only the top-level build files of the archive are read, into memory (see `archive.read_archive`); file
+        references, such as to a README, are resolved against the names of its other top-level files.
+
+        :param filename: path to the archive
+        :param lazy: defer reading each table until it is first accessed (the archive itself is read immediately)
+        :param key: only read the files and sections that can contribute to this dotted key
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this configuration only
+        """
+        directory, files = read_archive(filename)
+        return cls.from_files(directory, files, lazy=lazy, key=key, hooks=hooks)
+
+    @classmethod
+    def from_revision(
+        cls,
+        directory: str,
+        revision: str,
+        lazy: bool = False,
+        key: str | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> PyProjectConfiguration:
+        """Read configuration from the build files in the given directory of a local git repository, at a revision.
+
+        Build files are read from the object store of the repository into memory, through a ``git cat-file`` process
+        shared by every read from that repository (see `git.repository`); the working tree is left untouched.
+
+        :param directory: project directory, within the working tree of a git repository
+        :param revision: commit, tag, or branch, i.e. `v1.0` or `HEAD~3`
+        :param lazy: defer reading each table until it is first accessed (the files themselves are read immediately)
+        :param key: only read the files and sections that can contribute to this dotted key
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this configuration only
+        :raises ValueError: if the directory is not within a git repository, or did not exist at the revision
+        """
+        project_repository = repository(directory)
+        directory, files = project_repository.read_project(revision, project_repository.relative_path(directory))
+        return cls.from_files(directory, files, lazy=lazy, key=key, hooks=hooks)
+
+    @classmethod
+    async def afrom_directory(
+        cls,
+        directory: str,
+        key: str | None = None,
+        executor: Executor | None = None,
+        hooks: Mapping[str, Callable[..., Any]] | None = None,
+    ) -> PyProjectConfiguration:
+        """Asynchronous counterpart of `from_directory`, which reads and translates all tables in the given executor.
+
+        The call runs in a copy of the context of the current task, so the context managers around it (i.e.
+        `budget.budgeted` or `hooks.handling`) apply to it as they do to `from_directory`.
+
+        :param directory: project directory
+        :param key: only read the files and sections that can contribute to this dotted key
+        :param executor: executor in which to read files and translate configuration (by default, that of the event loop)
+        :param hooks: handlers of events (see `peppyproject.hooks`) of this configuration only
+        """
+        loop = asyncio.get_running_loop()
+        # in a copy of the current context (as by `asyncio.to_thread`), so that i.e. budgets, hooks, and caches apply
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, partial(context.run, cls.from_directory, directory, key=key, hooks=hooks))
+
+    def resolve(self) -> None:
+        """Read every table that has not yet been read."""
+        for table in self.__loaders:
+            self[table]
+
+    def __load(self, table: str) -> ConfigurationTable:
+        configuration = self.__loaders[table]()
+        if table == "project":
+            if configuration is None or len(configuration) == 0:
+                configuration = ProjectMetadata()
+        elif table == "build-system":
+            if configuration is None or len(configuration) == 0:
+                configuration = BuildConfiguration.default_setuptools()
+            project = self["project"]
+            if (
+                project["dynamic"] is not None
+                and "version" in project["dynamic"]
+                and not any("setuptools_scm" in requirement for requirement in configuration["requires"])
+            ):
+                configuration["requires"] = [*configuration["requires"], "setuptools_scm[toml]>=3.4"]
+                self.__requires_setuptools_scm = True
+        elif table == "tool":
+            if configuration is None or len(configuration) == 0:
+                configuration = ToolsTable()
+            # the `build-system` table determines whether `setuptools_scm` was added as a requirement
+            self["build-system"]
+            if self.__requires_setuptools_scm and "setuptools_scm" not in configuration:
+                configuration["setuptools_scm"] = SetuptoolsSCMTable()
+        return configuration
 
     def __getitem__(self, table: str) -> ConfigurationTable:
+        if table not in self.__tables:
+            if table not in self.__loaders:
+                raise KeyError(table)
+            with self.__lock:
+                if table not in self.__tables:
+                    with span("resolve"), calling(self.__hooks), in_memory(self.__files), caching(self.__cache):
+                        self.__tables[table] = self.__load(table)
         return self.__tables[table]
 
+    def refresh(self, changed_paths: Iterable[str]) -> list[str]:
+        """Read the given changed files again, reusing the tables read from every other file, and merge them anew.
+
+        Only tables that were already read are read again (the others stay deferred), and each only parses the changed
+        files; the tables it read from other files are reused (see `cache.FileCache`).
+
+        :param changed_paths: files of the project directory that changed, were added, or were removed (including
+            files that are only referenced by name, such as a README)
+        :return: dotted keys of the entries of each table (i.e. `project.dependencies`) that changed, in order
+        """
+        with self.__lock:
+            tables = list(self.__tables)
+            previous = self.__entries(tables)
+            self.__cache.invalidate(changed_paths)
+            self.__tables = {}
+            self.__requires_setuptools_scm = False
+            with span("refresh"):
+                for table in tables:
+                    self[table]
+            current = self.__entries(tables)
+        return sorted(key for key in {*previous, *current} if previous.get(key) != current.get(key))
+
+    def __entries(self, tables: Iterable[str]) -> dict[str, Any]:
+        with calling(self.__hooks):
+            return {f"{table}.{key}": value for table in tables for key, value in self[table].as_dict().get(table, {}).items()}
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_PyProjectConfiguration__lock"]
+        del state["_PyProjectConfiguration__cache"]
+        # the snapshot is taken again when needed
+        del state["_PyProjectConfiguration__frozen"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__cache = FileCache()
+        self.__lock = threading.RLock()
+        self.__frozen = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Retrieve a table or, given a dotted key such as `project.dependencies`, an entry within a table."""
+        table, _, subkey = key.partition(".")
+        try:
+            value = self[table]
+        except KeyError:
+            return default
+        if len(subkey) > 0:
+            value = value.get(subkey, default)
+        return value if value is not None else default
+
     @property
     def configuration(self) -> str:
-        return "\n".join(table.configuration for table in self.__tables.values())
+        with calling(self.__hooks):
+            return "\n".join(self[table].configuration for table in self.__loaders)
+
+    def as_dict(self) -> dict[str, Any]:
+        """All tables, as the dictionary that `configuration` renders as TOML."""
+        tables = {}
+        with calling(self.__hooks):
+            for table in self.__loaders:
+                tables.update(self[table].as_dict())
+        return tables
+
+    def freeze(self) -> FrozenConfigurationTable:
+        """Immutable, hashable snapshot of all tables, usable as a dictionary key or for deduplication.
+
+        Tables that did not change since the last snapshot are reused from it (see `ConfigurationTable.freeze`).
+        """
+        tables = {table: self[table].freeze() for table in self.__loaders}
+        frozen = self.__frozen
+        if frozen is None or any(frozen[table] is not table_frozen for table, table_frozen in tables.items()):
+            frozen = FrozenConfigurationTable(tables)
+            self.__frozen = frozen
+        return frozen
 
-    def to_file(self, filename: str):
-        with open(filename, "w") as configuration_file:
-            configuration_file.write(self.configuration)
+    def to_file(self, filename: str) -> bool:
+        """Render the configuration to the given file, unless it is unchanged (see `files.write_file`).
+
+        :return: whether the file was written
+        """
+        return write_file(filename, self.configuration)
 
     def __len__(self) -> int:
-        return len(self.__tables)
+        return len(self.__loaders)
 
     def __iter__(self) -> Iterator:
-        yield from self.__tables
+        yield from self.__loaders
 
     def __repr__(self) -> str:
         tables_string = ", ".join(
@@ -67,3 +320,52 @@ class PyProjectConfiguration(Mapping):
             if value is not None and (not hasattr(value, "__len__") or len(value) > 0)
         )
         return f"{self.__class__.__name__}({tables_string})"
+
+
+async def aconvert_many(
+    directories: Iterable[str],
+    key: str | None = None,
+    executor: Executor | None = None,
+    limit: int = 8,
+    return_exceptions: bool = False,
+) -> AsyncIterator[tuple[Path, PyProjectConfiguration | Exception]]:
+    """Read configuration from many directories concurrently, yielding each as soon as it is ready.
+
+    :param directories: project directories
+    :param key: only read the files and sections that can contribute to this dotted key
+    :param executor: executor in which to read files and translate configuration (by default, that of the event loop)
+    :param limit: maximum number of conversions in flight at once
+    :param return_exceptions: yield exceptions in place of configuration instead of raising them
+    :return: pairs of project directory and its configuration, in order of completion
+    """
+    if limit < 1:
+        message = f"limit must be positive, not {limit}"
+        raise ValueError(message)
+
+    directories = iter(directories)
+    pending = {}
+    try:
+        while True:
+            for directory in directories:
+                directory = Path(directory)
+                task = asyncio.ensure_future(
+                    PyProjectConfiguration.afrom_directory(directory, key=key, executor=executor),
+                )
+                pending[task] = directory
+                if len(pending) >= limit:
+                    break
+            if len(pending) == 0:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                directory = pending.pop(task)
+                error = task.exception()
+                if error is not None:
+                    if not return_exceptions:
+                        raise error
+                    yield directory, error
+                else:
+                    yield directory, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -3,11 +3,21 @@ from __future__ import annotations
 
 import ast
 import contextlib
+import hashlib
+import os
 import re
+import secrets
+import time
 import warnings
-from collections.abc import Collection, Mapping
+from collections.abc import Collection, Iterator, Mapping
+from contextvars import ContextVar
+from io import BytesIO, TextIOWrapper
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
+
+from peppyproject.budget import check_statements, check_time
+from peppyproject.hooks import dispatch
+from peppyproject.profiling import span
 
 SETUP_CFG_INDENT = " " * 4
 SETUP_CFG = {
@@ -34,6 +44,142 @@ SETUP_CFG = {
     },
 }
 
+# build files read by `ConfigurationTable.from_directory`, in order of increasing precedence
+KNOWN_FILENAMES = ("pyproject.toml", "setup.cfg", "setup.py")
+# files modified more recently than this may be edited again within the granularity of their modification time (up to
+# two seconds on FAT and some network filesystems), so they are also compared by content, as git does for "racily clean"
+# files
+RACY_NANOSECONDS = 2 * 10**9
+
+# files of project directories that are read from memory (i.e. from an archive) instead of from disk, by directory; each
+# maps the names of the files in the directory to their contents, or to `None` for files that are listed but not read
+_in_memory: ContextVar[Mapping[Path, Mapping[str, bytes | None]] | None] = ContextVar("peppyproject_in_memory", default=None)
+
+
+@contextlib.contextmanager
+def in_memory(directories: Mapping[Path, Mapping[str, bytes | None]] | None) -> Iterator[None]:
+    """Read the files of the given project directories from memory, for reads within the context in the current thread.
+
+    :param directories: names and contents of the files of each project directory (see `archive.read_archive`)
+    """
+    if directories is None or len(directories) == 0:
+        yield
+        return
+
+    token = _in_memory.set(
+        {**(_in_memory.get() or {}), **{Path(directory): files for directory, files in directories.items()}}
+    )
+    try:
+        yield
+    finally:
+        _in_memory.reset(token)
+
+
+def list_files(directory: Path) -> list[str]:
+    """Names of the files in the given project directory, on disk or in memory."""
+    files = (_in_memory.get() or {}).get(directory)
+    if files is not None:
+        return list(files)
+    return [filename.name for filename in directory.iterdir() if filename.is_file()]
+
+
+def open_file(filename: Path, binary: bool = False) -> IO:
+    """Open the given file for reading, from memory if its project directory is read from memory (see `in_memory`)."""
+    files = (_in_memory.get() or {}).get(filename.parent)
+    if files is None:
+        return open(filename, "rb" if binary else "r")
+    content = files.get(filename.name)
+    if content is None:
+        message = f"{filename} was not read into memory"
+        raise FileNotFoundError(message)
+    return BytesIO(content) if binary else TextIOWrapper(BytesIO(content))
+
+
+def file_size(filename: Path) -> int:
+    """Size of the given file in bytes, on disk or in memory."""
+    files = (_in_memory.get() or {}).get(filename.parent)
+    if files is None:
+        return filename.stat().st_size
+    return len(files.get(filename.name) or b"")
+
+
+def file_signature(filename: Path) -> tuple | bytes:
+    """Signature that changes whenever the content of the given file does; on disk, see `stat_signature`."""
+    files = (_in_memory.get() or {}).get(filename.parent)
+    if files is None:
+        return stat_signature(filename, filename.stat())
+    return hashlib.sha256(files.get(filename.name) or b"").digest()
+
+
+def stat_signature(filename: Path, stat: os.stat_result) -> tuple:
+    """Modification time and size of the given file on disk, with a digest of its content if it is racily clean.
+
+    A file modified within `RACY_NANOSECONDS` of now could be edited again without changing its modification time or
+    size (i.e. on a filesystem with coarse timestamps), so its content is compared as well (see `unchanged`).
+    """
+    if time.time_ns() - stat.st_mtime_ns < RACY_NANOSECONDS:
+        return stat.st_mtime_ns, stat.st_size, hashlib.sha256(filename.read_bytes()).digest()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def unchanged(filename: Path, previous: tuple, current: tuple) -> bool:
+    """Whether the given file is unchanged between two of its signatures from `stat_signature`.
+
+    If the earlier signature was racily clean, the content of the file is compared with it even once the later one is
+    not.
+    """
+    if previous[:2] != current[:2]:
+        return False
+    if len(previous) == 2:
+        return True
+    digest = current[2] if len(current) > 2 else hashlib.sha256(filename.read_bytes()).digest()
+    return previous[2] == digest
+
+
+def write_file(filename: Path, content: str) -> bool:
+    """Write the given content to the given file, unless the file already has exactly that content.
+
+    An unchanged file is left untouched (including its modification time), so that build caches and file watchers are
+    not invalidated. Otherwise, the file is replaced atomically (see `replace_file`).
+
+    :return: whether the file was written; either way, a ``file_written`` / ``file_unchanged`` event is dispatched (see
+        `peppyproject.hooks`)
+    """
+    filename = Path(filename)
+    encoded = content.encode()
+    with contextlib.suppress(FileNotFoundError):
+        # comparing sizes first avoids reading files that changed length
+        if filename.stat().st_size == len(encoded) and filename.read_bytes() == encoded:
+            dispatch("file_unchanged", filename=filename)
+            return False
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    replace_file(filename, encoded)
+    dispatch("file_written", filename=filename)
+    return True
+
+
+def replace_file(filename: Path, content: bytes) -> None:
+    """Replace the given file atomically with the given content, keeping the mode of an existing file.
+
+    The content is written to a temporary file in the same directory, which then replaces the file, so that readers
+    never see a partially written file.
+    """
+    # created by `open` (unlike `tempfile`), so that a new file gets the default mode under the current umask
+    temporary = filename.parent / f".{filename.name}.{secrets.token_hex(4)}"
+    try:
+        with open(temporary, "xb") as temporary_file:
+            temporary_file.write(content)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        with contextlib.suppress(FileNotFoundError):
+            temporary.chmod(filename.stat().st_mode)
+        temporary.replace(filename)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
 PYTHON_LINE = {
     "continuing": ["\\", ",", "(", "{", "[", ":"],
     "ending": [")", "}", "]"],
@@ -107,6 +253,7 @@ def parse_function_parameters(
         else:
             parameter_index += 1
     for parameter in parameters:
+        check_time()
         name, value = parameter.strip().split("=", 1)
         name = name.strip()
         value = value.strip()
@@ -161,12 +308,13 @@ def read_python_file(filename: str) -> list[str]:
     if not isinstance(filename, Path):
         filename = Path(filename)
 
-    with open(filename) as script_file:
+    with span("read"), open_file(filename) as script_file:
         lines = script_file.readlines()
 
     statements = []
     index = 0
     while index < len(lines):
+        check_time()
         statements, index = python_statement(
             lines=lines,
             index=index,
@@ -194,19 +342,23 @@ def read_python_file(filename: str) -> list[str]:
 
 def read_setup_py(filename: str) -> dict[str, Any]:
     statements = read_python_file(filename)
+    check_statements(statements)
 
     setup_parameters = {}
     setup_calls = {index: statement for index, statement in enumerate(statements) if "setup(" in statement}
 
     if len(setup_calls) > 0:
         if len(setup_calls) > 1:
-            warnings.warn(f"multiple setup calls found; {setup_calls}")
+            # the message does not include the calls themselves, which would grow the warnings registry with every
+            # distinct `setup.py` in a long-running batch
+            warnings.warn(f"multiple setup calls found ({len(setup_calls)}); using the last")
         setup_call_index, setup_call = next(reversed(setup_calls.items()))
 
         statements.pop(setup_call_index)
 
         variables = {}
         for statement in statements:
+            check_time()
             if "=" in statement:
                 name, value = statement.strip().split("=", 1)
                 for variable in variables:
@@ -223,6 +375,105 @@ def read_setup_py(filename: str) -> dict[str, Any]:
             variables=variables,
         )
 
+    return normalize_setup_parameters(setup_parameters)
+
+
+def read_setup_py_literals(filename: str) -> dict[str, Any]:
+    """Literal arguments of the last `setup()` call in the given script, from its syntax tree.
+
+    A cheaper (linear-time) fallback of `read_setup_py` for scripts over budget (see `peppyproject.budget`). Arguments
+    are followed through variables assigned literals, concatenation, `open(...).read()` and `glob.glob(...)` (given as
+    the file name or pattern, as by `read_setup_py`), and `find_packages(...)`; other arguments are left out.
+
+    :raises SyntaxError: if the script is not valid Python
+    """
+    if not isinstance(filename, Path):
+        filename = Path(filename)
+
+    with span("read"), open_file(filename) as script_file:
+        source = script_file.read()
+    module = ast.parse(source, filename=str(filename))
+
+    variables = {}
+    setup_call = None
+    for node in ast.walk(module):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            with contextlib.suppress(*LITERAL_ERRORS):
+                variables[node.targets[0].id] = _literal(node.value, variables)
+        elif isinstance(node, ast.Call) and _call_name(node) == "setup":
+            setup_call = node
+
+    setup_parameters = {}
+    if setup_call is not None:
+        for keyword in setup_call.keywords:
+            with contextlib.suppress(*LITERAL_ERRORS):
+                value = _literal(keyword.value, variables)
+                if keyword.arg is not None:
+                    setup_parameters[keyword.arg] = value
+                elif isinstance(value, Mapping):
+                    setup_parameters.update(value)
+
+    return normalize_setup_parameters(setup_parameters)
+
+
+# errors of expressions that `_literal` cannot follow
+LITERAL_ERRORS = (ValueError, TypeError, KeyError, IndexError, AttributeError, MemoryError, RecursionError)
+# longest sequence built by concatenation in `_literal`, beyond which repeated doubling (`A = A + A`) is cut off
+MAXIMUM_LITERAL_LENGTH = 100_000
+
+
+def _literal(node: ast.expr, variables: Mapping[str, Any]) -> Any:  # noqa: PLR0911 - one return per kind of node
+    """Value of the given expression, if it is made of literals and the given variables.
+
+    :raises ValueError: if the expression is anything else
+    """
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError(node.id)
+        return variables[node.id]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        elements = [_literal(element, variables) for element in node.elts]
+        return {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)](elements)
+    if isinstance(node, ast.Dict):
+        value = {}
+        for key, entry in zip(node.keys, node.values):
+            if key is None:
+                value.update(_literal(entry, variables))
+            else:
+                value[_literal(key, variables)] = _literal(entry, variables)
+        return value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        value = _literal(node.left, variables) + _literal(node.right, variables)
+        if len(value) > MAXIMUM_LITERAL_LENGTH:
+            message = f"concatenation longer than {MAXIMUM_LITERAL_LENGTH}"
+            raise ValueError(message)
+        return value
+    if isinstance(node, ast.Call):
+        name = _call_name(node)
+        if name == "read" and isinstance(node.func.value, ast.Call) and _call_name(node.func.value) == "open":
+            return _literal(node.func.value.args[0], variables)
+        if name == "glob":
+            return _literal(node.args[0], variables)
+        if name in ("find_packages", "find_namespace_packages"):
+            return {
+                "find": {
+                    keyword.arg: _literal(keyword.value, variables) for keyword in node.keywords if keyword.arg is not None
+                },
+            }
+    return ast.literal_eval(node)
+
+
+def _call_name(node: ast.Call) -> str | None:
+    """Name of the function called, i.e. `setup` of both `setup(...)` and `setuptools.setup(...)`."""
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def normalize_setup_parameters(setup_parameters: dict[str, Any]) -> dict[str, Any]:
+    """Rename the empty keys of mappings (i.e. in `package_data`, meaning all packages) to `*`."""
     for parameter in list(setup_parameters):
         value = setup_parameters[parameter]
         if isinstance(value, Mapping) and any(key == "" for key in value):
@@ -231,6 +482,89 @@ def read_setup_py(filename: str) -> dict[str, Any]:
     return setup_parameters
 
 
+# keys derived (by `PyProjectConfiguration`) from keys of other tables, i.e. `setuptools_scm` is added as a build
+# requirement, and configured, for a project with a dynamic version
+DERIVED_KEYS = {
+    "build-system.requires": ["project.dynamic"],
+    "tool.setuptools_scm": ["build-system.requires"],
+}
+
+# sections that `ini2toml` translates into the table of a tool other than their own (`None` for any section): the
+# non-standard metadata of `setuptools` (i.e. `platforms`), and the commands of `distutils` (i.e. `[upload_docs]`)
+TOOL_SECTIONS = {"setuptools": ["metadata"], "distutils": None}
+
+
+def key_sources(key: str) -> dict[str, list[str] | None]:
+    """Build files that can contribute to the given dotted key, i.e. `project.dependencies` or `tool.ruff.line-length`.
+
+    Includes the sources of the keys that the key is derived from (see `DERIVED_KEYS`).
+
+    :param key: dotted key of the `pyproject.toml` configuration
+    :return: mapping of filenames to the INI sections within them that can contribute to the key (`None` for all)
+    """
+    sources = _table_sources(key)
+    for derived_key, source_keys in DERIVED_KEYS.items():
+        # a key within the derived key, or a table containing it
+        if f"{key}.".startswith(f"{derived_key}.") or derived_key.startswith(f"{key}."):
+            for source_key in source_keys:
+                for filename, sections in key_sources(source_key).items():
+                    if filename not in sources:
+                        sources[filename] = sections
+                    elif sources[filename] is not None:
+                        sources[filename] = (
+                            None
+                            if sections is None
+                            else [*sources[filename], *(section for section in sections if section not in sources[filename])]
+                        )
+    return sources
+
+
+def _table_sources(key: str) -> dict[str, list[str] | None]:
+    parts = key.split(".")
+    table = ".".join(parts[:2]) if parts[0] == "tool" else parts[0]
+
+    setup_cfg_sections = [
+        section_name
+        for section_name, section in SETUP_CFG.items()
+        if any(target == table or target.startswith(f"{table}.") for target in section.values())
+    ]
+    tool_sections = TOOL_SECTIONS.get(parts[1], []) if table.startswith("tool.") else []
+    if tool_sections is not None:
+        setup_cfg_sections.extend(section_name for section_name in tool_sections if section_name not in setup_cfg_sections)
+
+    sources = {"pyproject.toml": None}
+    if table == "tool" or tool_sections is None:
+        sources["setup.cfg"] = None
+    elif table.startswith("tool."):
+        # tools are configured in their own sections, i.e. `[flake8]`, `[coverage:run]`, or `[tool:pytest]`
+        sources["setup.cfg"] = [*setup_cfg_sections, parts[1], f"tool:{parts[1]}"]
+    else:
+        sources["setup.cfg"] = setup_cfg_sections
+    if len(setup_cfg_sections) > 0:
+        # `setup.py` is only translated through the `SETUP_CFG` mapping
+        sources["setup.py"] = setup_cfg_sections
+    return sources
+
+
+def select_ini_sections(ini_string: str, sections: Collection[str]) -> str:
+    """Keep only the given sections of an INI string, along with any of their subsections.
+
+    For instance, `[options]` also keeps `[options.extras_require]`, and `[coverage]` also keeps `[coverage:run]`.
+    """
+    selected_lines = []
+    selected = False
+    for line in ini_string.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            section_name = stripped[1:-1].strip()
+            selected = any(
+                section_name == section or section_name.startswith((f"{section}.", f"{section}:")) for section in sections
+            )
+        if selected:
+            selected_lines.append(line)
+    return "".join(selected_lines)
+
+
 def inify(value: Any, indent: str | None = None) -> str:
     if indent is None:
         indent = SETUP_CFG_INDENT
@@ -0,0 +1,232 @@
+"""reading of the build files of a project at a revision of its local git repository, without checking it out.
+
+Objects are read from a single long-lived ``git cat-file --batch`` process per repository, which works offline against
+a local clone and never touches its working tree::
+
+    directory, files = repository("path/to/clone").read_project("v1.0")
+    with in_memory({directory: files}):
+        table = ProjectMetadata.from_directory(directory)
+"""
+
+from __future__ import annotations
+
+import atexit
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+
+from peppyproject.archive import is_build_file
+from peppyproject.profiling import span
+
+# modes of tree entries that are files (regular, executable, and symbolic links)
+FILE_MODES = (b"100644", b"100755", b"120000")
+
+
+class Repository:
+    """local git repository, from which objects are read through a ``git cat-file --batch`` process.
+
+    The process is started on the first read, and is shared (under a lock) by every thread reading from the
+    repository.
+    """
+
+    def __init__(self, path: str):
+        """:param path: working tree, or any directory within it
+        :raises FileNotFoundError: if git is not installed
+        :raises ValueError: if the path is not within a git repository
+        """
+        self.git = shutil.which("git")
+        if self.git is None:
+            message = "reading a git repository requires git, which was not found"
+            raise FileNotFoundError(message)
+        try:
+            toplevel = subprocess.run(  # noqa: S603 - fixed arguments, without a shell
+                [self.git, "rev-parse", "--show-toplevel"],
+                cwd=path,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.strip()
+        except subprocess.CalledProcessError as error:
+            message = f"{path} is not within a git repository: {error.stderr.strip()}"
+            raise ValueError(message) from error
+        self.path = Path(toplevel)
+        self.__process = None
+        self.__lock = threading.Lock()
+
+    def read_object(self, name: str) -> tuple[str, str, bytes]:
+        """Read an object by name, i.e. an object ID, `v1.0^{tree}`, or `HEAD:setup.py`.
+
+        :return: object ID, type (`blob`, `tree`, ...), and content
+        :raises ValueError: if there is no such object
+        """
+        if "\n" in name:
+            message = f"invalid object name {name!r}"
+            raise ValueError(message)
+        with span("git.read_object", object=name), self.__lock:
+            if self.__process is None or self.__process.poll() is not None:
+                self.__process = subprocess.Popen(  # noqa: S603 - object names are written to stdin, not run
+                    [self.git, "cat-file", "--batch"],
+                    cwd=self.path,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                )
+            self.__process.stdin.write(name.encode() + b"\n")
+            self.__process.stdin.flush()
+            header = self.__process.stdout.readline().decode().split()
+            if len(header) != 3:
+                message = f'"{name}" not found in {self.path}'
+                raise ValueError(message)
+            object_id, object_type, size = header
+            content = self.__process.stdout.read(int(size) + 1)[:-1]
+        return object_id, object_type, content
+
+    def read_tree(self, name: str) -> dict[str, tuple[bytes, str]]:
+        """Entries of a tree, by name.
+
+        :param name: name of the tree, i.e. `v1.0^{tree}` or `v1.0:src`
+        :return: mode and object ID of each entry
+        :raises ValueError: if there is no such object, or it is not a tree
+        """
+        object_id, object_type, content = self.read_object(name)
+        if object_type != "tree":
+            message = f'"{name}" is a {object_type}, not a tree'
+            raise ValueError(message)
+        # each entry is `<mode> <name>\0<binary object ID>`, with object IDs as long as that of the tree itself
+        id_length = len(object_id) // 2
+        entries = {}
+        index = 0
+        while index < len(content):
+            separator = content.index(b"\0", index)
+            mode, entry_name = content[index:separator].split(b" ", 1)
+            entries[entry_name.decode()] = (mode, content[separator + 1 : separator + 1 + id_length].hex())
+            index = separator + 1 + id_length
+        return entries
+
+    def tree_id(self, revision: str, directory: str = ".") -> str:
+        """ID of the tree of the given directory (relative to the root of the repository) at the given revision."""
+        object_id, _, _ = self.read_object(tree_name(revision, directory))
+        return object_id
+
+    def list_files(self, revision: str, directory: str = ".") -> dict[str, str]:
+        """Files (not subdirectories) in the given directory at the given revision.
+
+        :param revision: commit, tag, or branch, i.e. `v1.0` or `HEAD~3`
+        :param directory: directory, relative to the root of the repository
+        :return: object ID of each file, by name
+        """
+        return {
+            name: object_id
+            for name, (mode, object_id) in self.read_tree(tree_name(revision, directory)).items()
+            if mode in FILE_MODES
+        }
+
+    def read_project(self, revision: str, directory: str = ".") -> tuple[Path, dict[str, bytes | None]]:
+        """Read the files of the project in the given directory at the given revision.
+
+        Only the contents of build files are read; the names of the other files (i.e. the README and license) are
+        listed.
+
+        :param revision: commit, tag, or branch, i.e. `v1.0` or `HEAD~3`
+        :param directory: project directory, relative to the root of the repository
+        :return: project directory (within the working tree) and the names of its files, mapped to their contents
+            (`None` for files that were not read); suitable for `files.in_memory`
+        """
+        files = {
+            name: self.read_object(object_id)[2] if is_build_file(name) else None
+            for name, object_id in self.list_files(revision, directory).items()
+        }
+        return self.path / directory, files
+
+    def commits(self, revision_range: str = "HEAD") -> list[str]:
+        """IDs of the commits in the given range (i.e. `v1.0..main`), oldest first, following only first parents.
+
+        :raises ValueError: if the range is invalid
+        """
+        try:
+            rev_list = subprocess.run(  # noqa: S603 - fixed arguments, without a shell
+                [self.git, "rev-list", "--reverse", "--first-parent", "--end-of-options", revision_range],
+                cwd=self.path,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        except subprocess.CalledProcessError as error:
+            message = f'invalid range "{revision_range}" in {self.path}: {error.stderr.strip()}'
+            raise ValueError(message) from error
+        return rev_list.split()
+
+    def relative_path(self, path: str) -> Path:
+        """Given path within the working tree, relative to the root of the repository."""
+        return Path(path).resolve().relative_to(self.path.resolve())
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__process is not None:
+                self.__process.stdin.close()
+                self.__process.wait()
+                self.__process.stdout.close()
+                self.__process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def tree_name(revision: str, directory: str = ".") -> str:
+    """Name of the tree of the given directory (relative to the root of the repository) at the given revision."""
+    directory = PurePosixPath(Path(directory).as_posix())
+    return f"{revision}^{{tree}}" if directory == PurePosixPath() else f"{revision}:{directory}"
+
+
+# most repositories whose ``git cat-file`` processes are kept running; beyond that, the least recently used is closed
+MAXIMUM_REPOSITORIES = 32
+
+# repositories by their root, from least to most recently used
+_repositories: OrderedDict[Path, Repository] = OrderedDict()
+# roots of the repositories, by every path they were requested for
+_roots: dict[Path, Path] = {}
+_repositories_lock = threading.Lock()
+
+
+def repository(path: str) -> Repository:
+    """Repository containing the given path, reusing its ``git cat-file`` process across calls.
+
+    At most `MAXIMUM_REPOSITORIES` processes are kept running; the least recently used repository is closed beyond that
+    (and starts its process again if it is still being read from).
+
+    :raises ValueError: if the path is not within a git repository
+    """
+    path = Path(path).resolve()
+    with _repositories_lock:
+        root = _roots.get(path)
+        if root in _repositories:
+            _repositories.move_to_end(root)
+            return _repositories[root]
+    new = Repository(path)
+    root = new.path.resolve()
+    evicted = []
+    with _repositories_lock:
+        existing = _repositories.setdefault(root, new)
+        _repositories.move_to_end(root)
+        _roots[path] = root
+        while len(_repositories) > MAXIMUM_REPOSITORIES:
+            evicted_root, evicted_repository = _repositories.popitem(last=False)
+            for alias in [alias for alias, alias_root in _roots.items() if alias_root == evicted_root]:
+                del _roots[alias]
+            evicted.append(evicted_repository)
+    for evicted_repository in evicted:
+        evicted_repository.close()
+    return existing
+
+
+@atexit.register
+def _close_repositories() -> None:
+    with _repositories_lock:
+        for existing in _repositories.values():
+            existing.close()
+        _repositories.clear()
+        _roots.clear()
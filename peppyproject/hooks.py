@@ -0,0 +1,166 @@
+"""events of a conversion, to which handlers can be registered globally or for a single call.
+
+Handlers of notifications are called with the keyword arguments of the event, in the thread in which it occurred:
+
+- ``file_discovered(filename)``: a build file was found in a project directory, and will be read
+- ``file_read(filename)``: a build file is about to be read
+- ``file_skipped(filename)``: a build file was not read, because it cannot contribute to the requested configuration
+  or is larger than its budget allows
+- ``budget_exceeded(filename, limit)``: a build file exceeded a limit of its budget (see `peppyproject.budget`), i.e.
+  ``bytes``, ``statements``, or ``seconds``
+- ``file_written(filename)`` / ``file_unchanged(filename)``: rendered configuration was written to a file / was not
+  written, because the file already had that content (see `files.write_file`)
+- ``table_merged(table, filename)``: the table read from a build file was merged into the table of the project
+- ``cache_hit(cache)`` / ``cache_miss(cache)``: a cached object, such as the ``ini2toml`` translator, was reused /
+  had to be created
+- ``project_converted(directory)``: a project was converted by `peppyproject.batch.convert`
+- ``project_failed(directory, error)``: a project could not be converted by `peppyproject.batch.convert`
+
+Handlers of transformations are called with a value (positionally) and the keyword arguments of the event, and may
+return a replacement for that value (or `None` to keep it):
+
+- ``section_translated(toml_string, filename, sections)``: TOML translated from the given sections of an INI file
+  (`None` for all sections) or of the configuration of a ``setup.py``
+- ``file_parsed(configuration, filename)``: dictionary of all tables parsed from a build file, before it is read into a
+  table
+- ``value_coerced(value, table, key)``: value of an entry of a table, after conversion to the type in its schema
+- ``rendered(toml_string, table)``: TOML rendered from a table
+
+::
+
+    def homepage_to_urls(configuration, filename):
+        project = configuration.get("project", {})
+        if "homepage" in project:
+            project.setdefault("urls", {})["homepage"] = project.pop("homepage")
+
+    register("file_parsed", homepage_to_urls)  # or, for a single call:
+    PyProjectConfiguration.from_directory(directory, hooks={"file_parsed": homepage_to_urls})
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Mapping
+
+NOTIFICATIONS = (
+    "file_discovered",
+    "file_read",
+    "file_skipped",
+    "budget_exceeded",
+    "table_merged",
+    "file_written",
+    "file_unchanged",
+    "cache_hit",
+    "cache_miss",
+    "project_converted",
+    "project_failed",
+)
+TRANSFORMATIONS = (
+    "section_translated",
+    "file_parsed",
+    "value_coerced",
+    "rendered",
+)
+EVENTS = NOTIFICATIONS + TRANSFORMATIONS
+
+# handlers of each event are replaced as a whole (never mutated), so that dispatch needs no lock
+_handlers: dict[str, tuple[Callable[..., Any], ...]] = {}
+_handlers_lock = threading.Lock()
+# handlers of the current call, by event, which are only seen by the thread (or task) that made the call
+_call_handlers: ContextVar[dict[str, tuple[Callable[..., Any], ...]] | None] = ContextVar(
+    "peppyproject_call_handlers",
+    default=None,
+)
+
+
+def _check_event(event: str) -> None:
+    if event not in EVENTS:
+        message = f'unknown event "{event}"; expected one of {EVENTS}'
+        raise ValueError(message)
+
+
+def register(event: str, handler: Callable[..., Any]) -> None:
+    """Call the given handler whenever the given event occurs (in any thread)."""
+    _check_event(event)
+    with _handlers_lock:
+        _handlers[event] = (*_handlers.get(event, ()), handler)
+
+
+def unregister(event: str, handler: Callable[..., Any]) -> None:
+    with _handlers_lock:
+        handlers = list(_handlers.get(event, ()))
+        handlers.remove(handler)
+        if len(handlers) > 0:
+            _handlers[event] = tuple(handlers)
+        else:
+            del _handlers[event]
+
+
+@contextmanager
+def handling(handlers: Mapping[str, Callable[..., Any]]) -> Iterator[None]:
+    """Register the given handlers, by event, for the duration of the context."""
+    registered = []
+    try:
+        for event, handler in handlers.items():
+            register(event, handler)
+            registered.append((event, handler))
+        yield
+    finally:
+        for event, handler in registered:
+            unregister(event, handler)
+
+
+@contextmanager
+def calling(handlers: Mapping[str, Callable[..., Any]] | None) -> Iterator[None]:
+    """Call the given handlers, by event, for events within the context in the current thread (or task) only.
+
+    Unlike `handling`, other threads converting at the same time are unaffected; handlers of enclosing calls still apply.
+    """
+    if handlers is None or len(handlers) == 0:
+        yield
+        return
+
+    call_handlers = dict(_call_handlers.get() or {})
+    for event, handler in handlers.items():
+        _check_event(event)
+        call_handlers[event] = (*call_handlers.get(event, ()), handler)
+
+    token = _call_handlers.set(call_handlers)
+    try:
+        yield
+    finally:
+        _call_handlers.reset(token)
+
+
+def dispatch(event: str, /, **arguments: Any) -> None:
+    """Call every handler of the given notification with the given arguments."""
+    handlers = _handlers.get(event)
+    if handlers is not None:
+        for handler in handlers:
+            handler(**arguments)
+    call_handlers = _call_handlers.get()
+    if call_handlers is not None and event in call_handlers:
+        for handler in call_handlers[event]:
+            handler(**arguments)
+
+
+def transform(event: str, value: Any, /, **arguments: Any) -> Any:
+    """Pass the given value through every handler of the given transformation, returning the (replaced) value."""
+    handlers = _handlers.get(event)
+    if handlers is not None:
+        for handler in handlers:
+            result = handler(value, **arguments)
+            if result is not None:
+                value = result
+    call_handlers = _call_handlers.get()
+    if call_handlers is not None and event in call_handlers:
+        for handler in call_handlers[event]:
+            result = handler(value, **arguments)
+            if result is not None:
+                value = result
+    return value
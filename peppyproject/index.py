@@ -0,0 +1,281 @@
+"""SQLite index of converted configuration, for queries across many projects without parsing their ``pyproject.toml``.
+
+Each project is written to normalized tables (project fields, dependencies and their extras, entry points, and the
+flattened keys of each tool), with indexes on what is queried across a fleet of projects::
+
+    with SQLiteIndex("projects.db") as index:
+        for directory in discover(roots):
+            index.add(directory, PyProjectConfiguration.from_directory(directory))
+
+    SELECT directory FROM projects JOIN dependencies USING (project_id) WHERE dependencies.name = 'numpy';
+    SELECT directory FROM projects JOIN tool_keys USING (project_id) WHERE tool = 'flake8';
+    SELECT directory FROM projects JOIN tool_keys USING (project_id)
+        WHERE tool = 'ruff' AND key = 'line-length' AND number > 120;
+
+Projects are added from any thread, and written in batches, each in a single transaction; adding a project that is
+already in the index (or already waiting to be written) replaces it. Projects are identified by their resolved path.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from peppyproject.check import normalize
+from peppyproject.profiling import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from peppyproject.configuration import PyProjectConfiguration
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project_id INTEGER PRIMARY KEY,
+    directory TEXT NOT NULL UNIQUE,
+    name TEXT,
+    version TEXT,
+    requires_python TEXT,
+    build_backend TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_name ON projects (name);
+CREATE TABLE IF NOT EXISTS project_fields (
+    project_id INTEGER NOT NULL REFERENCES projects ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS project_fields_key ON project_fields (key, value);
+CREATE INDEX IF NOT EXISTS project_fields_project ON project_fields (project_id);
+CREATE TABLE IF NOT EXISTS dependencies (
+    project_id INTEGER NOT NULL REFERENCES projects ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    extra TEXT,
+    requirement TEXT NOT NULL,
+    name TEXT NOT NULL,
+    extras TEXT,
+    specifier TEXT,
+    marker TEXT
+);
+CREATE INDEX IF NOT EXISTS dependencies_name ON dependencies (name, specifier);
+CREATE INDEX IF NOT EXISTS dependencies_extra ON dependencies (extra);
+CREATE INDEX IF NOT EXISTS dependencies_project ON dependencies (project_id);
+CREATE TABLE IF NOT EXISTS entry_points (
+    project_id INTEGER NOT NULL REFERENCES projects ON DELETE CASCADE,
+    "group" TEXT NOT NULL,
+    name TEXT NOT NULL,
+    object TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entry_points_group ON entry_points ("group", name);
+CREATE INDEX IF NOT EXISTS entry_points_project ON entry_points (project_id);
+CREATE TABLE IF NOT EXISTS tool_keys (
+    project_id INTEGER NOT NULL REFERENCES projects ON DELETE CASCADE,
+    tool TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    number REAL
+);
+CREATE INDEX IF NOT EXISTS tool_keys_key ON tool_keys (tool, key, number);
+CREATE INDEX IF NOT EXISTS tool_keys_project ON tool_keys (project_id);
+"""
+
+# name, extras, version specifier (with or without parentheses) or URL, and environment marker of a PEP 508 requirement
+REQUIREMENT = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:\[(?P<extras>[^\]]*)\])?"
+    r"\s*(?:\(\s*(?P<parenthesized>[^)]*?)\s*\)|(?P<specifier>[^;]*?))\s*(?:;\s*(?P<marker>.*?)\s*)?$"
+)
+# groups of entry points given by their own tables in `pyproject.toml`
+SCRIPT_GROUPS = {"scripts": "console_scripts", "gui-scripts": "gui_scripts"}
+
+
+def parse_requirement(requirement: str) -> dict[str, str | None]:
+    """Normalized name (as by PEP 503), extras, version specifier, and environment marker of the given requirement.
+
+    Unparseable requirements are indexed by their whole string as their name.
+    """
+    match = REQUIREMENT.match(requirement)
+    if match is None:
+        return {"name": requirement.strip().lower(), "extras": None, "specifier": None, "marker": None}
+    specifier = match["parenthesized"] if match["parenthesized"] is not None else match["specifier"]
+    return {
+        "name": re.sub(r"[-_.]+", "-", match["name"]).lower(),
+        "extras": ",".join(sorted(extra.strip() for extra in match["extras"].split(","))) if match["extras"] else None,
+        "specifier": specifier.replace(" ", "") if specifier else None,
+        "marker": match["marker"] or None,
+    }
+
+
+def flatten(table: Mapping[str, Any], key: str = "") -> Iterator[tuple[str, Any]]:
+    """Dotted keys and values of the entries of the given table and of its subtables (but not of arrays of tables)."""
+    for entry, value in table.items():
+        entry_key = f"{key}.{entry}" if len(key) > 0 else entry
+        if isinstance(value, Mapping) and len(value) > 0:
+            yield from flatten(value, key=entry_key)
+        else:
+            yield entry_key, value
+
+
+def _text(value: Any) -> str | None:
+    """Strings as they are, and other values as JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def rows(configuration: PyProjectConfiguration) -> dict[str, list[tuple]]:
+    """Rows of each table of the index (other than the project ID) for the given configuration."""
+    tables = normalize(configuration.as_dict())
+    project = tables.get("project", {})
+    build_system = tables.get("build-system", {})
+
+    dependencies = [("build", None, requirement) for requirement in build_system.get("requires", [])]
+    dependencies.extend(("runtime", None, requirement) for requirement in project.get("dependencies", []))
+    dependencies.extend(
+        ("optional", extra, requirement)
+        for extra, requirements in project.get("optional-dependencies", {}).items()
+        for requirement in requirements
+    )
+
+    entry_points = [
+        (group, name, entry_point)
+        for table, group in SCRIPT_GROUPS.items()
+        for name, entry_point in project.get(table, {}).items()
+    ]
+    entry_points.extend(
+        (group, name, entry_point)
+        for group, group_entry_points in project.get("entry-points", {}).items()
+        for name, entry_point in group_entry_points.items()
+    )
+
+    tool_keys = []
+    for tool, tool_table in tables.get("tool", {}).items():
+        if isinstance(tool_table, Mapping) and len(tool_table) > 0:
+            tool_keys.extend((tool, key, _text(value), _number(value)) for key, value in flatten(tool_table))
+        else:
+            # a tool that is configured by an empty table (i.e. `[tool.setuptools_scm]`) is still configured
+            tool_keys.append((tool, "", _text(tool_table or None), None))
+
+    return {
+        "projects": [
+            (
+                project.get("name"),
+                project.get("version"),
+                project.get("requires-python"),
+                build_system.get("build-backend"),
+            )
+        ],
+        "project_fields": [(key, _text(value)) for key, value in project.items()],
+        "dependencies": [
+            (kind, extra, requirement, *parse_requirement(requirement).values()) for kind, extra, requirement in dependencies
+        ],
+        "entry_points": entry_points,
+        "tool_keys": tool_keys,
+    }
+
+
+class SQLiteIndex:
+    """SQLite database of converted projects, written in batches of `batch_size` projects (see the module docstring).
+
+    Rows are computed by the thread that adds the project, so that only the writes themselves are serialized.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 256):
+        """:param filename: path to the database, created if it does not exist
+        :param batch_size: number of projects to write in each transaction
+        """
+        self.filename = Path(filename)
+        self.batch_size = batch_size
+        # rows of each project waiting to be written, by resolved path
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode = WAL")
+        self.__connection.execute("PRAGMA synchronous = NORMAL")
+        self.__connection.execute("PRAGMA foreign_keys = ON")
+        self.__connection.executescript(SCHEMA)
+
+    def add(self, directory: str, configuration: PyProjectConfiguration) -> None:
+        """Add the given project to the index (replacing it if already indexed), writing it with the next batch."""
+        directory = str(Path(directory).resolve())
+        with span("index"):
+            project_rows = rows(configuration)
+        with self.__lock:
+            self.__pending.pop(directory, None)
+            self.__pending[directory] = project_rows
+            if len(self.__pending) >= self.batch_size:
+                self.__write()
+
+    def flush(self) -> None:
+        """Write the projects added since the last batch."""
+        with self.__lock:
+            self.__write()
+
+    def __write(self) -> None:
+        """Write the pending projects in a single transaction; if that fails, they stay pending."""
+        if len(self.__pending) == 0:
+            return
+        pending = self.__pending
+        indexed_at = time.time()
+        with span("write_index"):
+            cursor = self.__connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany("DELETE FROM projects WHERE directory = ?", [(directory,) for directory in pending])
+                for directory, project_rows in pending.items():
+                    (project,) = project_rows["projects"]
+                    cursor.execute(
+                        "INSERT INTO projects (directory, name, version, requires_python, build_backend, indexed_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (directory, *project, indexed_at),
+                    )
+                    project_id = cursor.lastrowid
+                    for table, columns in (
+                        ("project_fields", "key, value"),
+                        ("dependencies", "kind, extra, requirement, name, extras, specifier, marker"),
+                        ("entry_points", '"group", name, object'),
+                        ("tool_keys", "tool, key, value, number"),
+                    ):
+                        table_rows = project_rows[table]
+                        if len(table_rows) > 0:
+                            placeholders = ", ".join("?" * (len(table_rows[0]) + 1))
+                            cursor.executemany(
+                                f"INSERT INTO {table} (project_id, {columns}) VALUES ({placeholders})",  # noqa: S608 - fixed table and column names
+                                [(project_id, *row) for row in table_rows],
+                            )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        self.__pending = {}
+
+    def query(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        """Rows of the given query, after writing the pending projects."""
+        with self.__lock:
+            self.__write()
+            return self.__connection.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        """Write the pending projects and close the database."""
+        with self.__lock:
+            try:
+                self.__write()
+            finally:
+                self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
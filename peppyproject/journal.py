@@ -0,0 +1,130 @@
+"""append-only journal of the projects converted by a batch, so that an interrupted batch can be resumed."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from peppyproject.files import KNOWN_FILENAMES
+from peppyproject.git import repository
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+def input_digest(directory: str, revision: str | None = None) -> str:
+    """SHA-256 digest of everything in the given project directory that its conversion depends on.
+
+    That is, the names of the files in the directory (which determine i.e. the license and README files) and the
+    contents of its build files; or, given a source distribution archive, its contents.
+
+    :param directory: project directory or source distribution
+    :param revision: digest the project directory as of this revision of its git repository, by the ID of its tree
+    """
+    directory = Path(directory)
+    digest = hashlib.sha256()
+    if revision is not None:
+        project_repository = repository(directory)
+        digest.update(project_repository.tree_id(revision, project_repository.relative_path(directory)).encode())
+        return digest.hexdigest()
+    if directory.is_file():
+        with open(directory, "rb") as archive_file:
+            for chunk in iter(lambda: archive_file.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    for filename in sorted(entry.name for entry in directory.iterdir() if entry.is_file()):
+        digest.update(filename.encode() + b"\0")
+        if filename.lower() in KNOWN_FILENAMES:
+            digest.update((directory / filename).read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+class Journal:
+    """append-only record of converted projects, one JSON object per line.
+
+    Entries are flushed to disk (`fsync`) in batches, every `sync_every` entries or `sync_interval` seconds (whichever
+    comes first), so that the journal does not slow down the batch; an entry that was not yet flushed when the batch
+    was interrupted only causes its project to be converted again. Before each flush, the given output files are
+    flushed too, so that every project in the journal also has its result on disk.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        sync_every: int = 64,
+        sync_interval: float = 1.0,
+        sync_before: Iterable[IO] = (),
+        append: bool = True,
+    ):
+        """:param filename: path to the journal
+        :param sync_every: number of entries after which to flush the journal
+        :param sync_interval: seconds after which to flush the journal
+        :param sync_before: output files to flush before the journal
+        :param append: add to the entries of an existing journal, instead of starting a new journal (as a batch that
+            truncates its output must, since the entries of the existing journal no longer have their results)
+        """
+        self.filename = Path(filename)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.sync_before = [output_file for output_file in sync_before if output_file is not None]
+
+        self.entries = {}
+        if append and self.filename.exists():
+            with open(self.filename) as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line may have been cut short when the batch was interrupted
+                        continue
+                    self.entries[entry["directory"]] = entry
+
+        self.__file = open(self.filename, "a" if append else "w")  # noqa: SIM115
+        self.__unsynced = 0
+        self.__last_sync = time.monotonic()
+
+    def is_current(self, directory: str, digest: str) -> bool:
+        """Whether the given project was converted, from inputs with the given digest, by a previous batch."""
+        entry = self.entries.get(str(directory))
+        return entry is not None and entry["status"] == "converted" and entry["inputs"] == digest
+
+    def record(self, directory: str, digest: str, output: str, status: str) -> None:
+        """Add an entry for a project, flushing the journal to disk if a batch of entries is due.
+
+        :param directory: project directory
+        :param digest: digest of the inputs of the project (see `input_digest`)
+        :param output: path to which the result was written
+        :param status: `converted` or `failed`
+        """
+        entry = {"directory": str(directory), "inputs": digest, "output": str(output), "status": status}
+        self.entries[entry["directory"]] = entry
+        self.__file.write(json.dumps(entry) + "\n")
+        self.__unsynced += 1
+        if self.__unsynced >= self.sync_every or time.monotonic() - self.__last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush the output files, then the journal, to disk."""
+        for output_file in self.sync_before:
+            output_file.flush()
+            if output_file.fileno() > 2:
+                os.fsync(output_file.fileno())
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__unsynced = 0
+        self.__last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self.__file.closed:
+            self.sync()
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
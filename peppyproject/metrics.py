@@ -0,0 +1,311 @@
+"""counters and histograms of conversions, exported in the OpenMetrics text format (i.e. for a textfile collector).
+
+::
+
+    with metrics("peppyproject.prom", interval=60):
+        for directory, result in convert_many(discover(roots)):
+            ...
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+import sys
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from peppyproject.files import file_size, replace_file
+from peppyproject.hooks import handling
+from peppyproject.profiling import collect
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from peppyproject.profiling import Span
+
+PREFIX = "peppyproject"
+# upper bounds of the buckets of stage latency histograms, in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+SAMPLE = re.compile(r"^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$")
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+# counters without labels, and counters with a single label, by sample name and attribute
+COUNTERS = {
+    "projects_converted_total": "projects_converted",
+    "files_read_total": "files_read",
+    "files_skipped_total": "files_skipped",
+    "read_bytes_total": "bytes_read",
+    "files_written_total": "files_written",
+    "files_unchanged_total": "files_unchanged",
+}
+LABELLED_COUNTERS = {
+    "project_failures_total": "failures",
+    "cache_hits_total": "cache_hits",
+    "cache_misses_total": "cache_misses",
+    "budgets_exceeded_total": "budgets_exceeded",
+}
+
+
+class Metrics:
+    """counters of conversions and histograms of the latency of each stage, fed by hooks and spans."""
+
+    def __init__(self):
+        self.projects_converted = 0
+        self.failures = {}
+        self.cache_hits = {}
+        self.cache_misses = {}
+        self.files_read = 0
+        self.files_skipped = 0
+        self.bytes_read = 0
+        self.files_written = 0
+        self.files_unchanged = 0
+        self.budgets_exceeded = {}
+        # counts per bucket (the last of which is `+Inf`) and sum of durations, by stage
+        self.stage_buckets = {}
+        self.stage_sums = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def from_openmetrics(cls, openmetrics: str) -> Metrics:
+        """Read metrics written by `to_openmetrics`, i.e. by another shard of a batch.
+
+        :raises ValueError: if the histogram buckets differ from `BUCKETS`
+        """
+        conversion_metrics = cls()
+        upper_bounds = [str(upper_bound) for upper_bound in BUCKETS] + ["+Inf"]
+        cumulative_buckets = {}
+        for line in openmetrics.splitlines():
+            match = SAMPLE.match(line)
+            if line.startswith("#") or match is None:
+                continue
+            name = match["name"][len(PREFIX) + 1 :] if match["name"].startswith(f"{PREFIX}_") else match["name"]
+            labels = dict(LABEL.findall(match["labels"] or ""))
+            value = float(match["value"])
+            if name in COUNTERS:
+                setattr(conversion_metrics, COUNTERS[name], int(value))
+            elif name in LABELLED_COUNTERS:
+                (label_value,) = labels.values()
+                getattr(conversion_metrics, LABELLED_COUNTERS[name])[label_value] = int(value)
+            elif name == "stage_duration_seconds_bucket":
+                if labels["le"] not in upper_bounds:
+                    message = f"unexpected histogram bucket {labels['le']}; expected one of {upper_bounds}"
+                    raise ValueError(message)
+                stage_buckets = cumulative_buckets.setdefault(labels["stage"], [0] * len(upper_bounds))
+                stage_buckets[upper_bounds.index(labels["le"])] = int(value)
+            elif name == "stage_duration_seconds_sum":
+                conversion_metrics.stage_sums[labels["stage"]] = value
+
+        for stage, stage_buckets in cumulative_buckets.items():
+            conversion_metrics.stage_buckets[stage] = [
+                count - previous for previous, count in zip([0, *stage_buckets[:-1]], stage_buckets)
+            ]
+            conversion_metrics.stage_sums.setdefault(stage, 0.0)
+        return conversion_metrics
+
+    @classmethod
+    def from_file(cls, filename: str | Path) -> Metrics:
+        with open(filename) as metrics_file:
+            return cls.from_openmetrics(metrics_file.read())
+
+    def update(self, other: Metrics) -> None:
+        """Add the given metrics (i.e. of another shard of a batch) to these metrics."""
+        with self.__lock:
+            for attribute in COUNTERS.values():
+                setattr(self, attribute, getattr(self, attribute) + getattr(other, attribute))
+            for attribute in LABELLED_COUNTERS.values():
+                counts = getattr(self, attribute)
+                for label_value, count in getattr(other, attribute).items():
+                    counts[label_value] = counts.get(label_value, 0) + count
+            for stage, buckets in other.stage_buckets.items():
+                if stage not in self.stage_buckets:
+                    self.stage_buckets[stage] = [0] * (len(BUCKETS) + 1)
+                    self.stage_sums[stage] = 0.0
+                self.stage_buckets[stage] = [
+                    count + other_count for count, other_count in zip(self.stage_buckets[stage], buckets)
+                ]
+                self.stage_sums[stage] += other.stage_sums[stage]
+
+    @contextmanager
+    def collecting(self) -> Iterator[Metrics]:
+        """Update these metrics from conversions (in any thread) within the context."""
+        with ExitStack() as stack:
+            stack.enter_context(
+                handling(
+                    {
+                        "project_converted": self.__project_converted,
+                        "project_failed": self.__project_failed,
+                        "cache_hit": self.__cache_hit,
+                        "cache_miss": self.__cache_miss,
+                        "file_read": self.__file_read,
+                        "file_skipped": self.__file_skipped,
+                        "budget_exceeded": self.__budget_exceeded,
+                        "file_written": self.__file_written,
+                        "file_unchanged": self.__file_unchanged,
+                    },
+                ),
+            )
+            stack.enter_context(collect(self.__span))
+            yield self
+
+    def __project_converted(self, directory: Path) -> None:
+        with self.__lock:
+            self.projects_converted += 1
+
+    def __project_failed(self, directory: Path, error: Exception) -> None:
+        with self.__lock:
+            error_type = error.__class__.__name__
+            self.failures[error_type] = self.failures.get(error_type, 0) + 1
+
+    def __cache_hit(self, cache: str) -> None:
+        with self.__lock:
+            self.cache_hits[cache] = self.cache_hits.get(cache, 0) + 1
+
+    def __cache_miss(self, cache: str) -> None:
+        with self.__lock:
+            self.cache_misses[cache] = self.cache_misses.get(cache, 0) + 1
+
+    def __file_read(self, filename: Path) -> None:
+        size = file_size(Path(filename))
+        with self.__lock:
+            self.files_read += 1
+            self.bytes_read += size
+
+    def __file_skipped(self, filename: Path) -> None:
+        with self.__lock:
+            self.files_skipped += 1
+
+    def __file_written(self, filename: Path) -> None:
+        with self.__lock:
+            self.files_written += 1
+
+    def __file_unchanged(self, filename: Path) -> None:
+        with self.__lock:
+            self.files_unchanged += 1
+
+    def __budget_exceeded(self, filename: Path, limit: str) -> None:
+        with self.__lock:
+            self.budgets_exceeded[limit] = self.budgets_exceeded.get(limit, 0) + 1
+
+    def __span(self, span: Span) -> None:
+        bucket = bisect.bisect_left(BUCKETS, span.duration)
+        with self.__lock:
+            if span.name not in self.stage_buckets:
+                self.stage_buckets[span.name] = [0] * (len(BUCKETS) + 1)
+                self.stage_sums[span.name] = 0.0
+            self.stage_buckets[span.name][bucket] += 1
+            self.stage_sums[span.name] += span.duration
+
+    def to_openmetrics(self) -> str:
+        """Current values of all metrics, in the OpenMetrics text format."""
+        with self.__lock:
+            lines = [
+                *counter("projects_converted", "projects converted", {(): self.projects_converted}),
+                *counter(
+                    "project_failures",
+                    "projects that could not be converted, by exception type",
+                    {(("type", error_type),): count for error_type, count in sorted(self.failures.items())},
+                ),
+                *counter(
+                    "cache_hits",
+                    "reuses of cached objects, by cache",
+                    {(("cache", cache),): count for cache, count in sorted(self.cache_hits.items())},
+                ),
+                *counter(
+                    "cache_misses",
+                    "creations of cached objects, by cache",
+                    {(("cache", cache),): count for cache, count in sorted(self.cache_misses.items())},
+                ),
+                f"# TYPE {PREFIX}_cache_hit_ratio gauge",
+                f"# HELP {PREFIX}_cache_hit_ratio fraction of lookups that reused a cached object, by cache",
+            ]
+            for cache in sorted({*self.cache_hits, *self.cache_misses}):
+                hits = self.cache_hits.get(cache, 0)
+                lookups = hits + self.cache_misses.get(cache, 0)
+                lines.append(f'{PREFIX}_cache_hit_ratio{{cache="{cache}"}} {hits / lookups}')
+            lines.extend(
+                [
+                    *counter("files_read", "build files read", {(): self.files_read}),
+                    *counter("files_skipped", "build files not read", {(): self.files_skipped}),
+                    *counter("read_bytes", "bytes of build files read", {(): self.bytes_read}),
+                    *counter("files_written", "output files written", {(): self.files_written}),
+                    *counter(
+                        "files_unchanged", "output files left untouched, having the same content", {(): self.files_unchanged}
+                    ),
+                    *counter(
+                        "budgets_exceeded",
+                        "build files over budget, by the limit they exceeded",
+                        {(("limit", limit),): count for limit, count in sorted(self.budgets_exceeded.items())},
+                    ),
+                    f"# TYPE {PREFIX}_stage_duration_seconds histogram",
+                    f"# HELP {PREFIX}_stage_duration_seconds duration of each stage of conversion",
+                    f"# UNIT {PREFIX}_stage_duration_seconds seconds",
+                ],
+            )
+            for stage, buckets in sorted(self.stage_buckets.items()):
+                cumulative = 0
+                for upper_bound, count in zip([*BUCKETS, "+Inf"], buckets):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{stage}",le="{upper_bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_duration_seconds_sum{{stage="{stage}"}} {self.stage_sums[stage]}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def to_file(self, filename: str | Path):
+        """Write the current values of all metrics to the given file (or to stdout, given `-`).
+
+        The file is replaced atomically (see `files.replace_file`), so that a collector never reads a partially written
+        file; a new file gets the default mode, so that a collector running as another user can read it.
+        """
+        openmetrics = self.to_openmetrics()
+        if str(filename) == "-":
+            sys.stdout.write(openmetrics)
+            sys.stdout.flush()
+            return
+        replace_file(Path(filename), openmetrics.encode())
+
+
+def counter(name: str, description: str, values: dict[tuple[tuple[str, str], ...], int]) -> list[str]:
+    """Lines of an OpenMetrics counter, with a sample for each set of labels."""
+    lines = [f"# TYPE {PREFIX}_{name} counter", f"# HELP {PREFIX}_{name} {description}"]
+    for labels, value in values.items():
+        labels_string = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+        lines.append(
+            f"{PREFIX}_{name}_total{{{labels_string}}} {value}" if len(labels) > 0 else f"{PREFIX}_{name}_total {value}"
+        )
+    return lines
+
+
+@contextmanager
+def metrics(filename: str | Path | None = None, interval: float | None = None) -> Iterator[Metrics]:
+    """Collect metrics of conversions (in any thread) within the context.
+
+    :param filename: file to which to write metrics in the OpenMetrics text format when the context exits (`-` for
+        stdout)
+    :param interval: also write metrics every this many seconds
+    """
+    conversion_metrics = Metrics()
+    stop = threading.Event()
+    exporter = None
+    if filename is not None and interval is not None:
+
+        def export() -> None:
+            while not stop.wait(interval):
+                conversion_metrics.to_file(filename)
+
+        exporter = threading.Thread(target=export, name="peppyproject-metrics", daemon=True)
+
+    try:
+        with conversion_metrics.collecting():
+            if exporter is not None:
+                exporter.start()
+            yield conversion_metrics
+    finally:
+        stop.set()
+        if exporter is not None and exporter.is_alive():
+            exporter.join()
+        if filename is not None:
+            conversion_metrics.to_file(filename)
@@ -0,0 +1,204 @@
+"""timing of the stages of a conversion, such as reading files, translating INI to TOML, and coercing values.
+
+Stages are wrapped in named spans, which are only timed while at least one collector is registered::
+
+    with profile() as stage_profile:
+        PyProjectConfiguration.from_directory(directory).configuration
+    print(stage_profile.report())
+
+    with trace("trace.json"):
+        PyProjectConfiguration.from_directory(directory).configuration
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from contextlib import AbstractContextManager
+    from pathlib import Path
+
+_collectors: list[Callable[[Span], None]] = []
+_collectors_lock = threading.Lock()
+_stacks = threading.local()
+
+# returned by `span()` while no collector is registered, so that disabled spans do not allocate
+NULL_SPAN = nullcontext()
+
+
+class Span:
+    """timed stage of a conversion, passed to every registered collector when it ends."""
+
+    __slots__ = ("args", "end", "name", "nested", "start", "thread")
+
+    def __init__(self, name: str, **args: Any):
+        self.name = name
+        self.args = args
+        self.start = None
+        self.end = None
+        # time spent in spans nested within this one
+        self.nested = 0.0
+        self.thread = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def self_duration(self) -> float:
+        """Duration of this span, excluding spans nested within it."""
+        return self.duration - self.nested
+
+    def __enter__(self):
+        if not hasattr(_stacks, "stack"):
+            _stacks.stack = []
+        _stacks.stack.append(self)
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.end = time.perf_counter()
+        stack = _stacks.stack
+        stack.pop()
+        if len(stack) > 0:
+            stack[-1].nested += self.duration
+        # a copy, since collectors may be added or removed from other threads
+        for collector in tuple(_collectors):
+            collector(self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r})"
+
+
+def span(name: str, **args: Any) -> AbstractContextManager:
+    """Time the enclosed stage under the given name, if any collector is registered.
+
+    :param name: name of the stage
+    :param args: details of this particular span, such as the project directory, to show in traces
+    """
+    if len(_collectors) == 0:
+        return NULL_SPAN
+    return Span(name, **args)
+
+
+def add_collector(collector: Callable[[Span], None]) -> None:
+    """Call the given function with every span that ends from now on (in whichever thread it ran)."""
+    with _collectors_lock:
+        _collectors.append(collector)
+
+
+def remove_collector(collector: Callable[[Span], None]) -> None:
+    with _collectors_lock:
+        _collectors.remove(collector)
+
+
+@contextmanager
+def collect(collector: Callable[[Span], None]) -> Iterator[Callable[[Span], None]]:
+    """Register the given collector for the duration of the context."""
+    add_collector(collector)
+    try:
+        yield collector
+    finally:
+        remove_collector(collector)
+
+
+class Profile:
+    """aggregate of the time spent in each stage, excluding time spent in stages nested within it."""
+
+    def __init__(self):
+        self.calls = {}
+        self.durations = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self.__lock:
+            self.calls[span.name] = self.calls.get(span.name, 0) + 1
+            self.durations[span.name] = self.durations.get(span.name, 0.0) + span.self_duration
+
+    def report(self) -> str:
+        """Table of stages, in descending order of the time spent in them."""
+        with self.__lock:
+            calls = dict(self.calls)
+            durations = dict(self.durations)
+
+        total = sum(durations.values())
+        width = max((len(name) for name in durations), default=0)
+        width = max(width, len("stage"))
+        lines = [f"{'stage':<{width}}  {'calls':>7}  {'time (s)':>10}  {'share':>6}"]
+        for name, duration in sorted(durations.items(), key=lambda item: item[1], reverse=True):
+            share = duration / total if total > 0 else 0.0
+            lines.append(f"{name:<{width}}  {calls[name]:>7}  {duration:>10.4f}  {share:>6.1%}")
+        lines.append(f"{'total':<{width}}  {sum(calls.values()):>7}  {total:>10.4f}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """Aggregate the time spent in each stage of conversions (in any thread) within the context."""
+    stage_profile = Profile()
+    with collect(stage_profile):
+        yield stage_profile
+
+
+class Trace:
+    """record of spans as events in the Chrome trace-event format, which can be opened in Perfetto or `chrome://tracing`.
+
+    Each thread in which spans ran is shown as its own track.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.__start = time.perf_counter()
+        self.__threads = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self.__lock:
+            if span.thread not in self.__threads:
+                self.__threads[span.thread] = len(self.__threads) + 1
+                self.events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": 1,
+                        "tid": self.__threads[span.thread],
+                        "args": {"name": threading.current_thread().name},
+                    },
+                )
+            event = {
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start - self.__start) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 1,
+                "tid": self.__threads[span.thread],
+            }
+            if len(span.args) > 0:
+                event["args"] = {key: str(value) for key, value in span.args.items()}
+            self.events.append(event)
+
+    def to_json(self) -> str:
+        with self.__lock:
+            return json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"})
+
+    def to_file(self, filename: str | Path):
+        with open(filename, "w") as trace_file:
+            trace_file.write(self.to_json())
+
+
+@contextmanager
+def trace(filename: str | Path | None = None) -> Iterator[Trace]:
+    """Record spans (in any thread) within the context, and write them to the given file as Chrome trace events."""
+    spans = Trace()
+    try:
+        with collect(spans):
+            yield spans
+    finally:
+        if filename is not None:
+            spans.to_file(filename)
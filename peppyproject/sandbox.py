@@ -0,0 +1,484 @@
+"""evaluation of ``setup.py`` scripts in a pool of sandboxed worker processes, as an alternative to static parsing.
+
+Static parsing (`files.read_setup_py`) cannot follow arguments that a script computes, such as a version read from a
+module. Evaluation runs the script with `setup()` replaced by a stub that captures its arguments. Workers are started
+as needed and import ``setuptools`` once; each script is then evaluated in a child process forked from a worker, so
+that it starts warm and nothing it changes (i.e. builtins, imported modules, or the environment) reaches the next
+script. Scripts that fail, or that take longer than the timeout, fall back to static parsing::
+
+    with SandboxPool(workers=4) as pool, evaluating(pool):
+        configuration = PyProjectConfiguration.from_directory(directory)
+
+Scripts run with a minimal environment and with resource limits (no child processes, no file writes, and bounded CPU
+time, memory, and open files, where the platform supports them), and an audit hook refuses to open files for writing,
+open sockets, start processes, or load native code through ``ctypes``. This only contains well-meaning scripts: it is
+not a security boundary, so untrusted scripts must only be evaluated in an isolated environment (i.e. a container or a
+virtual machine without network access, as an unprivileged user).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from typing import IO, TYPE_CHECKING, Any
+
+from peppyproject.files import normalize_setup_parameters, open_file, read_setup_py
+from peppyproject.profiling import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# audit events (see `sys.addaudithook`) refused in a worker, in addition to opening files for writing and to the events
+# of `BLOCKED_EVENT_PREFIXES`
+BLOCKED_EVENTS = frozenset(
+    {
+        "os.chmod",
+        "os.chown",
+        "os.exec",
+        "os.fork",
+        "os.forkpty",
+        "os.kill",
+        "os.link",
+        "os.mkdir",
+        "os.posix_spawn",
+        "os.remove",
+        "os.rename",
+        "os.rmdir",
+        "os.spawn",
+        "os.startfile",
+        "os.symlink",
+        "os.system",
+        "os.truncate",
+        "os.utime",
+        "shutil.rmtree",
+        "subprocess.Popen",
+    },
+)
+BLOCKED_EVENT_PREFIXES = ("socket.", "ctypes.", "gc.get_")
+# modules that cannot be imported in a worker, as they call into native code without raising audit events
+BLOCKED_MODULES = ("ctypes", "_ctypes", "_posixsubprocess")
+# functions removed from `os` in a worker, as they raise no audit events
+REMOVED_FUNCTIONS = ("mkfifo", "mknod")
+# environment variables passed on to a worker
+ENVIRONMENT = ("PATH", "SYSTEMROOT", "LANG", "LC_ALL", "LC_CTYPE")
+# resource limits of a worker, besides its CPU time (see `resource.setrlimit`)
+RESOURCE_LIMITS = {"RLIMIT_AS": 2 << 30, "RLIMIT_NOFILE": 256, "RLIMIT_FSIZE": 0, "RLIMIT_NPROC": 0, "RLIMIT_CORE": 0}
+# seconds given to a worker to start (importing ``setuptools``), in addition to the timeout of its first script
+STARTUP_TIMEOUT = 10.0
+# whether scripts are evaluated in a child process forked from a worker; otherwise (i.e. on Windows), a worker evaluates
+# a single script itself, and is then replaced
+FORKING = hasattr(os, "fork")
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+
+_pool: ContextVar[SandboxPool | None] = ContextVar("peppyproject_sandbox_pool", default=None)
+
+
+class EvaluationError(RuntimeError):
+    """``setup.py`` script that could not be evaluated in the sandbox."""
+
+
+class SandboxPool:
+    """pool of sandboxed worker processes evaluating ``setup.py`` scripts, shared by every thread that uses it.
+
+    Workers are started when a script needs one and none is idle, up to `workers` of them, and evaluate each script in
+    a forked child process (see the module docstring), which is killed if it times out. A worker that stops responding
+    is killed, and replaced when a worker is next needed. Workers only send back JSON, so nothing they return is
+    unpickled.
+    """
+
+    def __init__(self, workers: int | None = None, timeout: float = 10.0):
+        """:param workers: number of worker processes (by default, the number of CPUs)
+        :param timeout: seconds after which to give up on a script
+        """
+        self.timeout = timeout
+        # idle workers, and `None` for each worker that has yet to be started
+        self.__idle = SimpleQueue()
+        self.__workers = []
+        self.__lock = threading.Lock()
+        for _ in range(workers if workers is not None else os.cpu_count() or 1):
+            self.__idle.put(None)
+
+    def __start(self) -> _Worker:
+        worker = _Worker(self.timeout)
+        with self.__lock:
+            self.__workers.append(worker)
+        return worker
+
+    def __stop(self, worker: _Worker) -> None:
+        with self.__lock:
+            if worker in self.__workers:
+                self.__workers.remove(worker)
+        worker.stop()
+
+    def __retire(self, worker: _Worker) -> None:
+        """Stop the given worker, leaving a replacement to be started when a worker is next needed."""
+        self.__stop(worker)
+        self.__idle.put(None)
+
+    def evaluate(self, filename: str) -> dict[str, Any]:
+        """Arguments that the given ``setup.py`` script passes to `setup()`.
+
+        Only values made of strings, numbers, booleans, lists, and mappings are kept. A `long_description` read from a
+        file (i.e. `open("README.md").read()`) is given as the name of that file, as by static parsing.
+
+        :raises EvaluationError: if the script raised an error, did not call `setup()`, or timed out
+        """
+        filename = Path(filename)
+        with open_file(filename) as script_file:
+            source = script_file.read()
+
+        with span("evaluate_setup_py", filename=filename):
+            worker = self.__idle.get()
+            if worker is None:
+                worker = self.__start()
+            try:
+                # the worker times out the script itself; this only gives up on a worker that stopped responding
+                response = worker.request(
+                    {"filename": str(filename), "source": source}, timeout=self.timeout + STARTUP_TIMEOUT
+                )
+            except (TimeoutError, EOFError) as error:
+                self.__retire(worker)
+                if isinstance(error, TimeoutError):
+                    message = f"evaluating {filename} timed out after {self.timeout} seconds"
+                else:
+                    message = f"sandbox worker exited while evaluating {filename}"
+                raise EvaluationError(message) from error
+            except BaseException:
+                self.__retire(worker)
+                raise
+            if FORKING:
+                self.__idle.put(worker)
+            else:
+                self.__retire(worker)
+
+        if response.get("timed_out"):
+            message = f"evaluating {filename} timed out after {self.timeout} seconds"
+            raise EvaluationError(message)
+        if "error" in response:
+            message = f"could not evaluate {filename}: {response['error']}"
+            raise EvaluationError(message)
+        return normalize_setup_parameters(response["arguments"])
+
+    def read_setup_py(self, filename: str) -> dict[str, Any]:
+        """Evaluate the given ``setup.py`` script, falling back to static parsing (with a warning) if that fails."""
+        try:
+            return self.evaluate(filename)
+        except EvaluationError as error:
+            warnings.warn(f"{error}; parsing statically instead")
+            return read_setup_py(filename)
+
+    def close(self) -> None:
+        with self.__lock:
+            workers = list(self.__workers)
+        for worker in workers:
+            self.__stop(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class _Worker:
+    """sandboxed interpreter, exchanging length-prefixed JSON messages over its standard input and output."""
+
+    def __init__(self, timeout: float):
+        """:param timeout: seconds after which to kill a script"""
+        environment = {name: os.environ[name] for name in ENVIRONMENT if name in os.environ}
+        # the package may not be installed, i.e. when running from a source checkout
+        environment["PYTHONPATH"] = os.pathsep.join(
+            [str(Path(__file__).parent.parent), *filter(None, [os.environ.get("PYTHONPATH")])]
+        )
+        self.process = subprocess.Popen(  # noqa: S603 - runs this package, with a numeric argument
+            [sys.executable, "-c", f"from peppyproject.sandbox import _serve; _serve({float(timeout)!r})"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=environment,
+            # in a process group of its own, so that the scripts it forks are killed along with it
+            start_new_session=FORKING,
+        )
+        self.__responses = SimpleQueue()
+        # responses are read in a thread, so that waiting for one can time out on every platform
+        threading.Thread(target=self.__read, name="peppyproject-sandbox", daemon=True).start()
+
+    def __read(self) -> None:
+        while True:
+            try:
+                message = _read_message(self.process.stdout)
+            except (OSError, ValueError):
+                # the worker was stopped
+                message = None
+            self.__responses.put(message)
+            if message is None:
+                return
+
+    def request(self, message: dict[str, Any], timeout: float) -> dict[str, Any]:
+        """Send a message to the worker and wait for its response.
+
+        :raises TimeoutError: if the worker does not respond in time
+        :raises EOFError: if the worker exited
+        """
+        try:
+            _write_message(self.process.stdin, message)
+            response = self.__responses.get(timeout=timeout)
+        except OSError as error:
+            raise EOFError from error
+        except Empty as error:
+            raise TimeoutError from error
+        if response is None:
+            raise EOFError
+        return response
+
+    def stop(self) -> None:
+        with contextlib.suppress(OSError):
+            self.process.stdin.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            if FORKING:
+                with contextlib.suppress(OSError):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+def _write_message(stream: IO[bytes], message: dict[str, Any]) -> None:
+    content = json.dumps(message).encode()
+    stream.write(len(content).to_bytes(4, "big") + content)
+    stream.flush()
+
+
+def _read_message(stream: IO[bytes]) -> dict[str, Any] | None:
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    return json.loads(stream.read(int.from_bytes(header, "big")))
+
+
+@contextmanager
+def evaluating(pool: SandboxPool | None) -> Iterator[None]:
+    """Evaluate ``setup.py`` scripts in the given pool, for reads within the context in the current thread (or task)."""
+    token = _pool.set(pool)
+    try:
+        yield
+    finally:
+        _pool.reset(token)
+
+
+def current_pool() -> SandboxPool | None:
+    """Pool in which ``setup.py`` scripts are evaluated in the current context, if any (see `evaluating`)."""
+    return _pool.get()
+
+
+class _SetupCalled(BaseException):
+    """raised by the stubbed `setup()`, so that a script stops there (a `BaseException`, which scripts rarely catch)."""
+
+    def __init__(self, arguments: dict[str, Any]):
+        super().__init__()
+        self.arguments = arguments
+
+
+def _setup(*args: Any, **kwargs: Any) -> None:
+    raise _SetupCalled(kwargs)
+
+
+def _limit_resources(cpu_seconds: int) -> None:
+    """Lower the resource limits of the current process (both soft and hard, so that they cannot be raised again)."""
+    try:
+        import resource  # noqa: PLC0415 - only available on POSIX
+    except ImportError:
+        return
+
+    for name, limit in {**RESOURCE_LIMITS, "RLIMIT_CPU": cpu_seconds}.items():
+        if hasattr(resource, name):
+            _, hard = resource.getrlimit(getattr(resource, name))
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            with contextlib.suppress(ValueError, OSError):
+                resource.setrlimit(getattr(resource, name), (limit, limit))
+
+
+def _serve(timeout: float) -> None:
+    """Evaluate the scripts sent to standard input, each in a sandboxed child process forked from this one (or, where
+    processes cannot be forked, a single script in this process).
+
+    :param timeout: seconds after which to kill a script
+    """
+    import setuptools  # noqa: PLC0415 - only needed in workers
+
+    setuptools.setup = _setup
+    with contextlib.suppress(ImportError):
+        import distutils.core  # noqa: PLC0415
+
+        distutils.core.setup = _setup
+
+    # messages are exchanged over the original standard output; anything a script prints is discarded
+    requests = sys.stdin.buffer
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.dont_write_bytecode = True
+
+    if not FORKING:
+        request = _read_message(requests)
+        if request is not None:
+
+            def timed_out() -> None:
+                _write_message(responses, {"timed_out": True})
+                os._exit(0)
+
+            threading.Timer(timeout, timed_out).start()
+            opened = _sandbox(math.ceil(timeout) + 1)
+            _write_message(responses, _evaluate(request["filename"], request["source"], opened))
+            os._exit(0)
+        return
+
+    while True:
+        request = _read_message(requests)
+        if request is None:
+            return
+        _write_message(responses, _evaluate_in_child(request, timeout, inherited=[requests, responses]))
+
+
+def _evaluate_in_child(request: dict[str, Any], timeout: float, inherited: list[IO[bytes]]) -> dict[str, Any]:
+    """Response to the given request, evaluated in a sandboxed child process that is killed after the given timeout.
+
+    :param inherited: streams of the worker, closed in the child so that a script cannot use them
+    """
+    read_descriptor, write_descriptor = os.pipe()
+    process_id = os.fork()
+    if process_id == 0:
+        # child process, which exits without returning
+        try:
+            os.close(read_descriptor)
+            for stream in inherited:
+                os.close(stream.fileno())
+            opened = _sandbox(math.ceil(timeout) + 1)
+            content = memoryview(json.dumps(_evaluate(request["filename"], request["source"], opened)).encode())
+            # `os.write`, since opening the descriptor as a file raises an audit event for writing
+            while len(content) > 0:
+                content = content[os.write(write_descriptor, content) :]
+        except BaseException:  # noqa: BLE001 - reported by the worker as an evaluation without a response
+            os._exit(1)
+        os._exit(0)
+
+    os.close(write_descriptor)
+    chunks = []
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or len(select.select([read_descriptor], [], [], remaining)[0]) == 0:
+                os.kill(process_id, signal.SIGKILL)
+                return {"timed_out": True}
+            chunk = os.read(read_descriptor, 1 << 16)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(read_descriptor)
+        os.waitpid(process_id, 0)
+    try:
+        return json.loads(b"".join(chunks))
+    except ValueError:
+        # i.e. the child exceeded its resource limits
+        return {"error": "the script exited without a result"}
+
+
+def _sandbox(cpu_seconds: int) -> list[Any]:
+    """Restrict what the current process can do (see the module docstring), irreversibly.
+
+    :param cpu_seconds: CPU time after which the process is killed
+    :return: paths that are opened from then on
+    """
+    for module in BLOCKED_MODULES:
+        sys.modules[module] = None
+    subprocess_module = sys.modules.get("subprocess")
+    if subprocess_module is not None and hasattr(subprocess_module, "_posixsubprocess"):
+        subprocess_module._posixsubprocess = None
+    for function in REMOVED_FUNCTIONS:
+        for module in (os, sys.modules.get(os.name)):
+            if module is not None and hasattr(module, function):
+                delattr(module, function)
+    _limit_resources(cpu_seconds)
+    opened = []
+
+    def audit(event: str, arguments: tuple) -> None:
+        if event == "open":
+            path, mode, flags = arguments
+            if (mode is not None and any(character in mode for character in "wax+")) or (flags or 0) & WRITE_FLAGS:
+                message = f"writing {path} is not allowed in the sandbox"
+                raise PermissionError(message)
+            opened.append(path)
+        elif event in BLOCKED_EVENTS or event.startswith(BLOCKED_EVENT_PREFIXES):
+            message = f"{event} is not allowed in the sandbox"
+            raise PermissionError(message)
+
+    sys.addaudithook(audit)
+    return opened
+
+
+def _evaluate(filename: str, source: str, opened: list[Any]) -> dict[str, Any]:
+    filename = Path(filename)
+    directory = filename.parent
+    # the process exits after this script, so the state it changes is not restored
+    try:
+        if directory.is_dir():
+            os.chdir(directory)
+        sys.path.insert(0, str(directory))
+        sys.argv = [str(filename)]
+        exec(compile(source, str(filename), "exec"), {"__name__": "__main__", "__file__": str(filename)})  # noqa: S102
+    except _SetupCalled as called:
+        arguments = {}
+        for key, value in called.arguments.items():
+            with contextlib.suppress(TypeError):
+                arguments[key] = _to_plain(value)
+        long_description = arguments.get("long_description")
+        if isinstance(long_description, str):
+            # reading the files again adds to `opened`
+            for opened_path in list(opened):
+                with contextlib.suppress(Exception):
+                    opened_path = Path(opened_path)
+                    if opened_path.parent.resolve() == directory.resolve() and opened_path.read_text() == long_description:
+                        arguments["long_description"] = opened_path.name
+                        break
+        return {"arguments": arguments}
+    except BaseException as error:  # noqa: BLE001 - reported to the pool, which falls back to static parsing
+        return {"error": f"{error.__class__.__name__}: {error}"}
+    return {"error": "setup() was not called"}
+
+
+def _to_plain(value: Any) -> Any:
+    """Copy of the given value as strings, numbers, booleans, lists, and dictionaries.
+
+    :raises TypeError: if the value contains anything else, such as a class or an `Extension`
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Mapping):
+        if not all(isinstance(key, str) for key in value):
+            message = f"mapping with non-string keys: {value!r}"
+            raise TypeError(message)
+        return {key: _to_plain(entry) for key, entry in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(entry) for entry in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_to_plain(entry) for entry in value)
+    message = f"unsupported value {value!r}"
+    raise TypeError(message)
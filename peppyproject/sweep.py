@@ -0,0 +1,124 @@
+"""changes of the configuration of a project across the history of its git repository.
+
+Most commits do not touch build files, so conversions are memoized by the object IDs of the build files of the project
+(and the names of its README and license files, which are referenced by name); a commit is only converted if that set
+differs from every commit converted before it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+
+import tomli
+
+from peppyproject.archive import is_build_file
+from peppyproject.configuration import PyProjectConfiguration
+from peppyproject.git import repository
+from peppyproject.hooks import dispatch
+from peppyproject.profiling import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from peppyproject.git import Repository
+
+# other files whose names (but not contents) can change the configuration, i.e. `readme` and `license` of `project`
+REFERENCED_NAMES = ("readme", "license")
+
+
+def flatten(mapping: Mapping[str, Any], prefix: str = "") -> dict[str, Any]:
+    """Flatten nested tables into a single mapping of dotted keys (i.e. `project.name`) to values."""
+    entries = {}
+    for key, value in mapping.items():
+        if isinstance(value, Mapping) and len(value) > 0:
+            entries.update(flatten(value, prefix=f"{prefix}{key}."))
+        else:
+            entries[f"{prefix}{key}"] = value
+    return entries
+
+
+def diff(old: Mapping[str, Any], new: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Changes between two flattened configurations, in order of key.
+
+    :return: the `key` of each entry that was added, removed, or changed, with its `old` value (unless added) and its
+        `new` value (unless removed)
+    """
+    changes = []
+    for key in sorted({*old, *new}):
+        if key not in new:
+            changes.append({"key": key, "old": old[key]})
+        elif key not in old:
+            changes.append({"key": key, "new": new[key]})
+        elif old[key] != new[key]:
+            changes.append({"key": key, "old": old[key], "new": new[key]})
+    return changes
+
+
+def sweep(directory: str, revision_range: str = "HEAD") -> Iterator[dict[str, Any]]:
+    """Changes of the configuration of the given project at each commit of the given range of its git repository.
+
+    Each conversion is reported as a ``cache_hit`` / ``cache_miss`` event (see `peppyproject.hooks`), with
+    ``cache="sweep"``.
+
+    :param directory: project directory, within the working tree of a git repository
+    :param revision_range: commits to walk, oldest first, following only first parents (i.e. `v1.0..main`)
+    :return: for each commit that changed the configuration, its `commit` ID and the `changes` to its flattened
+        configuration (see `diff`), or the `error` that prevented its conversion; the first commit of the range is
+        compared with an empty configuration, as is any commit at which the project directory does not exist
+    """
+    project_repository = repository(directory)
+    relative_directory = project_repository.relative_path(directory)
+
+    # flattened configurations (or errors) by the build files they were converted from
+    conversions = {}
+    previous_key = None
+    previous_configuration = {}
+    for commit in project_repository.commits(revision_range):
+        try:
+            files = project_repository.list_files(commit, relative_directory)
+        except ValueError:
+            # the project directory does not exist at this commit
+            files = {}
+        key = tuple(
+            sorted(
+                (name, object_id if is_build_file(name) else None)
+                for name, object_id in files.items()
+                if is_build_file(name) or any(referenced in name.lower() for referenced in REFERENCED_NAMES)
+            )
+        )
+        if key == previous_key:
+            dispatch("cache_hit", cache="sweep")
+            continue
+        previous_key = key
+
+        if key in conversions:
+            dispatch("cache_hit", cache="sweep")
+        else:
+            dispatch("cache_miss", cache="sweep")
+            conversions[key] = convert(project_repository.path / relative_directory, files, project_repository)
+        configuration = conversions[key]
+
+        if isinstance(configuration, Exception):
+            yield {"commit": commit, "error": f"{configuration.__class__.__name__}: {configuration}"}
+            continue
+        changes = diff(previous_configuration, configuration)
+        if len(changes) > 0:
+            yield {"commit": commit, "changes": changes}
+        previous_configuration = configuration
+
+
+def convert(directory: str, files: Mapping[str, str], project_repository: Repository) -> dict[str, Any] | Exception:
+    """Flattened configuration of a project from the given files (by object ID), or the error that prevented it."""
+    if len(files) == 0 or not any(is_build_file(name) for name in files):
+        return {}
+    with span("project", directory=directory):
+        try:
+            contents = {
+                name: project_repository.read_object(object_id)[2] if is_build_file(name) else None
+                for name, object_id in files.items()
+            }
+            configuration = PyProjectConfiguration.from_files(directory, contents).configuration
+            return flatten(tomli.loads(configuration))
+        except Exception as error:  # noqa: BLE001 - reported in the change log, instead of ending the sweep
+            return error
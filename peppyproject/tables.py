@@ -1,5 +1,6 @@
 import warnings
 from collections.abc import Mapping
+from functools import cached_property
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Union
 
@@ -7,6 +8,9 @@ import tomli_w
 import typepigeon
 
 from peppyproject.base import ConfigurationTable, to_dict
+from peppyproject.files import list_files
+from peppyproject.hooks import transform
+from peppyproject.profiling import span
 from peppyproject.tools import CoverageTable, SetuptoolsTable
 from peppyproject.tools.flake8 import Flake8Table
 from peppyproject.tools.ruff import RuffTable
@@ -40,12 +44,14 @@ class ProjectMetadata(ConfigurationTable):
         "optional-dependencies": dict[str, list[str]],
         "dynamic": list[str],
     }
+    sections = ("metadata", "options")
+
+    @cached_property
+    def filenames(self) -> list[str]:
+        """Names of the files in the project directory."""
+        return list_files(self.directory)
 
     def __setitem__(self, key: str, value: Any) -> None:
-        directory = Path(
-            self._ConfigurationTable__from_directory if hasattr(self, "_ConfigurationTable__from_directory") else ".",
-        )
-        filenames = [filename.name for filename in directory.iterdir()]
         if value is not None:
             if key == "authors":
                 if isinstance(value, str):
@@ -64,10 +70,10 @@ class ProjectMetadata(ConfigurationTable):
                     value = output_authors
             elif key == "license":
                 license_filename = None
-                if isinstance(value, str) and value in filenames:
+                if isinstance(value, str) and value in self.filenames:
                     license_filename = value
                 else:
-                    license_files = [filename for filename in filenames if "license" in filename.lower()]
+                    license_files = [filename for filename in self.filenames if "license" in filename.lower()]
                     if len(license_files) > 0:
                         if len(license_files) > 1:
                             warnings.warn(
@@ -79,11 +85,11 @@ class ProjectMetadata(ConfigurationTable):
                 if isinstance(value, Mapping) and "text" in value:
                     value = value["text"]
                 if isinstance(value, str):
-                    if value in filenames:
+                    if value in self.filenames:
                         content_type = "text/markdown" if Path(value).suffix.lower() == ".md" else "text/x-rst"
                         value = {"file": value, "content-type": content_type}
                     else:
-                        readme_files = [filename for filename in filenames if "readme" in filename.lower()]
+                        readme_files = [filename for filename in self.filenames if "readme" in filename.lower()]
                         if len(readme_files) > 0:
                             if len(readme_files) > 1:
                                 warnings.warn(
@@ -132,6 +138,7 @@ class BuildConfiguration(ConfigurationTable):
         "requires": list[str],
         "build-backend": str,
     }
+    sections = ("options",)
 
     @classmethod
     def default_setuptools(cls):
@@ -142,7 +149,7 @@ class BuildConfiguration(ConfigurationTable):
         if configuration["requires"] is None or len(configuration["requires"]) == 0:
             configuration["requires"] = ["setuptools>=61.2", "wheel"]
         elif not any("setuptools" in requirement for requirement in configuration["requires"]):
-            configuration["requires"].append("setuptools>=61.2")
+            configuration["requires"] = [*configuration["requires"], "setuptools>=61.2"]
 
         return configuration
 
@@ -159,6 +166,7 @@ class ToolsTable(ConfigurationTable):
         "ruff": RuffTable,
     }
     start_with_placeholders = False
+    allow_unknown_keys = True
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -173,15 +181,22 @@ class ToolsTable(ConfigurationTable):
     def update(self, items: Mapping):
         for key, value in items.items():
             if value is not None:
-                if key in self and isinstance(self[key], Mapping) and isinstance(value, Mapping):
+                if key in self and isinstance(self[key], ConfigurationTable) and isinstance(value, Mapping):
                     self[key].update(value)
+                elif key in self and isinstance(self[key], Mapping) and isinstance(value, Mapping):
+                    # set again (rather than updated in place), so that the next snapshot sees it
+                    self[key] = {**self[key], **value}
                 else:
                     self[key] = value
 
     @property
     def configuration(self) -> str:
-        tables = self._ConfigurationTable__toml
-        for table_name, table in tables.items():
-            if isinstance(table, ConfigurationTable):
-                tables[table_name] = {key: value for key, value in table.items() if value is not None}
-        return tomli_w.dumps(to_dict({"tool": tables}))
+        with span("render"):
+            tables = self._ConfigurationTable__toml
+            for table_name, table in tables.items():
+                if isinstance(table, ConfigurationTable):
+                    tables[table_name] = {key: value for key, value in table.items() if value is not None}
+            tables = to_dict({"tool": tables})
+        with span("tomli_w.dumps"):
+            toml_string = tomli_w.dumps(tables)
+        return transform("rendered", toml_string, table=self)
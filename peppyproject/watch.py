@@ -0,0 +1,76 @@
+"""reconversion of a project whenever its files change, parsing again only the build files that changed.
+
+The project directory is polled (a `stat` of each of its files), which works the same on every platform and
+filesystem; files modified too recently for their modification time to tell apart further edits are also compared by
+content (see `files.stat_signature`). The tables read from unchanged build files are reused from a `cache.FileCache`::
+
+    for configuration in watch(directory):
+        if not isinstance(configuration, Exception):
+            configuration.to_file(directory / "pyproject.toml")
+
+Only the files directly in the project directory are watched; a change to a file in a subdirectory that an evaluated
+`setup.py` reads (i.e. a version file in the package) is not seen until one of them changes.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from peppyproject.cache import FileCache, caching
+from peppyproject.configuration import PyProjectConfiguration
+from peppyproject.files import stat_signature, unchanged
+from peppyproject.profiling import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+def snapshot(directory: Path) -> dict[str, tuple]:
+    """Signature of each file in the given directory (see `files.stat_signature`), by name."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files[entry.name] = stat_signature(Path(entry.path), entry.stat())
+    return files
+
+
+def changed(directory: Path, previous: dict[str, tuple] | None, current: dict[str, tuple]) -> bool:
+    """Whether any file in the given directory changed between the given snapshots."""
+    if previous is None or previous.keys() != current.keys():
+        return True
+    return not all(unchanged(directory / name, previous[name], signature) for name, signature in current.items())
+
+
+def watch(
+    directory: str,
+    interval: float = 0.5,
+    stop: threading.Event | None = None,
+) -> Iterator[PyProjectConfiguration | Exception]:
+    """Configuration of the given project, read once and again whenever a file in its directory changes.
+
+    :param directory: project directory
+    :param interval: seconds between polls of the directory
+    :param stop: stop watching once this event is set (by default, watch until the generator is closed)
+    :return: configuration (or the error raised while reading it, i.e. while a file is being edited) after each change
+    """
+    directory = Path(directory)
+    if stop is None:
+        stop = threading.Event()
+    cache = FileCache()
+    previous = None
+    while not stop.is_set():
+        current = snapshot(directory)
+        if changed(directory, previous, current):
+            with span("project", directory=directory), caching(cache):
+                try:
+                    configuration = PyProjectConfiguration.from_directory(directory)
+                except Exception as error:  # noqa: BLE001 - reported, and read again after the next change
+                    configuration = error
+            yield configuration
+        # replaced even if unchanged, so that the content of files no longer racily clean is not read again
+        previous = current
+        stop.wait(interval)
@@ -0,0 +1,246 @@
+"""generate a synthetic corpus of Python projects, modelled on the projects in `tests/data/input`."""
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from pathlib import Path
+
+KINDS = ("setup_py", "setup_cfg", "pyproject_toml", "mixed")
+SIZES = {"small": 4, "medium": 32, "large": 256}
+
+LICENSE = "BSD 3-Clause License\n"
+CLASSIFIERS = [
+    "Intended Audience :: Science/Research",
+    "License :: OSI Approved :: BSD License",
+    "Operating System :: POSIX :: Linux",
+    "Programming Language :: Python :: 3",
+    "Topic :: Scientific/Engineering :: Astronomy",
+]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse a project mix such as `setup_py=1,setup_cfg=2,pyproject_toml=1,mixed=1`."""
+    weights = {}
+    for entry in mix.split(","):
+        kind, weight = entry.split("=")
+        if kind not in KINDS:
+            message = f'unknown project kind "{kind}"; expected one of {KINDS}'
+            raise ValueError(message)
+        weights[kind] = float(weight)
+    return weights
+
+
+def generate_corpus(
+    directory: Path,
+    projects: int,
+    mix: Mapping[str, float] | None = None,
+    sizes: Mapping[str, float] | None = None,
+    seed: int = 0,
+) -> dict[Path, dict[str, str]]:
+    """Write synthetic projects into subdirectories of the given directory.
+
+    :param directory: directory in which to create projects
+    :param projects: number of projects to create
+    :param mix: relative weights of project kinds (by default, equal)
+    :param sizes: relative weights of project sizes (by default, equal)
+    :param seed: random seed, so that a corpus can be regenerated exactly
+    :return: mapping of project directories to their kind and size
+    """
+    if mix is None:
+        mix = dict.fromkeys(KINDS, 1)
+    if sizes is None:
+        sizes = dict.fromkeys(SIZES, 1)
+
+    generator = random.Random(seed)  # noqa: S311
+    corpus = {}
+    for index in range(projects):
+        kind = generator.choices(list(mix), weights=list(mix.values()))[0]
+        size = generator.choices(list(sizes), weights=list(sizes.values()))[0]
+        project_directory = directory / f"{kind}_{size}_{index:05d}"
+        project_directory.mkdir(parents=True, exist_ok=True)
+        for filename, contents in project_files(f"package{index}", kind, SIZES[size], generator).items():
+            (project_directory / filename).write_text(contents)
+        corpus[project_directory] = {"kind": kind, "size": size}
+    return corpus
+
+
+def project_files(name: str, kind: str, entries: int, generator: random.Random) -> dict[str, str]:
+    """Contents of the build files of a synthetic project, by filename."""
+    dependencies = [f"dependency{index}>={generator.randint(0, 9)}.{generator.randint(0, 99)}" for index in range(entries)]
+    extras = {f"extra{index}": dependencies[index::4] for index in range(min(4, entries))}
+    scripts = {f"{name}_script{index}": f"{name}.scripts.script{index}:main" for index in range(entries)}
+
+    files = {"README.md": f"# {name}\n", "LICENSE": LICENSE}
+    if kind == "setup_py":
+        files["setup.py"] = setup_py(name, dependencies, extras, scripts)
+    elif kind == "setup_cfg":
+        files["setup.cfg"] = setup_cfg(name, dependencies, extras, scripts, tools=True)
+        files["setup.py"] = "from setuptools import setup\n\nsetup()\n"
+        files["pyproject.toml"] = BUILD_SYSTEM
+    elif kind == "pyproject_toml":
+        files["pyproject.toml"] = pyproject_toml(name, dependencies, extras, scripts)
+    else:
+        files["setup.cfg"] = setup_cfg(name, dependencies, extras, scripts, tools=False)
+        files["setup.py"] = setup_py(name, dependencies[: len(dependencies) // 2], {}, {})
+        files["pyproject.toml"] = BUILD_SYSTEM + TOOLS_TOML
+        files["tox.ini"] = "[tox]\nenv_list = py3\n\n[testenv]\ncommands = pytest\n"
+    return files
+
+
+def setup_py(name: str, dependencies: list[str], extras: dict[str, list[str]], scripts: dict[str, str]) -> str:
+    # like `tests/data/input/setup_py/setup.py`, collections are defined as variables before the `setup()` call
+    lines = ["#! /usr/bin/env python", "import glob", "", "from setuptools import setup", ""]
+    lines.append("DEPENDENCIES = [")
+    lines.extend(f'    "{dependency}",' for dependency in dependencies)
+    lines.append("]")
+    lines.append("")
+    if len(extras) > 0:
+        lines.append("EXTRAS = {")
+        for extra, extra_dependencies in extras.items():
+            lines.append(f'    "{extra}": [')
+            lines.extend(f'        "{dependency}",' for dependency in extra_dependencies)
+            lines.append("    ],")
+        lines.append("}")
+        lines.append("")
+    if len(scripts) > 0:
+        lines.append("ENTRY_POINTS = {")
+        lines.append('    "console_scripts": [')
+        lines.extend(f'        "{script} = {target}",' for script, target in scripts.items())
+        lines.append("    ],")
+        lines.append("}")
+        lines.append("")
+    lines.append("setup(")
+    lines.append(f'    name="{name}",')
+    lines.append('    description="synthetic project",')
+    lines.append('    long_description=open("README.md").read(),')
+    lines.append('    author="synthetic developers",')
+    lines.append('    license="BSD",')
+    lines.append('    python_requires=">=3.9",')
+    lines.append('    setup_requires=["setuptools_scm"],')
+    lines.append("    use_scm_version=True,")
+    lines.append("    install_requires=DEPENDENCIES,")
+    if len(extras) > 0:
+        lines.append("    extras_require=EXTRAS,")
+    if len(scripts) > 0:
+        lines.append("    entry_points=ENTRY_POINTS,")
+    lines.append("    classifiers=[")
+    lines.extend(f'        "{classifier}",' for classifier in CLASSIFIERS)
+    lines.append("    ],")
+    lines.append("    zip_safe=False,")
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def setup_cfg(
+    name: str,
+    dependencies: list[str],
+    extras: dict[str, list[str]],
+    scripts: dict[str, str],
+    tools: bool,
+) -> str:
+    indent = " " * 4
+    lines = [
+        "[metadata]",
+        f"name = {name}",
+        "description = synthetic project",
+        "long_description = file: README.md",
+        "author = synthetic developers",
+        "license = BSD-3-Clause",
+        f"url = https://example.com/{name}",
+        "classifiers =",
+        *(f"{indent}{classifier}" for classifier in CLASSIFIERS),
+        "",
+        "[options]",
+        "zip_safe = False",
+        "python_requires = >=3.9",
+        "setup_requires =",
+        f"{indent}setuptools_scm",
+        "install_requires =",
+        *(f"{indent}{dependency}" for dependency in dependencies),
+        "",
+    ]
+    if len(extras) > 0:
+        lines.append("[options.extras_require]")
+        for extra, extra_dependencies in extras.items():
+            lines.append(f"{extra} =")
+            lines.extend(f"{indent}{dependency}" for dependency in extra_dependencies)
+        lines.append("")
+    if len(scripts) > 0:
+        lines.append("[options.entry_points]")
+        lines.append("console_scripts =")
+        lines.extend(f"{indent}{script} = {target}" for script, target in scripts.items())
+        lines.append("")
+    if tools:
+        lines.extend(
+            [
+                "[flake8]",
+                "max-line-length = 127",
+                "exclude =",
+                f"{indent}build",
+                f"{indent}docs",
+                "",
+                "[tool:pytest]",
+                "minversion = 6.0",
+                "addopts = --doctest-rst",
+                "",
+                "[coverage:run]",
+                "omit =",
+                f"{indent}{name}/tests/*",
+                "",
+            ],
+        )
+    return "\n".join(lines)
+
+
+def pyproject_toml(name: str, dependencies: list[str], extras: dict[str, list[str]], scripts: dict[str, str]) -> str:
+    lines = [
+        "[project]",
+        f"name = '{name}'",
+        "description = 'synthetic project'",
+        "readme = 'README.md'",
+        "requires-python = '>=3.9'",
+        "license = { file = 'LICENSE' }",
+        "authors = [{ name = 'synthetic developers' }]",
+        "classifiers = [",
+        *(f"    '{classifier}'," for classifier in CLASSIFIERS),
+        "]",
+        "dependencies = [",
+        *(f"    '{dependency}'," for dependency in dependencies),
+        "]",
+        "dynamic = ['version']",
+        "",
+    ]
+    if len(extras) > 0:
+        lines.append("[project.optional-dependencies]")
+        lines.extend(f"{extra} = {extra_dependencies!r}" for extra, extra_dependencies in extras.items())
+        lines.append("")
+    if len(scripts) > 0:
+        lines.append("[project.scripts]")
+        lines.extend(f"{script} = '{target}'" for script, target in scripts.items())
+        lines.append("")
+    return "\n".join(lines) + BUILD_SYSTEM + TOOLS_TOML
+
+
+BUILD_SYSTEM = """
+[build-system]
+requires = ['setuptools>=61.2', 'setuptools_scm[toml]>=3.4', 'wheel']
+build-backend = 'setuptools.build_meta'
+"""
+
+TOOLS_TOML = """
+[tool.setuptools_scm]
+
+[tool.ruff]
+line-length = 127
+exclude = ['build', 'docs']
+
+[tool.ruff.isort]
+known-first-party = ['synthetic']
+
+[tool.coverage.run]
+branch = true
+"""
@@ -0,0 +1,164 @@
+"""memory use of batch conversion through `PyProjectConfiguration.from_directory`."""
+
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+import warnings
+from typing import TYPE_CHECKING
+
+import pytest
+import tomli
+from corpus import generate_corpus
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.base import translator
+from peppyproject.files import read_setup_py
+from peppyproject.tables import ProjectMetadata, ToolsTable
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+pytestmark = pytest.mark.benchmark
+
+# conversions that fill bounded caches (`re`, `functools.lru_cache`, ...) before memory is expected to stay flat
+WARM_UP = 40
+CONVERSIONS = 60
+# retained bytes per conversion, after warm-up
+RETAINED_BUDGET = 256
+# resident set size growth over all conversions after warm-up
+RSS_BUDGET = 8 * 1024**2
+# peak allocation of each subsystem during a single conversion
+PEAK_BUDGETS = {
+    "parsing": 2 * 1024**2,
+    "translation": 8 * 1024**2,
+    "coercion": 2 * 1024**2,
+    "rendering": 2 * 1024**2,
+}
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory) -> list[Path]:
+    corpus = generate_corpus(
+        tmp_path_factory.mktemp("corpus"),
+        projects=WARM_UP + CONVERSIONS,
+        sizes={"small": 1, "medium": 1},
+        seed=2,
+    )
+    return list(corpus)
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    # log capture keeps every record emitted by `ini2toml`, which would otherwise count as retained memory
+    logging.disable(logging.WARNING)
+    # warnings go through the default action (and so into the warnings registry) as in a long-running batch
+    with warnings.catch_warnings():
+        warnings.simplefilter("default")
+        warnings.showwarning = lambda *args, **kwargs: None
+        yield
+    logging.disable(logging.NOTSET)
+
+
+def convert(directory: Path) -> str:
+    return PyProjectConfiguration.from_directory(directory).configuration
+
+
+def resident_set_size() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def test_retained_memory(corpus):
+    # tracing starts before warm-up, so that entries replaced in bounded caches do not count as growth
+    tracemalloc.start()
+    try:
+        for directory in corpus[:WARM_UP]:
+            convert(directory)
+        gc.collect()
+        start = tracemalloc.get_traced_memory()[0]
+        for directory in corpus[WARM_UP:]:
+            convert(directory)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+    print(f"retained {retained / CONVERSIONS:.0f} B per conversion after {WARM_UP} conversions")
+    assert retained / CONVERSIONS < RETAINED_BUDGET
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads `/proc/self/statm`")
+def test_resident_set_size(corpus):
+    for directory in corpus[:WARM_UP]:
+        convert(directory)
+    gc.collect()
+    start = resident_set_size()
+
+    for _ in range(3):
+        for directory in corpus[WARM_UP:]:
+            convert(directory)
+    gc.collect()
+    growth = resident_set_size() - start
+
+    print(f"resident set size grew {growth / 1024:.0f} KiB over {3 * CONVERSIONS} conversions")
+    assert growth < RSS_BUDGET
+
+
+def peak(function, *args, **kwargs) -> tuple[object, int]:
+    """Result of the function, and its peak allocation in bytes."""
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    result = function(*args, **kwargs)
+    return result, tracemalloc.get_traced_memory()[1] - start
+
+
+def subsystem_peaks(directory: Path) -> dict[str, int]:
+    peaks = dict.fromkeys(PEAK_BUDGETS, 0)
+
+    toml_strings = []
+    if (directory / "pyproject.toml").exists():
+        toml_strings.append((directory / "pyproject.toml").read_text())
+    if (directory / "setup.py").exists():
+        _, peaks["parsing"] = peak(read_setup_py, directory / "setup.py")
+    if (directory / "setup.cfg").exists():
+        toml_string, peaks["translation"] = peak(
+            translator().translate,
+            (directory / "setup.cfg").read_text(),
+            profile_name="setup.cfg",
+        )
+        toml_strings.append(toml_string)
+
+    for toml_string in toml_strings:
+        file_configuration, parsing = peak(tomli.loads, toml_string)
+        peaks["parsing"] = max(peaks["parsing"], parsing)
+
+        def coerce(file_configuration=file_configuration) -> None:
+            ProjectMetadata(directory=directory).update(file_configuration.get("project", {}))
+            ToolsTable(directory=directory).update(file_configuration.get("tool", {}))
+
+        _, coercion = peak(coerce)
+        peaks["coercion"] = max(peaks["coercion"], coercion)
+
+    configuration = PyProjectConfiguration.from_directory(directory)
+    _, peaks["rendering"] = peak(lambda: configuration.configuration)
+    return peaks
+
+
+def test_peak_by_subsystem(corpus):
+    tracemalloc.start()
+    try:
+        peaks = [subsystem_peaks(directory) for directory in corpus[:WARM_UP]]
+    finally:
+        tracemalloc.stop()
+
+    for subsystem, budget in PEAK_BUDGETS.items():
+        subsystem_peaks_ = sorted(project_peaks[subsystem] for project_peaks in peaks)
+        print(
+            f"{subsystem}: median {subsystem_peaks_[len(subsystem_peaks_) // 2] / 1024:.0f} KiB, "
+            f"max {subsystem_peaks_[-1] / 1024:.0f} KiB",
+        )
+        assert subsystem_peaks_[-1] < budget
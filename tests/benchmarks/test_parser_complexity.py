@@ -0,0 +1,142 @@
+"""empirical complexity of the `setup.py` parser in `peppyproject.files`.
+
+Each benchmark times a parser function on generated inputs that grow along a single axis, and fits the exponent `k`
+of `time ~ size ** k` on a log-log scale; an exponent above `MAXIMUM_EXPONENT` fails the benchmark as superlinear.
+Known superlinear axes are strict `xfail`s, so that a fix to the parser fails them until their marks are removed.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+
+from peppyproject.files import parse_function_parameters, python_statement, read_python_file, read_setup_py
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+pytestmark = pytest.mark.benchmark
+
+MAXIMUM_EXPONENT = 1.3
+REPEATS = 5
+# `python_statement` recurses once per continued line, so continued statements stay well below the recursion limit
+SIZES = {
+    "statements": [250, 500, 1000, 2000, 4000],
+    "continued_lines": [50, 100, 200, 400, 800],
+    "long_continued_lines": [50, 100, 200, 400, 800],
+    # the quadratic term only dominates the fit at larger sizes
+    "variables": [500, 1000, 2000, 4000, 8000],
+    "keyword_arguments": [250, 500, 1000, 2000, 4000],
+}
+
+
+def fit_exponent(sizes: list[int], durations: list[float]) -> float:
+    """Least-squares slope of `log(duration)` against `log(size)`."""
+    log_sizes = [math.log(size) for size in sizes]
+    log_durations = [math.log(duration) for duration in durations]
+    mean_size = sum(log_sizes) / len(log_sizes)
+    mean_duration = sum(log_durations) / len(log_durations)
+    return sum(
+        (log_size - mean_size) * (log_duration - mean_duration) for log_size, log_duration in zip(log_sizes, log_durations)
+    ) / sum((log_size - mean_size) ** 2 for log_size in log_sizes)
+
+
+def best_duration(function: Callable[[], object]) -> float:
+    durations = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def statements(size: int) -> str:
+    return "import glob\n" + "".join(f"import module{index}\n" for index in range(size)) + "setup(name='test')\n"
+
+
+def continued_lines(size: int) -> str:
+    return (
+        "import glob\n"
+        "DEPENDENCIES = [\n" + "".join(f'    "dependency{index}>=1.0",\n' for index in range(size)) + "]\n"
+        "setup(name='test', install_requires=DEPENDENCIES)\n"
+    )
+
+
+def long_continued_lines(size: int) -> str:
+    # with longer lines, the cost of concatenating the statement so far dominates the cost of each line
+    return (
+        "import glob\n"
+        "DEPENDENCIES = [\n" + "".join(f'    "dependency{index}>=1.0{" " * 200}",\n' for index in range(size)) + "]\n"
+        "setup(name='test', install_requires=DEPENDENCIES)\n"
+    )
+
+
+def variables(size: int) -> str:
+    return (
+        "import glob\n"
+        + "".join(f"VARIABLE{index} = ['value{index}']\n" for index in range(size))
+        + "setup(name='test', install_requires=VARIABLE0)\n"
+    )
+
+
+def keyword_arguments(size: int) -> str:
+    return ", ".join(f"keyword{index}='value{index}'" for index in range(size)) + ","
+
+
+def measure(axis: str, function: Callable[[str], object], generate: Callable[[int], str]) -> float:
+    sizes = SIZES[axis]
+    inputs = [generate(size) for size in sizes]
+    durations = [best_duration(lambda argument=argument: function(argument)) for argument in inputs]
+    exponent = fit_exponent(sizes, durations)
+    print(
+        f"{axis}: {', '.join(f'{size}={duration * 1000:.2f}ms' for size, duration in zip(sizes, durations))}; "
+        f"exponent {exponent:.2f}",
+    )
+    return exponent
+
+
+def written(directory: Path, function: Callable[[Path], object]) -> Callable[[str], object]:
+    """Write the generated input to a file, and call the function on the filename."""
+
+    def call(contents: str) -> object:
+        filename = directory / "setup.py"
+        filename.write_text(contents)
+        return function(filename)
+
+    return call
+
+
+def test_fit_exponent():
+    sizes = [1, 2, 4, 8]
+    assert fit_exponent(sizes, [size * 3.0 for size in sizes]) == pytest.approx(1)
+    assert fit_exponent(sizes, [size**2 * 3.0 for size in sizes]) == pytest.approx(2)
+
+
+@pytest.mark.xfail(reason="each continued line re-concatenates the statement so far", strict=True)
+def test_python_statement_continued_lines():
+    def read_statement(contents: str) -> object:
+        lines = contents.splitlines(keepends=True)
+        return python_statement(lines, index=1, statements=["import glob"])
+
+    assert measure("long_continued_lines", read_statement, long_continued_lines) <= MAXIMUM_EXPONENT
+
+
+def test_read_python_file_statements(tmp_path):
+    assert measure("statements", written(tmp_path, read_python_file), statements) <= MAXIMUM_EXPONENT
+
+
+def test_read_python_file_continued_lines(tmp_path):
+    assert measure("continued_lines", written(tmp_path, read_python_file), continued_lines) <= MAXIMUM_EXPONENT
+
+
+@pytest.mark.xfail(reason="every statement is searched for every variable defined before it", strict=True)
+def test_read_setup_py_variables(tmp_path):
+    assert measure("variables", written(tmp_path, read_setup_py), variables) <= MAXIMUM_EXPONENT
+
+
+def test_parse_function_parameters_keyword_arguments():
+    assert measure("keyword_arguments", parse_function_parameters, keyword_arguments) <= MAXIMUM_EXPONENT
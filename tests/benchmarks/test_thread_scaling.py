@@ -0,0 +1,42 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+
+pytestmark = pytest.mark.benchmark
+
+TEST_DIRECTORY = Path(__file__).parent.parent / "data"
+DIRECTORIES = [TEST_DIRECTORY / "input" / directory for directory in ["pyproject_toml", "setup_cfg", "setup_py"]]
+THREAD_COUNTS = [1, 2, 4, 8]
+CONVERSIONS = 48
+
+
+def convert(directory: Path) -> str:
+    return PyProjectConfiguration.from_directory(directory).configuration
+
+
+def throughput(threads: int) -> float:
+    """Conversions per second using the given number of threads."""
+    directories = DIRECTORIES * (CONVERSIONS // len(DIRECTORIES))
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # construct a translator in every worker thread before timing
+        list(executor.map(convert, DIRECTORIES * threads))
+        start = time.perf_counter()
+        list(executor.map(convert, directories))
+        return len(directories) / (time.perf_counter() - start)
+
+
+def test_thread_scaling():
+    results = {threads: throughput(threads) for threads in THREAD_COUNTS}
+    for threads, conversions_per_second in results.items():
+        print(
+            f"{threads} thread(s): {conversions_per_second:.1f} conversions / s ({conversions_per_second / results[1]:.2f}x)",
+        )
+
+    # throughput can only scale with threads without the GIL
+    if hasattr(sys, "_is_gil_enabled") and not sys._is_gil_enabled():
+        assert results[4] > 2 * results[1]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from corpus import KINDS, generate_corpus
+from throughput import compare, main, measure
+
+from peppyproject import PyProjectConfiguration
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_corpus(tmp_path):
+    corpus = generate_corpus(tmp_path, projects=len(KINDS) * 2, mix=dict.fromkeys(KINDS, 1), seed=1)
+
+    for directory in corpus:
+        configuration = PyProjectConfiguration.from_directory(directory)
+        assert configuration["project"]["name"] == f"package{directory.name.rsplit('_', 1)[-1].lstrip('0') or 0}"
+        assert len(configuration["project"]["dependencies"]) > 0
+
+
+def test_throughput(tmp_path):
+    results = measure(generate_corpus(tmp_path / "corpus", projects=20))
+    print(json.dumps(results, indent=2))
+
+    assert results["projects"] == 20
+    assert compare(results, results) == []
+
+    slower = {**results, "projects_per_second": results["projects_per_second"] / 2}
+    assert len(compare(results, slower)) == 1
+
+
+def test_compare_command(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    results_path = tmp_path / "results.json"
+
+    assert main(["run", "--projects", "4", "--size", "small", "--output", str(baseline_path)]) == 0
+    results = json.loads(baseline_path.read_text())
+    results["stages"]["from_directory"]["p50"] *= 2
+    results_path.write_text(json.dumps(results))
+
+    assert main(["compare", str(baseline_path), str(baseline_path)]) == 0
+    assert main(["compare", str(baseline_path), str(results_path)]) == 1
@@ -0,0 +1,148 @@
+"""end-to-end conversion throughput over a synthetic corpus.
+
+```
+python tests/benchmarks/throughput.py run --projects 200 --output results.json
+python tests/benchmarks/throughput.py compare baseline.json results.json --tolerance 0.1
+```
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from corpus import KINDS, SIZES, generate_corpus, parse_mix
+
+from peppyproject import PyProjectConfiguration
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+STAGES = ("from_directory", "configuration")
+
+
+def measure(corpus: Mapping[Path, Mapping[str, str]]) -> dict:
+    """Convert every project in the corpus, timing each stage of the conversion.
+
+    :param corpus: mapping of project directories to their kind and size, as returned by `generate_corpus`
+    :return: projects per second, and latency statistics of each stage, overall and by project kind
+    """
+    latencies = {stage: [] for stage in STAGES}
+    latencies_by_kind = {}
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for directory, properties in corpus.items():
+            stage_start = time.perf_counter()
+            configuration = PyProjectConfiguration.from_directory(directory)
+            read = time.perf_counter()
+            configuration.configuration  # noqa: B018
+            rendered = time.perf_counter()
+
+            project_latencies = {"from_directory": read - stage_start, "configuration": rendered - read}
+            kind_latencies = latencies_by_kind.setdefault(properties["kind"], {stage: [] for stage in STAGES})
+            for stage, latency in project_latencies.items():
+                latencies[stage].append(latency)
+                kind_latencies[stage].append(latency)
+    duration = time.perf_counter() - start
+
+    return {
+        "projects": len(corpus),
+        "duration": duration,
+        "projects_per_second": len(corpus) / duration,
+        "stages": {stage: latency_statistics(stage_latencies) for stage, stage_latencies in latencies.items()},
+        "kinds": {
+            kind: {stage: latency_statistics(stage_latencies) for stage, stage_latencies in kind_latencies.items()}
+            for kind, kind_latencies in latencies_by_kind.items()
+        },
+        "python": platform.python_version(),
+    }
+
+
+def latency_statistics(latencies: list[float]) -> dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def compare(baseline: Mapping, results: Mapping, tolerance: float = 0.1) -> list[str]:
+    """Regressions of the results relative to the baseline, beyond the given fractional tolerance."""
+    regressions = []
+    if results["projects_per_second"] < baseline["projects_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"throughput: {results['projects_per_second']:.1f} projects / s "
+            f"(baseline {baseline['projects_per_second']:.1f} projects / s)",
+        )
+    for stage, stage_statistics in results["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        for statistic in ("p50", "p95"):
+            value = stage_statistics[statistic]
+            baseline_value = baseline["stages"][stage][statistic]
+            if value > baseline_value * (1 + tolerance):
+                regressions.append(
+                    f"{stage} {statistic}: {value * 1000:.2f} ms (baseline {baseline_value * 1000:.2f} ms)",
+                )
+    return regressions
+
+
+def main(arguments: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="generate a corpus and measure conversion throughput")
+    run_parser.add_argument("--projects", type=int, default=100, help="number of projects in the corpus")
+    run_parser.add_argument("--mix", default=",".join(f"{kind}=1" for kind in KINDS), help="relative weights of kinds")
+    run_parser.add_argument("--size", choices=SIZES, help="only generate projects of this size")
+    run_parser.add_argument("--seed", type=int, default=0, help="random seed of the corpus")
+    run_parser.add_argument("--output", type=Path, help="path to which to write JSON results")
+
+    compare_parser = subparsers.add_parser("compare", help="flag regressions against a stored baseline")
+    compare_parser.add_argument("baseline", type=Path, help="JSON results of the baseline")
+    compare_parser.add_argument("results", type=Path, help="JSON results to compare")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1, help="fractional tolerance of regressions")
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.command == "run":
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = generate_corpus(
+                Path(directory),
+                projects=arguments.projects,
+                mix=parse_mix(arguments.mix),
+                sizes={arguments.size: 1} if arguments.size is not None else None,
+                seed=arguments.seed,
+            )
+            results = measure(corpus)
+        results_string = json.dumps(results, indent=2)
+        if arguments.output is not None:
+            arguments.output.write_text(results_string)
+        print(results_string)
+    else:
+        regressions = compare(
+            json.loads(arguments.baseline.read_text()),
+            json.loads(arguments.results.read_text()),
+            tolerance=arguments.tolerance,
+        )
+        for regression in regressions:
+            print(f"regression in {regression}")
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", default=False, help="run benchmarks in `tests/benchmarks`")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: benchmark, only run with `--benchmark`")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--benchmark"):
+        skip_benchmark = pytest.mark.skip(reason="benchmarks only run with `--benchmark`")
+        for item in items:
+            if "benchmark" in item.keywords:
+                item.add_marker(skip_benchmark)
@@ -0,0 +1,62 @@
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.archive import read_archive
+from peppyproject.batch import discover
+from peppyproject.hooks import handling
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def make_archive(directory: Path, filename: Path) -> Path:
+    """Pack the files of the given directory into an sdist-like archive, under a single top-level directory."""
+    root = f"example-{directory.name}"
+    if filename.suffix == ".zip":
+        with zipfile.ZipFile(filename, "w") as archive:
+            for path in directory.iterdir():
+                if path.is_file():
+                    archive.write(path, f"{root}/{path.name}")
+            archive.writestr(f"{root}/src/example/setup.py", "raise RuntimeError\n")
+    else:
+        with tarfile.open(filename, "w:gz") as archive:
+            archive.add(directory, arcname=root, filter=lambda member: None if "__pycache__" in member.name else member)
+    return filename
+
+
+@pytest.mark.parametrize("directory", ["pyproject_toml", "setup_cfg", "setup_py"])
+@pytest.mark.parametrize("suffix", [".tar.gz", ".zip"])
+def test_from_archive(directory, suffix, tmp_path):
+    input_path = TEST_DIRECTORY / "input" / directory
+    archive_path = make_archive(input_path, tmp_path / f"example{suffix}")
+
+    directories = []
+    with handling({"file_read": lambda filename: directories.append(filename.parent)}):
+        configuration = PyProjectConfiguration.from_archive(archive_path)
+    assert configuration.configuration == PyProjectConfiguration.from_directory(input_path).configuration
+    assert set(directories) == {archive_path / f"example-{directory}"}
+
+
+def test_read_archive(tmp_path):
+    archive_path = make_archive(TEST_DIRECTORY / "input" / "setup_py", tmp_path / "example.zip")
+
+    directory, files = read_archive(archive_path)
+    assert directory == archive_path / "example-setup_py"
+    # only top-level build files are read; other top-level files are only listed
+    assert files["setup.py"] == (TEST_DIRECTORY / "input" / "setup_py" / "setup.py").read_bytes()
+    assert files["README.rst"] is None
+    assert set(files) == {"LICENSE", "README.rst", "setup.cfg", "setup.py"}
+
+    with pytest.raises(ValueError, match="unsupported archive"):
+        read_archive(tmp_path / "example.rar")
+
+
+def test_discover_archives(tmp_path):
+    archive_path = make_archive(TEST_DIRECTORY / "input" / "setup_cfg", tmp_path / "example.tar.gz")
+
+    assert list(discover([tmp_path])) == []
+    assert list(discover([tmp_path], archives=True)) == [archive_path]
+    assert list(discover([archive_path])) == [archive_path]
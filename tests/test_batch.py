@@ -0,0 +1,59 @@
+from pathlib import Path, PurePosixPath
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.batch import convert_many, discover, merge_results, shard_of
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+DIRECTORIES = [TEST_DIRECTORY / "input" / directory for directory in ["pyproject_toml", "setup_cfg", "setup_py"]]
+
+
+def test_discover(tmp_path):
+    for directory in ["project", "project/docs", ".hidden/project", "data"]:
+        (tmp_path / directory).mkdir(parents=True, exist_ok=True)
+    (tmp_path / "project" / "setup.py").write_text("")
+    (tmp_path / "project" / "docs" / "pyproject.toml").write_text("")
+    (tmp_path / ".hidden" / "project" / "setup.cfg").write_text("")
+    (tmp_path / "data" / "README.md").write_text("")
+
+    assert list(discover([str(tmp_path)])) == [tmp_path / "project", tmp_path / "project" / "docs"]
+    assert list(discover(TEST_DIRECTORY / "input" for _ in range(2))) == DIRECTORIES * 2
+
+
+def test_convert_many(tmp_path):
+    (tmp_path / "pyproject.toml").write_text("[project\n")
+
+    results = list(convert_many([*DIRECTORIES, tmp_path], workers=2))
+    assert [directory for directory, _ in results] == [*DIRECTORIES, tmp_path]
+    for directory, result in results[:-1]:
+        assert result == PyProjectConfiguration.from_directory(directory).configuration
+    assert isinstance(results[-1][1], Exception)
+
+
+def test_shards(tmp_path):
+    for index in range(20):
+        (tmp_path / f"project{index}").mkdir()
+        (tmp_path / f"project{index}" / "setup.py").write_text("")
+
+    projects = set(discover([tmp_path]))
+    shards = [set(discover([tmp_path], shard=(index, 3))) for index in range(1, 4)]
+    assert set().union(*shards) == projects
+    assert sum(len(shard) for shard in shards) == len(projects)
+
+    # shards depend only on the path relative to the root
+    assert shard_of(PurePosixPath("project0"), 3) == shard_of(Path("project0"), 3)
+    assert shard_of(PurePosixPath("a/b"), 1000) == 980
+
+    with pytest.raises(ValueError, match="does not exist"):
+        list(discover([tmp_path], shard=(4, 3)))
+
+
+def test_merge_results(tmp_path):
+    (tmp_path / "1.jsonl").write_text('{"directory": "b", "pyproject": ""}\n{"directory": "a", "error": "old"}\n')
+    (tmp_path / "2.json").write_text('[{"directory": "a", "pyproject": "new"}]')
+
+    assert merge_results([tmp_path / "1.jsonl", tmp_path / "2.json"]) == [
+        {"directory": "a", "pyproject": "new"},
+        {"directory": "b", "pyproject": ""},
+    ]
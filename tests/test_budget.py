@@ -0,0 +1,96 @@
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.batch import convert_many
+from peppyproject.budget import Budget, budgeted
+from peppyproject.files import read_setup_py, read_setup_py_literals
+from peppyproject.hooks import handling
+from peppyproject.metrics import metrics
+
+DATA_DIRECTORY = Path(__file__).parent / "data"
+
+
+def doubling_setup_py(directory: Path, doublings: int) -> Path:
+    # the static parser expands each variable as text, so the value doubles (with escaping) at every statement
+    filename = directory / "setup.py"
+    filename.write_text(
+        "from setuptools import setup\n"
+        "X0X = ['dependency']\n"
+        + "".join(f"X{index}X = X{index - 1}X + X{index - 1}X\n" for index in range(1, doublings + 1))
+        + "setup(name='doubling', install_requires=X0X,)\n"
+    )
+    return filename
+
+
+def test_read_setup_py_literals():
+    filename = DATA_DIRECTORY / "input" / "setup_py" / "setup.py"
+    assert read_setup_py_literals(filename) == read_setup_py(filename)
+
+
+def test_bytes(tmp_path):
+    shutil.copytree(
+        DATA_DIRECTORY / "input" / "setup_py", tmp_path, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+    )
+
+    with budgeted(Budget(bytes=100)), pytest.warns(UserWarning, match="skipping it"):
+        configuration = PyProjectConfiguration.from_directory(tmp_path)
+
+    assert configuration["project"]["name"] is None
+
+
+@pytest.mark.parametrize("budget", [Budget(statements=10), Budget(seconds=0.1)], ids=["statements", "seconds"])
+def test_fallback(tmp_path, budget):
+    doubling_setup_py(tmp_path, doublings=14)
+
+    start = time.perf_counter()
+    with budgeted(budget), pytest.warns(UserWarning, match="reading only its literal arguments"):
+        configuration = PyProjectConfiguration.from_directory(tmp_path)
+    # unbudgeted, the static parser takes seconds (and memory growing fourfold with each further doubling)
+    assert time.perf_counter() - start < 1.5
+
+    assert configuration["project"]["name"] == "doubling"
+    assert configuration["project"]["dependencies"] == ["dependency"]
+
+
+def test_batch(tmp_path):
+    for name in ("pyproject_toml", "setup_py"):
+        shutil.copytree(DATA_DIRECTORY / "input" / name, tmp_path / name, ignore=shutil.ignore_patterns("__pycache__"))
+    (tmp_path / "doubling").mkdir()
+    doubling_setup_py(tmp_path / "doubling", doublings=14)
+
+    with metrics() as conversion_metrics, pytest.warns(UserWarning, match="literal arguments"):
+        results = dict(convert_many(sorted(tmp_path.iterdir()), workers=2, budget=Budget(statements=10)))
+
+    assert not any(isinstance(result, Exception) for result in results.values())
+    assert 'name = "doubling"' in results[tmp_path / "doubling"]
+    # the other `setup.py` scripts are also over budget, but their literal arguments are the same
+    assert results[tmp_path / "setup_py"] == next(convert_many([tmp_path / "setup_py"]))[1]
+    assert set(conversion_metrics.budgets_exceeded) == {"statements"}
+
+
+def test_long_statement(tmp_path):
+    (tmp_path / "setup.py").write_text(f"from setuptools import setup\nsetup(name='long', description='{'a' * 65536}')\n")
+
+    start = time.perf_counter()
+    with budgeted(Budget(seconds=2)), pytest.warns(UserWarning, match="reading only its literal arguments"):
+        configuration = PyProjectConfiguration.from_directory(tmp_path)
+    # unbudgeted, a single regular expression of the static parser takes tens of seconds
+    assert time.perf_counter() - start < 1.5
+
+    assert configuration["project"]["name"] == "long"
+
+
+def test_invalid_python(tmp_path):
+    (tmp_path / "setup.py").write_text("from setuptools import setup\nprint 'python 2'\nsetup(name='invalid')\n")
+
+    skipped = []
+    handlers = {"file_skipped": lambda filename: skipped.append(filename.name)}
+    with budgeted(Budget(statements=1)), handling(handlers), pytest.warns(UserWarning, match="not valid Python"):
+        configuration = PyProjectConfiguration.from_directory(tmp_path)
+
+    assert "setup.py" in skipped
+    assert configuration["project"]["name"] is None
@@ -0,0 +1,53 @@
+import shutil
+from pathlib import Path
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.cache import FileCache, caching
+from peppyproject.hooks import handling
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def test_file_cache(tmp_path):
+    shutil.copytree(
+        TEST_DIRECTORY / "input" / "setup_cfg", tmp_path, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+    )
+    reference = PyProjectConfiguration.from_directory(tmp_path).configuration
+
+    cache = FileCache()
+    read = []
+    with caching(cache), handling({"file_read": lambda filename: read.append(filename.name)}):
+        assert PyProjectConfiguration.from_directory(tmp_path).configuration == reference
+        cold_reads = len(read)
+        # merging into the table of the project must not change the cached tables
+        assert PyProjectConfiguration.from_directory(tmp_path).configuration == reference
+        assert len(read) == cold_reads
+
+        # a new file changes the names against which files are resolved, so every file is read again
+        (tmp_path / "LICENSE.txt").write_text("license\n")
+        PyProjectConfiguration.from_directory(tmp_path)
+        assert len(read) == 2 * cold_reads
+
+    cache.invalidate([tmp_path / "setup.cfg"])
+    with caching(cache), handling({"file_read": lambda filename: read.append(filename.name)}):
+        PyProjectConfiguration.from_directory(tmp_path)
+    assert set(read[2 * cold_reads :]) == {"setup.cfg"}
+
+
+def test_refresh(tmp_path):
+    shutil.copytree(
+        TEST_DIRECTORY / "input" / "setup_cfg", tmp_path, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+    )
+    configuration = PyProjectConfiguration.from_directory(tmp_path)
+    assert configuration.refresh([tmp_path / "setup.cfg"]) == []
+
+    setup_cfg = tmp_path / "setup.cfg"
+    setup_cfg.write_text(setup_cfg.read_text().replace("name = ", "name = renamed-", 1))
+    read = []
+    with handling({"file_read": lambda filename: read.append(filename.name)}):
+        changed = configuration.refresh([setup_cfg])
+
+    assert set(read) == {"setup.cfg"}
+    assert changed == ["project.name"]
+    assert configuration["project"]["name"].startswith("renamed-")
+    assert configuration.configuration == PyProjectConfiguration.from_directory(tmp_path).configuration
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.check import check, first_difference, normalize
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "difference"),
+    [
+        ({"a": {"b": 1, "c": [1, 2]}}, {"a": {"c": [1, 2], "b": 1}}, None),
+        ({"a": {"b": 1}}, {"a": {"b": 2}}, {"key": "a.b", "old": 1, "new": 2}),
+        ({"a": [1, 2]}, {"a": [2, 1]}, {"key": "a", "old": [1, 2], "new": [2, 1]}),
+        ({"a": 1}, {"a": True}, {"key": "a", "old": 1, "new": True}),
+        ({}, {"a": {"b": {"c": 1}}}, {"key": "a.b.c", "new": 1}),
+        ({"a": {}, "b": 1}, {"b": 1}, {"key": "a", "old": {}}),
+        # the first difference, in order of key
+        ({"a": 1, "b": 1}, {"a": 2, "b": 2}, {"key": "a", "old": 1, "new": 2}),
+    ],
+)
+def test_first_difference(old, new, difference):
+    assert first_difference(normalize(old), normalize(new)) == difference
+
+
+def test_normalize():
+    assert normalize({"a": None, "b": ("x", Path("y")), "c": {"z"}}) == {"b": ["x", "y"], "c": ["z"]}
+
+
+@pytest.mark.parametrize(
+    "directory",
+    [
+        "pyproject_toml",
+        pytest.param(
+            "setup_cfg",
+            marks=pytest.mark.xfail(reason="`namespaces` of `options.packages.find` is not converted (as in `test_write`)"),
+        ),
+        "setup_py",
+    ],
+)
+def test_check_reference(directory):
+    configuration = PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / directory)
+    assert check(configuration, TEST_DIRECTORY / "reference" / directory / "pyproject.toml") is None
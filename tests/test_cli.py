@@ -1,7 +1,12 @@
+import json
+import shutil
+import subprocess
+import tarfile
 from pathlib import Path
 
 import pytest
 import tomli
+import tomli_w
 from typer.testing import CliRunner
 
 from peppyproject.__main__ import app
@@ -33,3 +38,225 @@ def test_write(directory, output, tmp_path):
     else:
         with open(test_path, "rb") as test_file:
             assert tomli.load(test_file) == reference_tomli
+
+
+@pytest.mark.parametrize("directory", ["pyproject_toml", "setup_cfg", "setup_py"])
+def test_get(directory):
+    input_path = TEST_DIRECTORY / "input" / directory
+    reference_path = TEST_DIRECTORY / "reference" / directory / "pyproject.toml"
+
+    with open(reference_path, "rb") as reference_file:
+        reference_tomli = tomli.load(reference_file)
+
+    result = runner.invoke(app, ["get", "project.dependencies", str(input_path)])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == reference_tomli["project"].get("dependencies")
+
+    # derived from `project.dynamic`
+    result = runner.invoke(app, ["get", "tool.setuptools_scm", str(input_path)])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == reference_tomli["tool"].get("setuptools_scm")
+
+    result = runner.invoke(app, ["get", "project.name", str(input_path), str(input_path)])
+    assert result.exit_code == 0
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {"directory": str(input_path), "value": reference_tomli["project"]["name"]}
+    ] * 2
+
+
+def test_profile():
+    input_path = TEST_DIRECTORY / "input" / "setup_cfg"
+
+    result = runner.invoke(app, [str(input_path), "--profile"])
+    assert result.exit_code == 0
+    assert "translate" in result.stderr
+    assert "translate" not in result.stdout
+
+
+def test_batch(tmp_path):
+    input_path = TEST_DIRECTORY / "input"
+    output_path = tmp_path / "output.jsonl"
+    trace_path = tmp_path / "trace.json"
+
+    result = runner.invoke(app, ["batch", str(input_path), "-o", str(output_path), "-j", "2", "--trace", str(trace_path)])
+    assert result.exit_code == 0
+
+    with open(output_path) as output_file:
+        records = [json.loads(line) for line in output_file]
+    assert [record["directory"] for record in records] == [
+        str(input_path / directory) for directory in ["pyproject_toml", "setup_cfg", "setup_py"]
+    ]
+    for record in records:
+        assert "[project]" in record["pyproject"]
+
+    with open(trace_path) as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert {event["args"]["directory"] for event in events if event["name"] == "project"} == {
+        record["directory"] for record in records
+    }
+
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "pyproject.toml").write_text("[project\n")
+    result = runner.invoke(app, ["batch", str(tmp_path / "broken")])
+    assert result.exit_code == 1
+    assert "error" in json.loads(result.stdout.splitlines()[0])
+
+
+def test_batch_metrics(tmp_path):
+    input_path = TEST_DIRECTORY / "input"
+    metrics_path = tmp_path / "metrics.prom"
+
+    result = runner.invoke(
+        app, ["batch", str(input_path), "-o", str(tmp_path / "output.jsonl"), "--metrics", str(metrics_path)]
+    )
+    assert result.exit_code == 0
+    assert "peppyproject_projects_converted_total 3" in metrics_path.read_text().splitlines()
+
+    # metrics on stdout would be interleaved with the results
+    result = runner.invoke(app, ["batch", str(input_path), "--metrics", "-"])
+    assert result.exit_code != 0
+    assert "--metrics" in result.output
+
+
+def test_sharded_batch(tmp_path):
+    input_path = TEST_DIRECTORY / "input"
+
+    arguments = []
+    for index in [1, 2]:
+        results_path = tmp_path / f"results{index}.jsonl"
+        metrics_path = tmp_path / f"metrics{index}.prom"
+        result = runner.invoke(
+            app,
+            ["batch", str(input_path), "--shard", f"{index}/2", "-o", str(results_path), "--metrics", str(metrics_path)],
+        )
+        assert result.exit_code == 0
+        arguments.extend([str(results_path), str(metrics_path)])
+
+    result = runner.invoke(app, ["merge", *arguments, "--metrics", str(tmp_path / "metrics.prom")])
+    assert result.exit_code == 0
+    assert [json.loads(line)["directory"] for line in result.stdout.splitlines()] == [
+        str(input_path / directory) for directory in ["pyproject_toml", "setup_cfg", "setup_py"]
+    ]
+    assert "peppyproject_projects_converted_total 3" in (tmp_path / "metrics.prom").read_text().splitlines()
+
+    result = runner.invoke(app, ["batch", str(input_path), "--shard", "3/2"])
+    assert result.exit_code != 0
+
+
+def test_resumed_batch(tmp_path):
+    input_path = tmp_path / "input"
+    for directory in ["pyproject_toml", "setup_py"]:
+        shutil.copytree(TEST_DIRECTORY / "input" / directory, input_path / directory)
+    results_path = tmp_path / "results.jsonl"
+    journal_path = tmp_path / "journal.jsonl"
+    arguments = ["batch", str(input_path), "-o", str(results_path), "--journal", str(journal_path)]
+
+    result = runner.invoke(app, arguments)
+    assert result.exit_code == 0
+    assert len(results_path.read_text().splitlines()) == 2
+
+    with open(input_path / "setup_py" / "setup.py", "a") as setup_file:
+        setup_file.write("\n# changed\n")
+    result = runner.invoke(app, [*arguments, "--resume"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert [record["directory"] for record in records] == [
+        str(input_path / "pyproject_toml"),
+        str(input_path / "setup_py"),
+        str(input_path / "setup_py"),
+    ]
+
+    # a batch that is not resumed truncates its output, and so starts a new journal
+    result = runner.invoke(
+        app, ["batch", str(input_path / "setup_py"), "-o", str(results_path), "--journal", str(journal_path)]
+    )
+    assert result.exit_code == 0
+    result = runner.invoke(app, [*arguments, "--resume"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert sorted(record["directory"] for record in records) == [
+        str(input_path / "pyproject_toml"),
+        str(input_path / "setup_py"),
+    ]
+
+    result = runner.invoke(app, ["batch", str(input_path), "--resume"])
+    assert result.exit_code != 0
+
+
+def test_archive(tmp_path):
+    input_path = TEST_DIRECTORY / "input" / "setup_cfg"
+    archive_path = tmp_path / "example-1.0.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as archive:
+        for filename in input_path.iterdir():
+            if filename.is_file():
+                archive.add(filename, arcname=f"example-1.0/{filename.name}")
+
+    result = runner.invoke(app, [str(archive_path)])
+    assert result.exit_code == 0
+    assert result.stdout == runner.invoke(app, [str(input_path)]).stdout
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+def test_revision(tmp_path):
+    shutil.copytree(TEST_DIRECTORY / "input" / "pyproject_toml", tmp_path, dirs_exist_ok=True)
+    git = shutil.which("git")
+    for arguments in [
+        ["init"],
+        ["add", "--all"],
+        ["-c", "user.name=a", "-c", "user.email=a@example.com", "commit", "-m", "first"],
+    ]:
+        subprocess.run([git, *arguments], cwd=tmp_path, check=True, capture_output=True)  # noqa: S603
+    expected = runner.invoke(app, [str(tmp_path)]).stdout
+    (tmp_path / "pyproject.toml").write_text("[project\n")
+
+    result = runner.invoke(app, [str(tmp_path), "--rev", "HEAD"])
+    assert result.exit_code == 0
+    assert result.stdout == expected
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+def test_sweep(tmp_path):
+    shutil.copytree(TEST_DIRECTORY / "input" / "pyproject_toml", tmp_path, dirs_exist_ok=True)
+    git = shutil.which("git")
+    pyproject_toml = tmp_path / "pyproject.toml"
+    for index in range(3):
+        if index == 2:
+            pyproject_toml.write_text(pyproject_toml.read_text().replace("description = '", "description = 'changed ", 1))
+        for arguments in [
+            ["init"],
+            ["add", "--all"],
+            ["-c", "user.name=a", "-c", "user.email=a@example.com", "commit", "--allow-empty", "-m", str(index)],
+        ]:
+            subprocess.run([git, *arguments], cwd=tmp_path, check=True, capture_output=True)  # noqa: S603
+
+    result = runner.invoke(app, ["sweep", str(tmp_path)])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert len(records) == 2
+    assert [change["key"] for change in records[1]["changes"]] == ["project.description"]
+    assert "converted 2 of 3 commit(s)" in result.stderr
+
+
+def test_check(tmp_path):
+    project_path = tmp_path / "setup_py"
+    shutil.copytree(TEST_DIRECTORY / "input" / "setup_py", project_path, ignore=shutil.ignore_patterns("__pycache__"))
+
+    result = runner.invoke(app, [str(project_path), "--check"])
+    assert result.exit_code == 1
+    assert "does not exist" in result.stderr
+
+    result = runner.invoke(app, [str(project_path), "-o", str(project_path / "pyproject.toml")])
+    assert result.exit_code == 0
+    result = runner.invoke(app, [str(project_path), "--check"])
+    assert result.exit_code == 0
+
+    # `setup.py` still gives dependencies, which the existing file no longer has
+    with open(project_path / "pyproject.toml", "rb") as toml_file:
+        configuration = tomli.load(toml_file)
+    del configuration["project"]["dependencies"]
+    (project_path / "pyproject.toml").write_text(tomli_w.dumps(configuration))
+
+    result = runner.invoke(app, [str(project_path), "--check"])
+    assert result.exit_code == 1
+    assert "at `project.dependencies`" in result.stdout
+    assert '+ ["astropy"' in result.stdout
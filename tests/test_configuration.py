@@ -1,7 +1,15 @@
+import asyncio
+import copy
+from pathlib import Path
+
 import pytest
 
-from peppyproject import PyProjectConfiguration
+from peppyproject import PyProjectConfiguration, aconvert_many
+from peppyproject.budget import Budget, budgeted
 from peppyproject.files import inify_mapping
+from peppyproject.hooks import handling
+from peppyproject.tables import ToolsTable
+from peppyproject.tools.ruff import RuffTable
 
 
 def test_nested_inify():
@@ -23,3 +31,148 @@ def test_configuration():
         configuration["nonexistent_table"]
 
     assert configuration["project"]["dynamic"] is None
+
+
+def test_freeze():
+    configuration = PyProjectConfiguration()
+    frozen = configuration.freeze()
+
+    assert frozen == PyProjectConfiguration().freeze()
+    assert hash(frozen) == hash(PyProjectConfiguration().freeze())
+    assert len({frozen, PyProjectConfiguration().freeze()}) == 1
+    assert frozen["build-system"]["requires"] == ("setuptools>=61.2", "wheel")
+
+    with pytest.raises(TypeError):
+        frozen["project"]["name"] = "test"
+
+    configuration["project"]["name"] = "test"
+    assert configuration.freeze() != frozen
+    assert configuration.freeze().digest != frozen.digest
+    assert configuration.freeze()["tool"] is not None
+
+
+def test_freeze_reuse():
+    configuration = PyProjectConfiguration.from_directory(Path(__file__).parent / "data" / "input" / "setup_cfg")
+    frozen = configuration.freeze()
+
+    # snapshots of an unchanged configuration are the same object, down to each table
+    assert configuration.freeze() is frozen
+
+    configuration["tool"]["ruff"]["line-length"] = 100
+    changed = configuration.freeze()
+    assert changed is not frozen
+    assert changed["tool"] is not frozen["tool"]
+    assert changed["tool"]["ruff"] is not frozen["tool"]["ruff"]
+    assert changed["tool"]["ruff"]["line-length"] == 100
+    # tables that did not change are shared with the previous snapshot
+    assert changed["project"] is frozen["project"]
+    assert changed["build-system"] is frozen["build-system"]
+    assert changed["tool"]["coverage"] is frozen["tool"]["coverage"]
+
+    # copies leave out the snapshot, and take an equal one
+    copied = copy.deepcopy(configuration)
+    assert copied.freeze() == changed
+    assert copied.freeze() is not changed
+
+
+def test_lazy_from_directory(monkeypatch):
+    directory = Path(__file__).parent / "data" / "input" / "setup_cfg"
+
+    read_tables = []
+    from_directory = ToolsTable.from_directory.__func__
+
+    def recording_from_directory(cls, directory, **kwargs):
+        read_tables.append(cls.name)
+        return from_directory(cls, directory, **kwargs)
+
+    monkeypatch.setattr(ToolsTable, "from_directory", classmethod(recording_from_directory))
+
+    configuration = PyProjectConfiguration.from_directory(directory, lazy=True)
+    assert len(configuration) == 3
+    assert configuration["project"]["name"] == "jwst"
+    assert read_tables == []
+
+    assert configuration.configuration == PyProjectConfiguration.from_directory(directory).configuration
+    assert read_tables == ["tool", "tool"]
+
+
+def test_get():
+    directory = Path(__file__).parent / "data" / "input" / "setup_cfg"
+    configuration = PyProjectConfiguration.from_directory(directory)
+
+    for key in ["project.dependencies", "project.name", "tool.coverage.run", "build-system.requires"]:
+        assert PyProjectConfiguration.from_directory(directory, lazy=True, key=key).get(key) == configuration.get(key)
+
+    assert configuration.get("project.nonexistent") is None
+    assert configuration.get("nonexistent.table", default=1) == 1
+
+
+@pytest.mark.parametrize("directory", ["pyproject_toml", "setup_cfg", "setup_py"])
+def test_get_every_key(directory):
+    directory = Path(__file__).parent / "data" / "input" / directory
+    configuration = PyProjectConfiguration.from_directory(directory)
+
+    # including keys derived from other tables, such as `tool.setuptools_scm` from `project.dynamic`
+    for table, entries in configuration.as_dict().items():
+        for key in [table, *(f"{table}.{entry}" for entry in entries)]:
+            value = PyProjectConfiguration.from_directory(directory, lazy=True, key=key).get(key)
+            assert value == configuration.get(key), key
+
+
+def test_dotted_keys():
+    assert RuffTable.index["isort.known-first-party"].type == list[str]
+    assert ToolsTable.index["ruff.isort.known-first-party"] == RuffTable.index["isort.known-first-party"]
+
+    tools = ToolsTable()
+    tools.set("ruff.line-length", "127")
+    tools.set("ruff.isort.known-first-party", ["peppyproject"])
+    tools.set("pytest.ini_options.minversion", "6.0")
+
+    assert isinstance(tools["ruff"], RuffTable)
+    assert tools.get("ruff.line-length") == 127
+    assert tools.get("ruff.isort.known-first-party") == ["peppyproject"]
+    assert tools.get("pytest.ini_options.minversion") == "6.0"
+    assert tools.get("ruff.isort.nonexistent", default=1) == 1
+
+    with pytest.raises(KeyError):
+        tools["ruff"].set("isort.nonexistent", True)
+
+    with pytest.warns(UserWarning, match="unknown key"):
+        tools["ruff"]["nonexistent"] = True
+
+
+def test_async():
+    directories = [Path(__file__).parent / "data" / "input" / directory for directory in ["pyproject_toml", "setup_py"]]
+
+    async def convert():
+        configuration = await PyProjectConfiguration.afrom_directory(directories[0])
+        converted = {
+            directory: configuration
+            async for directory, configuration in aconvert_many(directories * 2, limit=2, key="project.name")
+        }
+        with pytest.raises(FileNotFoundError):
+            async for _ in aconvert_many([Path(__file__).parent / "nonexistent"]):
+                pass
+        return configuration, converted
+
+    configuration, converted = asyncio.run(convert())
+
+    assert configuration.configuration == PyProjectConfiguration.from_directory(directories[0]).configuration
+    assert {directory: configuration.get("project.name") for directory, configuration in converted.items()} == {
+        directories[0]: "romancal",
+        directories[1]: "crds",
+    }
+
+
+def test_async_context():
+    directory = Path(__file__).parent / "data" / "input" / "setup_py"
+    skipped = []
+
+    async def convert():
+        # the budget and hooks of the calling task apply in the executor
+        with budgeted(Budget(bytes=10)), handling({"file_skipped": lambda filename: skipped.append(filename.name)}):
+            return await PyProjectConfiguration.afrom_directory(directory)
+
+    with pytest.warns(UserWarning, match="skipping it"):
+        asyncio.run(convert())
+    assert "setup.py" in skipped
@@ -0,0 +1,140 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.git import Repository, repository
+from peppyproject.hooks import handling
+from peppyproject.sweep import diff, flatten, sweep
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+GIT = shutil.which("git")
+
+pytestmark = pytest.mark.skipif(GIT is None, reason="requires git")
+
+
+def git(path: Path, *arguments: str) -> None:
+    subprocess.run([GIT, *arguments], cwd=path, check=True, capture_output=True)  # noqa: S603
+
+
+def commit(path: Path, message: str) -> None:
+    git(path, "add", "--all")
+    git(path, "-c", "user.name=a", "-c", "user.email=a@example.com", "commit", "-m", message)
+
+
+@pytest.fixture
+def git_repository(tmp_path):
+    """Repository with a project in the subdirectory `project`, renamed by its second commit."""
+    git(tmp_path, "init")
+    shutil.copytree(TEST_DIRECTORY / "input" / "setup_cfg", tmp_path / "project", ignore=shutil.ignore_patterns("__pycache__"))
+    commit(tmp_path, "first")
+    git(tmp_path, "tag", "first")
+    setup_cfg = tmp_path / "project" / "setup.cfg"
+    setup_cfg.write_text(setup_cfg.read_text().replace("name = jwst", "name = renamed", 1))
+    commit(tmp_path, "second")
+    # uncommitted changes are never read
+    (tmp_path / "project" / "extra.ini").write_text("[extra\n")
+    return tmp_path
+
+
+def test_from_revision(git_repository):
+    project_path = git_repository / "project"
+
+    configuration = PyProjectConfiguration.from_revision(project_path, "first")
+    assert configuration["project"]["name"] == "jwst"
+    assert (
+        configuration.configuration
+        == PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / "setup_cfg").configuration
+    )
+    assert PyProjectConfiguration.from_revision(project_path, "HEAD")["project"]["name"] == "renamed"
+    assert (
+        PyProjectConfiguration.from_revision(project_path, "HEAD~1", lazy=True, key="project.name").get("project.name")
+        == "jwst"
+    )
+
+    with pytest.raises(ValueError, match="not found"):
+        PyProjectConfiguration.from_revision(project_path, "missing")
+
+
+def test_repository(git_repository, tmp_path_factory):
+    # one process per repository, whichever directory within it is asked for
+    assert repository(git_repository / "project") is repository(git_repository)
+
+    with Repository(git_repository) as project_repository:
+        entries = project_repository.read_tree("first^{tree}")
+        assert entries["project"][0] == b"40000"
+        directory, files = project_repository.read_project("first", "project")
+        assert directory == project_repository.path / "project"
+        assert files["setup.cfg"] == (TEST_DIRECTORY / "input" / "setup_cfg" / "setup.cfg").read_bytes()
+        assert "extra.ini" not in files
+        with pytest.raises(ValueError, match="not a tree"):
+            project_repository.read_tree("first:project/setup.cfg")
+
+    with pytest.raises(ValueError, match="not within a git repository"):
+        Repository(tmp_path_factory.mktemp("empty"))
+
+
+def test_repository_cache(git_repository, tmp_path_factory, monkeypatch):
+    other_path = tmp_path_factory.mktemp("other")
+    git(other_path, "init")
+    closed = []
+    close = Repository.close
+    monkeypatch.setattr(Repository, "close", lambda self: closed.append(self.path) or close(self))
+    monkeypatch.setattr("peppyproject.git.MAXIMUM_REPOSITORIES", 1)
+
+    first = repository(git_repository / "project")
+    assert repository(git_repository) is first
+    closed.clear()
+    # the least recently used repository is closed, and opened again when requested
+    repository(other_path)
+    assert closed == [first.path]
+    assert repository(git_repository / "project") is not first
+    assert repository(git_repository / "project").read_project("first", "project")[0] == first.path / "project"
+
+
+def test_diff():
+    old = flatten({"project": {"name": "a", "dependencies": ["b"], "urls": {"homepage": "c"}}})
+    assert old == {"project.name": "a", "project.dependencies": ["b"], "project.urls.homepage": "c"}
+    new = flatten({"project": {"name": "a", "dependencies": ["b", "d"], "version": "1.0"}})
+    assert diff(old, new) == [
+        {"key": "project.dependencies", "old": ["b"], "new": ["b", "d"]},
+        {"key": "project.urls.homepage", "old": "c"},
+        {"key": "project.version", "new": "1.0"},
+    ]
+
+
+def test_sweep(git_repository):
+    project_path = git_repository / "project"
+    setup_cfg = project_path / "setup.cfg"
+    (project_path / "extra.ini").unlink()
+    (project_path / "CHANGES.rst").write_text("")
+    commit(git_repository, "third, without changes to build files")
+    setup_cfg.write_text(setup_cfg.read_text().replace("name = renamed", "name = jwst", 1))
+    commit(git_repository, "fourth, back to the first name")
+
+    lookups = []
+    with handling(
+        {
+            "cache_hit": lambda cache: cache == "sweep" and lookups.append("hit"),
+            "cache_miss": lambda cache: cache == "sweep" and lookups.append("miss"),
+        }
+    ):
+        records = list(sweep(project_path))
+    # the third and fourth commits reuse the conversions of the second and first
+    assert lookups == ["miss", "miss", "hit", "hit"]
+
+    assert [len(record["changes"]) for record in records][1:] == [1, 1]
+    assert {"key": "project.name", "new": "jwst"} in records[0]["changes"]
+    assert records[1]["changes"] == [{"key": "project.name", "old": "jwst", "new": "renamed"}]
+    assert records[2]["changes"] == [{"key": "project.name", "old": "renamed", "new": "jwst"}]
+
+    # the first commit of a range is compared with an empty configuration
+    ranged_records = list(sweep(project_path, revision_range="first..HEAD"))
+    assert [record["commit"] for record in ranged_records] == [record["commit"] for record in records[1:]]
+    assert {"key": "project.name", "new": "renamed"} in ranged_records[0]["changes"]
+    assert ranged_records[1] == records[2]
+    with pytest.raises(ValueError, match="invalid range"):
+        list(sweep(project_path, revision_range="missing..HEAD"))
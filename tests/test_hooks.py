@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.hooks import dispatch, handling, register, unregister
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def test_register():
+    events = []
+
+    def handler(**arguments):
+        events.append(arguments)
+
+    register("file_read", handler)
+    try:
+        dispatch("file_read", filename="setup.cfg")
+    finally:
+        unregister("file_read", handler)
+    dispatch("file_read", filename="setup.py")
+
+    assert events == [{"filename": "setup.cfg"}]
+
+    with pytest.raises(ValueError, match="unknown event"):
+        register("file_deleted", handler)
+
+
+def test_conversion_events():
+    read = []
+    skipped = []
+    handlers = {
+        "file_read": lambda filename: read.append(filename.name),
+        "file_skipped": lambda filename: skipped.append(filename.name),
+    }
+    with handling(handlers):
+        PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / "setup_cfg", lazy=True, key="project.name")["project"]
+
+    assert set(read) == {"setup.cfg", "pyproject.toml", "setup.py"}
+    assert set(skipped) == {"tox.ini"}
+
+    read.clear()
+    skipped.clear()
+    with handling(handlers):
+        PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / "setup_cfg", lazy=True, key="tool.ruff")["tool"]
+
+    assert set(read) == {"setup.cfg", "pyproject.toml"}
+    # the `build-system` table, which is resolved along with `tool`, has no sections in common with `tool.ruff`
+    assert set(skipped) == {"setup.cfg", "setup.py", "tox.ini"}
+
+
+def test_transformations():
+    directory = TEST_DIRECTORY / "input" / "pyproject_toml"
+    reference = PyProjectConfiguration.from_directory(directory)
+
+    def rename(configuration, filename):
+        configuration["project"]["name"] = "renamed"
+
+    def coerce(value, table, key):
+        if key == "requires-python":
+            return ">=3.11"
+        return None
+
+    configuration = PyProjectConfiguration.from_directory(
+        directory,
+        hooks={
+            "file_parsed": rename,
+            "value_coerced": coerce,
+            "rendered": lambda toml_string, table: f"# {table.name}\n{toml_string}",
+        },
+    )
+
+    assert configuration["project"]["name"] == "renamed"
+    assert configuration["project"]["requires-python"] == ">=3.11"
+    assert configuration.configuration.startswith("# project\n")
+
+    # handlers of a call do not outlive it
+    assert PyProjectConfiguration.from_directory(directory).configuration == reference.configuration
+
+
+def test_call_handlers_are_local():
+    directory = TEST_DIRECTORY / "input" / "setup_cfg"
+    translated = []
+
+    def translate(toml_string, filename, sections):
+        translated.append((filename.name, sections))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(PyProjectConfiguration.from_directory, directory),
+            executor.submit(PyProjectConfiguration.from_directory, directory, hooks={"section_translated": translate}),
+        ]
+        for future in futures:
+            future.result()
+
+    # `setup.cfg` and `setup.py`, for each of the `project`, `build-system`, and `tool` tables
+    assert ("setup.cfg", ("metadata", "options")) in translated
+    assert len(translated) == len(set(translated)) == 6
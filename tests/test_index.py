@@ -0,0 +1,78 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from peppyproject.batch import convert_many
+from peppyproject.index import SQLiteIndex, parse_requirement
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+DIRECTORIES = [TEST_DIRECTORY / "input" / directory for directory in ["pyproject_toml", "setup_cfg", "setup_py"]]
+
+
+@pytest.mark.parametrize(
+    ("requirement", "parsed"),
+    [
+        ("numpy", ("numpy", None, None, None)),
+        ("Stsci.Imagestats >=1.6.3", ("stsci-imagestats", None, ">=1.6.3", None)),
+        ("setuptools_scm[toml, cli] (>=3.4)", ("setuptools-scm", "cli,toml", ">=3.4", None)),
+        ("tomli; python_version < '3.11'", ("tomli", None, None, "python_version < '3.11'")),
+    ],
+)
+def test_parse_requirement(requirement, parsed):
+    assert tuple(parse_requirement(requirement).values()) == parsed
+
+
+def test_index(tmp_path):
+    with SQLiteIndex(tmp_path / "projects.db", batch_size=2) as index:
+        results = dict(convert_many(DIRECTORIES, workers=2, index=index))
+        assert not any(isinstance(result, Exception) for result in results.values())
+
+        assert index.query("SELECT directory, name FROM projects ORDER BY directory") == [
+            (str(DIRECTORIES[0]), "romancal"),
+            (str(DIRECTORIES[1]), "jwst"),
+            (str(DIRECTORIES[2]), "crds"),
+        ]
+        assert index.query(
+            "SELECT DISTINCT directory FROM projects JOIN dependencies USING (project_id) "
+            "WHERE dependencies.name = 'scipy' AND specifier LIKE '%<1.10.0%' ORDER BY directory"
+        ) == [(str(DIRECTORIES[1]),)]
+        assert index.query(
+            "SELECT extra FROM dependencies JOIN projects USING (project_id) "
+            "WHERE directory = ? AND dependencies.name = 'pytest'",
+            (str(DIRECTORIES[0]),),
+        ) == [("test",)]
+        assert index.query(
+            'SELECT object FROM entry_points WHERE "group" = ? AND name = ? ORDER BY object',
+            ("console_scripts", "okify_regtests"),
+        ) == [("jwst.scripts.okify_regtests:main",), ("romancal.scripts.okify_regtests:main",)]
+        assert index.query(
+            "SELECT DISTINCT directory FROM projects JOIN tool_keys USING (project_id) "
+            "WHERE tool = 'ruff' AND key = 'line-length' AND number > 120"
+        ) == [(str(DIRECTORIES[1]),)]
+
+    # converting a project again replaces it
+    with SQLiteIndex(tmp_path / "projects.db") as index:
+        list(convert_many(DIRECTORIES[1:2], index=index))
+        assert index.query("SELECT COUNT(*) FROM projects") == [(3,)]
+        assert index.query("SELECT COUNT(*) FROM tool_keys WHERE tool = 'ruff' AND key = 'line-length'") == [(1,)]
+
+
+def test_pending_projects(tmp_path):
+    input_path = TEST_DIRECTORY / "input" / "setup_cfg"
+    with SQLiteIndex(tmp_path / "projects.db") as index:
+        # the same project, by another path, replaces the pending one
+        results = list(convert_many([input_path, input_path / ".." / "setup_cfg"], index=index))
+        assert not any(isinstance(result, Exception) for _, result in results)
+        assert index.query("SELECT directory FROM projects") == [(str(input_path.resolve()),)]
+
+        with sqlite3.connect(tmp_path / "projects.db") as connection:
+            connection.execute("CREATE TRIGGER failing BEFORE INSERT ON projects BEGIN SELECT RAISE(ABORT, 'failing'); END")
+        list(convert_many(DIRECTORIES[:1], index=index))
+        with pytest.raises(sqlite3.IntegrityError, match="failing"):
+            index.flush()
+
+        # projects that could not be written stay pending
+        with sqlite3.connect(tmp_path / "projects.db") as connection:
+            connection.execute("DROP TRIGGER failing")
+        assert index.query("SELECT COUNT(*) FROM projects") == [(2,)]
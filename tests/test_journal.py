@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from peppyproject.journal import Journal, input_digest
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def test_journal(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    with Journal(journal_path, sync_every=2) as journal:
+        journal.record("a", "1", output="results.jsonl", status="converted")
+        journal.record("b", "2", output="results.jsonl", status="failed")
+        journal.record("a", "3", output="results.jsonl", status="converted")
+
+    # a line cut short by an interruption is ignored
+    with open(journal_path, "a") as journal_file:
+        journal_file.write('{"directory": "c", "inp')
+
+    with Journal(journal_path) as journal:
+        assert journal.is_current("a", "3")
+        assert not journal.is_current("a", "1")
+        assert not journal.is_current("b", "2")
+        assert not journal.is_current("c", "4")
+
+
+def test_input_digest(tmp_path):
+    (tmp_path / "setup.py").write_text("from setuptools import setup\nsetup()\n")
+    digest = input_digest(tmp_path)
+    assert input_digest(tmp_path) == digest
+
+    (tmp_path / "setup.py").write_text("from setuptools import setup\nsetup(name='a')\n")
+    assert input_digest(tmp_path) != digest
+    digest = input_digest(tmp_path)
+
+    (tmp_path / "LICENSE").write_text("")
+    assert input_digest(tmp_path) != digest
@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+from peppyproject.batch import convert_many
+from peppyproject.metrics import Metrics, metrics
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+DIRECTORIES = [TEST_DIRECTORY / "input" / directory for directory in ["pyproject_toml", "setup_cfg", "setup_py"]]
+
+
+def test_metrics(tmp_path):
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "pyproject.toml").write_text("[project\n")
+    metrics_path = tmp_path / "metrics.prom"
+
+    with metrics(metrics_path, interval=0.01) as conversion_metrics:
+        list(convert_many([*DIRECTORIES, tmp_path / "broken"], workers=2))
+
+    assert conversion_metrics.projects_converted == 3
+    assert conversion_metrics.failures == {"TOMLDecodeError": 1}
+    assert conversion_metrics.files_read > 0
+    assert conversion_metrics.bytes_read >= sum(
+        (directory / filename).stat().st_size
+        for directory in DIRECTORIES
+        for filename in ["pyproject.toml", "setup.cfg"]
+        if (directory / filename).exists()
+    )
+    assert conversion_metrics.cache_hits["translator"] + conversion_metrics.cache_misses["translator"] > 0
+
+    lines = metrics_path.read_text().splitlines()
+    assert lines[-1] == "# EOF"
+    assert "peppyproject_projects_converted_total 3" in lines
+    assert 'peppyproject_project_failures_total{type="TOMLDecodeError"} 1' in lines
+    assert any(line.startswith('peppyproject_stage_duration_seconds_count{stage="translate"}') for line in lines)
+    assert list(tmp_path.glob(".metrics.prom.*")) == []
+    # readable by a collector running as another user, as any new file under the umask
+    umask = os.umask(0)
+    os.umask(umask)
+    assert metrics_path.stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_merge_metrics():
+    with metrics() as first:
+        list(convert_many(DIRECTORIES[:2]))
+    with metrics() as second:
+        list(convert_many(DIRECTORIES[2:]))
+
+    assert Metrics.from_openmetrics(first.to_openmetrics()).to_openmetrics() == first.to_openmetrics()
+
+    combined = Metrics.from_openmetrics(first.to_openmetrics())
+    combined.update(second)
+    assert combined.projects_converted == 3
+    assert combined.bytes_read == first.bytes_read + second.bytes_read
+    assert sum(combined.stage_buckets["translate"]) == sum(first.stage_buckets["translate"]) + sum(
+        second.stage_buckets["translate"]
+    )
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.profiling import NULL_SPAN, Span, collect, profile, span, trace
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def test_disabled():
+    assert span("translate") is NULL_SPAN
+
+
+def test_nested_spans():
+    spans = []
+    with collect(spans.append):
+        with span("outer"), span("inner"):
+            pass
+        assert isinstance(span("outer"), Span)
+
+    inner, outer = spans
+    assert (inner.name, outer.name) == ("inner", "outer")
+    assert outer.nested == inner.duration
+    assert outer.self_duration == outer.duration - inner.duration
+    assert span("outer") is NULL_SPAN
+
+
+def test_profile():
+    with profile() as stages:
+        for directory in ["pyproject_toml", "setup_cfg", "setup_py"]:
+            PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / directory).configuration  # noqa: B018
+
+    for stage in ["read", "read_setup_py", "translate", "tomli.loads", "coerce", "render", "tomli_w.dumps"]:
+        assert stages.calls[stage] > 0
+        assert stages.durations[stage] >= 0
+
+    report = stages.report().splitlines()
+    assert report[0].split() == ["stage", "calls", "time", "(s)", "share"]
+    assert report[-1].split()[0] == "total"
+
+
+def test_trace(tmp_path):
+    trace_filename = tmp_path / "trace.json"
+    with trace(trace_filename) as spans:
+        PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / "setup_cfg").configuration  # noqa: B018
+
+    with open(trace_filename) as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert events == spans.events
+
+    threads = [event for event in events if event["ph"] == "M"]
+    assert [thread["args"]["name"] for thread in threads] == ["MainThread"]
+    assert {event["name"] for event in events if event["ph"] == "X"} >= {"read", "translate", "merge", "render"}
+    for event in events:
+        if event["ph"] == "X":
+            assert event["tid"] == threads[0]["tid"]
+            assert event["dur"] >= 0
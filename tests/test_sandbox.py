@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import pytest
+
+from peppyproject import PyProjectConfiguration
+from peppyproject.sandbox import FORKING, EvaluationError, SandboxPool, evaluating
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with SandboxPool(workers=2, timeout=5) as sandbox_pool:
+        yield sandbox_pool
+
+
+def test_evaluate(pool, tmp_path):
+    (tmp_path / "README.md").write_text("# example\n")
+    (tmp_path / "setup.py").write_text(
+        "import os\n"
+        "from setuptools import setup\n"
+        "version = '.'.join(str(part) for part in (1, 2, 3))\n"
+        "print('printed output is discarded')\n"
+        "here = os.path.dirname(__file__)\n"
+        "setup(\n"
+        "    name='example',\n"
+        "    version=version,\n"
+        "    install_requires=['numpy' + '>=1.20'],\n"
+        "    long_description=open(os.path.join(here, 'README.md')).read(),\n"
+        "    cmdclass={'build': object},\n"
+        ")\n"
+    )
+
+    arguments = pool.evaluate(tmp_path / "setup.py")
+    # values that are not plain data, such as classes, are dropped
+    assert arguments == {
+        "name": "example",
+        "version": "1.2.3",
+        "install_requires": ["numpy>=1.20"],
+        "long_description": "README.md",
+    }
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        "from setuptools import setup\nopen('written.txt', 'w').write('')\nsetup(name='example')\n",
+        "import socket\nsocket.create_connection(('localhost', 80))\n",
+        "import subprocess\nsubprocess.run(['true'])\n",
+        "import ctypes\nctypes.CDLL(None).system(b'touch written.txt')\nfrom setuptools import setup\nsetup(name='x')\n",
+        "import os\nos.mkfifo('written.txt')\nfrom setuptools import setup\nsetup(name='x')\n",
+        "raise ValueError('broken')\n",
+        "from setuptools import setup\n",
+    ],
+    ids=["write", "network", "process", "ctypes", "fifo", "error", "no setup call"],
+)
+def test_evaluation_errors(pool, tmp_path, script):
+    (tmp_path / "setup.py").write_text(script)
+    with pytest.raises(EvaluationError):
+        pool.evaluate(tmp_path / "setup.py")
+    assert not (tmp_path / "written.txt").exists()
+
+
+def test_isolation(tmp_path):
+    (tmp_path / "leak.py").write_text(
+        "import builtins, os\nbuiltins.leaked = True\nos.environ['LEAKED'] = '1'\n"
+        "from setuptools import setup\nsetup(name='a')\n"
+    )
+    # each script is evaluated in a child of the same warm worker, with a minimal environment
+    (tmp_path / "setup.py").write_text(
+        "import builtins, os\n"
+        "from setuptools import setup\n"
+        "setup(\n"
+        "    name=str(hasattr(builtins, 'leaked') or 'LEAKED' in os.environ),\n"
+        "    version=os.environ.get('PEPPYPROJECT_SECRET', 'none'),\n"
+        "    description=str(os.getppid()),\n"
+        ")\n"
+    )
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("PEPPYPROJECT_SECRET", "secret")
+        with SandboxPool(workers=1) as sandbox_pool:
+            first = sandbox_pool.evaluate(tmp_path / "setup.py")
+            assert sandbox_pool.evaluate(tmp_path / "leak.py") == {"name": "a"}
+            second = sandbox_pool.evaluate(tmp_path / "setup.py")
+    assert first["name"] == second["name"] == "False"
+    assert first["version"] == second["version"] == "none"
+    if FORKING:
+        assert first["description"] == second["description"]
+
+
+def test_timeout(tmp_path):
+    (tmp_path / "setup.py").write_text("while True:\n    pass\n")
+    with SandboxPool(workers=1, timeout=0.5) as sandbox_pool:
+        with pytest.raises(EvaluationError, match="timed out"):
+            sandbox_pool.evaluate(tmp_path / "setup.py")
+        # the script that timed out was killed, and the pool evaluates the next one
+        (tmp_path / "setup.py").write_text("from setuptools import setup\nsetup(name='example')\n")
+        assert sandbox_pool.evaluate(tmp_path / "setup.py") == {"name": "example"}
+
+
+def test_evaluating(pool, tmp_path):
+    input_path = TEST_DIRECTORY / "input" / "setup_py"
+    with evaluating(pool):
+        configuration = PyProjectConfiguration.from_directory(input_path)
+    assert configuration.configuration == PyProjectConfiguration.from_directory(input_path).configuration
+
+    # scripts that cannot be evaluated are parsed instead
+    (tmp_path / "setup.py").write_text("import missing_module\nfrom setuptools import setup\nsetup(\n    name='example',\n)\n")
+    with evaluating(pool), pytest.warns(UserWarning, match="parsing statically instead"):
+        configuration = PyProjectConfiguration.from_directory(tmp_path)
+    assert configuration["project"]["name"] == "example"
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from peppyproject import PyProjectConfiguration
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+DIRECTORIES = [TEST_DIRECTORY / "input" / directory for directory in ["pyproject_toml", "setup_cfg", "setup_py"]]
+
+
+def test_threaded_conversion(tmp_path, monkeypatch):
+    # conversion must not depend on the working directory
+    monkeypatch.chdir(tmp_path)
+
+    reference = {directory: PyProjectConfiguration.from_directory(directory).configuration for directory in DIRECTORIES}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        directories = DIRECTORIES * 8
+        results = executor.map(lambda directory: PyProjectConfiguration.from_directory(directory).configuration, directories)
+        for directory, result in zip(directories, results):
+            assert result == reference[directory]
+
+
+def test_shared_lazy_configuration():
+    configuration = PyProjectConfiguration.from_directory(DIRECTORIES[1], lazy=True)
+    tables = ["tool", "build-system", "project"] * 8
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        resolved = list(executor.map(configuration.__getitem__, tables))
+
+    for table, result in zip(tables, resolved):
+        assert result is configuration[table]
+    assert configuration.configuration == PyProjectConfiguration.from_directory(DIRECTORIES[1]).configuration
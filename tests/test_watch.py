@@ -0,0 +1,69 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from peppyproject.hooks import handling
+from peppyproject.watch import watch
+
+TEST_DIRECTORY = Path(__file__).parent / "data"
+
+
+def touch(filename: Path, text: str) -> None:
+    """Write the given text, moving the modification time forward even on filesystems with coarse timestamps."""
+    modified = filename.stat().st_mtime_ns
+    filename.write_text(text)
+    os.utime(filename, ns=(modified + 10**9, modified + 10**9))
+
+
+def test_watch(tmp_path):
+    shutil.copytree(
+        TEST_DIRECTORY / "input" / "setup_cfg", tmp_path, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+    )
+
+    stop = threading.Event()
+    read = []
+    with handling({"file_read": lambda filename: read.append(filename.name)}):
+        configurations = watch(tmp_path, interval=0.01, stop=stop)
+        configuration = next(configurations)
+        assert "numpy>=1.20" in configuration["project"]["dependencies"]
+
+        read.clear()
+        setup_cfg = tmp_path / "setup.cfg"
+        touch(setup_cfg, setup_cfg.read_text().replace("numpy>=1.20", "numpy>=2"))
+        configuration = next(configurations)
+        assert "numpy>=2" in configuration["project"]["dependencies"]
+        # only the file that changed is read again
+        assert set(read) == {"setup.cfg"}
+
+        # an error is reported, and the project is read again once it is fixed
+        pyproject_toml = tmp_path / "pyproject.toml"
+        valid = pyproject_toml.read_text()
+        touch(pyproject_toml, "[project\n")
+        assert isinstance(next(configurations), Exception)
+        touch(pyproject_toml, valid)
+        assert not isinstance(next(configurations), Exception)
+
+        stop.set()
+        assert list(configurations) == []
+
+
+def test_racily_clean(tmp_path):
+    shutil.copytree(
+        TEST_DIRECTORY / "input" / "setup_cfg", tmp_path, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+    )
+    setup_cfg = tmp_path / "setup.cfg"
+    os.utime(setup_cfg)
+    modified = setup_cfg.stat().st_mtime_ns
+
+    stop = threading.Event()
+    configurations = watch(tmp_path, interval=0.01, stop=stop)
+    assert "numpy>=1.20" in next(configurations)["project"]["dependencies"]
+
+    # an edit of the same size within the granularity of the modification time is still seen
+    setup_cfg.write_text(setup_cfg.read_text().replace("numpy>=1.20", "numpy>=1.21"))
+    os.utime(setup_cfg, ns=(modified, modified))
+    assert "numpy>=1.21" in next(configurations)["project"]["dependencies"]
+
+    stop.set()
+    assert list(configurations) == []
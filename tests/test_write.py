@@ -4,6 +4,7 @@ import pytest
 import tomli
 
 from peppyproject.configuration import PyProjectConfiguration
+from peppyproject.hooks import handling
 
 TEST_DIRECTORY = Path(__file__).parent / "data"
 
@@ -22,3 +23,30 @@ def test_to_file(directory, tmp_path):
 
     with Path.open(test_path, "rb") as test_file:
         assert tomli.load(test_file) == reference_tomli
+
+
+def test_to_file_unchanged(tmp_path):
+    test_path = tmp_path / "pyproject.toml"
+    configuration = PyProjectConfiguration.from_directory(TEST_DIRECTORY / "input" / "pyproject_toml")
+
+    events = []
+    with handling(
+        {
+            "file_written": lambda filename: events.append(("written", filename)),
+            "file_unchanged": lambda filename: events.append(("unchanged", filename)),
+        },
+    ):
+        assert configuration.to_file(test_path)
+        modified = test_path.stat().st_mtime_ns
+        assert not configuration.to_file(test_path)
+        assert test_path.stat().st_mtime_ns == modified
+
+        # a changed file is replaced, keeping its mode
+        test_path.chmod(0o600)
+        test_path.write_text("[project]\nname = 'outdated'\n")
+        assert configuration.to_file(test_path)
+
+    assert events == [("written", test_path), ("unchanged", test_path), ("written", test_path)]
+    assert test_path.read_text() == configuration.configuration
+    assert test_path.stat().st_mode & 0o777 == 0o600
+    assert [path.name for path in tmp_path.iterdir()] == ["pyproject.toml"]